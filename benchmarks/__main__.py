@@ -0,0 +1,54 @@
+import click
+import datetime as dt
+import polars as pl
+from benchmarks.suite import BENCHMARKS, RESULTS_PATH, BenchmarkConfig, compare, run_suite
+
+
+@click.group()
+def cli():
+    """Offline benchmarks on synthetic Barra-shaped data."""
+    pass
+
+
+@cli.command()
+@click.option("--assets", type=int, default=3000, show_default=True, help="Universe size.")
+@click.option("--years", type=int, default=6, show_default=True, help="Years of table history.")
+@click.option("--zip-days", type=int, default=20, show_default=True, help="Trading days in the synthetic Barra zips.")
+@click.option(
+    "--end",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    default=str(dt.date(2024, 12, 31)),
+    show_default=True,
+    help="Last date of the synthetic history (YYYY-MM-DD).",
+)
+@click.option(
+    "--only",
+    type=click.Choice(list(BENCHMARKS)),
+    multiple=True,
+    help="Run only these benchmarks (repeatable).",
+)
+@click.option("--results", default=RESULTS_PATH, show_default=True, help="JSON lines file results are appended to.")
+def run(assets, years, zip_days, end, only, results):
+    config = BenchmarkConfig(n_assets=assets, years=years, zip_days=zip_days, end=end.date())
+    records = run_suite(config, list(only) or None, results)
+
+    summary = pl.DataFrame(records)
+    metrics = [column for column in ["wall_seconds", "cpu_seconds", "peak_rss_mb"] if column in summary.columns]
+    with pl.Config(tbl_rows=-1, tbl_cols=-1):
+        click.echo(summary.select("benchmark", "status", *metrics))
+
+    for record in records:
+        if record["status"] == "error":
+            click.echo(f"\n{record['benchmark']} failed:\n{record['error']}")
+
+
+@cli.command(name="compare")
+@click.option("--results", default=RESULTS_PATH, show_default=True, help="JSON lines file of stored results.")
+def compare_command(results):
+    """Latest run against the previous comparable run."""
+    with pl.Config(tbl_rows=-1, tbl_cols=-1):
+        click.echo(compare(results))
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,253 @@
+import os
+import json
+import time
+import shutil
+import socket
+import tempfile
+import subprocess
+import traceback
+import multiprocessing
+import datetime as dt
+from dataclasses import dataclass, asdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable
+
+RESULTS_PATH = os.path.join(os.path.dirname(__file__), "results", "results.jsonl")
+
+
+@dataclass
+class BenchmarkConfig:
+    n_assets: int = 3000
+    years: int = 6
+    zip_days: int = 20
+    end: dt.date = dt.date(2024, 12, 31)
+    seed: int = 0
+
+    @property
+    def start(self) -> dt.date:
+        return dt.date(self.end.year - self.years + 1, 1, 1)
+
+
+# Each benchmark does its untimed setup against the scratch database and
+# returns the callable that is timed.
+
+def table_upsert(database, config: BenchmarkConfig) -> Callable[[], None]:
+    import polars as pl
+
+    year = config.end.year
+    rows = (
+        database.assets_table.read(year)
+        .filter(pl.col("date").dt.month().eq(12))
+        .with_columns(pl.col("price").mul(1.01))
+        .collect()
+    )
+    return lambda: database.assets_table.upsert(year, rows)
+
+
+def assets_backfill(database, config: BenchmarkConfig) -> Callable[[], None]:
+    from pipelines.assets_flow import assets_backfill_flow
+
+    return lambda: assets_backfill_flow(config.start, config.end, database)
+
+
+def signals(database, config: BenchmarkConfig) -> Callable[[], None]:
+    from pipelines.signals_flow import signals_flow
+
+    return lambda: signals_flow(database)
+
+
+def signal_weights(database, config: BenchmarkConfig) -> Callable[[], None]:
+    from pipelines.signal_weights_flow import signal_weights_flow
+
+    return lambda: signal_weights_flow(config.start, config.end, database)
+
+
+def composite_alphas(database, config: BenchmarkConfig) -> Callable[[], None]:
+    from pipelines.composite_alphas_flow import composite_alphas_flow
+
+    return lambda: composite_alphas_flow(config.start, config.end, database, incremental=False)
+
+
+def barra_history_load(dataset: str) -> Callable:
+    """Parse and clean one year of a dataset's synthetic history zips."""
+
+    def setup(database, config: BenchmarkConfig) -> Callable[[], None]:
+        import importlib
+        from pipelines.utils import barra_datasets
+
+        module_name, clean_name = {
+            "returns": ("pipelines.barra_returns_flow", "clean_barra_returns"),
+            "risk": ("pipelines.barra_risk_flow", "clean_barra_df"),
+            "volume": ("pipelines.barra_volume_flow", "clean_barra_df"),
+            "exposures": ("pipelines.barra_exposures_flow", "clean_barra_df"),
+            "covariances": ("pipelines.barra_covariances_flow", "clean_barra_df"),
+        }[dataset]
+        clean = getattr(importlib.import_module(module_name), clean_name)
+        barra_dataset = getattr(barra_datasets, f"barra_{dataset}")
+
+        return lambda: clean(barra_dataset.load_history(config.end.year))
+
+    return setup
+
+
+BENCHMARKS: dict[str, Callable] = {
+    "table_upsert": table_upsert,
+    "assets_backfill_flow": assets_backfill,
+    "signals_flow": signals,
+    "signal_weights_flow": signal_weights,
+    "composite_alphas_flow": composite_alphas,
+    **{
+        f"barra_history_load_{dataset}": barra_history_load(dataset)
+        for dataset in ["returns", "risk", "volume", "exposures", "covariances"]
+    },
+}
+
+
+def build_base(workdir: str, config: BenchmarkConfig) -> None:
+    """Synthetic database and Barra archive every benchmark starts from."""
+    from benchmarks.synthetic import write_barra_archive, write_barra_tables, write_signal_tables
+    from pipelines.assets_flow import assets_backfill_flow
+    from pipelines.utils.enums import DatabaseName
+    from pipelines.utils.tables import Database
+
+    database = Database(DatabaseName.DEVELOPMENT, root=os.path.join(workdir, "root"))
+
+    write_barra_archive(os.path.join(workdir, "archive"), config.end.year, config.zip_days, config.n_assets, config.seed)
+    write_barra_tables(database, config.start, config.end, config.n_assets, config.seed)
+    write_signal_tables(database, config.start, config.end, config.n_assets, config.seed)
+    assets_backfill_flow(config.start, config.end, database)
+
+
+def run_benchmark(name: str, workdir: str, config: BenchmarkConfig) -> dict:
+    """Run one benchmark in a fresh process against a scratch copy of the base database."""
+    from pipelines.utils.enums import DatabaseName
+    from pipelines.utils.tables import Database
+    from pipelines.utils.instrumentation import peak_rss_mb
+
+    scratch = tempfile.mkdtemp(dir=workdir)
+    try:
+        shutil.copytree(os.path.join(workdir, "root"), os.path.join(scratch, "root"))
+        database = Database(DatabaseName.DEVELOPMENT, root=os.path.join(scratch, "root"))
+
+        timed = BENCHMARKS[name](database, config)
+        setup_rss = peak_rss_mb()
+
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        timed()
+        return {
+            "status": "ok",
+            "wall_seconds": time.perf_counter() - wall_start,
+            "cpu_seconds": time.process_time() - cpu_start,
+            "setup_peak_rss_mb": setup_rss,
+            "peak_rss_mb": peak_rss_mb(),
+        }
+    except Exception:
+        return {"status": "error", "error": traceback.format_exc(limit=3)}
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(__file__),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(
+    config: BenchmarkConfig,
+    names: list[str] | None = None,
+    results_path: str = RESULTS_PATH,
+) -> list[dict]:
+    """
+    Build the synthetic inputs once, run each benchmark in its own spawned
+    process (so peak RSS is per benchmark) and append the results to results_path.
+    """
+    names = names or list(BENCHMARKS)
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        raise ValueError(f"Unknown benchmarks {sorted(unknown)}. Expected any of {list(BENCHMARKS)}.")
+
+    workdir = tempfile.mkdtemp(prefix="sf_benchmarks_")
+
+    # Everything stays offline: Barra zips come from the synthetic archive, and
+    # the raw cache and stage metrics go to the scratch directory
+    os.environ["BARRA_ARCHIVE"] = os.path.join(workdir, "archive")
+    os.environ["BARRA_CACHE"] = os.path.join(workdir, "barra_cache")
+    os.environ["METRICS_PATH"] = os.path.join(workdir, "metrics.jsonl")
+
+    records = []
+    try:
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            executor.submit(build_base, workdir, config).result()
+
+        run_id = dt.datetime.now().isoformat(timespec="seconds")
+        for name in names:
+            # A fresh process per benchmark keeps peak RSS from carrying over
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                result = executor.submit(run_benchmark, name, workdir, config).result()
+
+            records.append({
+                "run_id": run_id,
+                "commit": git_commit(),
+                "host": socket.gethostname(),
+                "benchmark": name,
+                **{key: str(value) if isinstance(value, dt.date) else value for key, value in asdict(config).items()},
+                **result,
+            })
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(results_path), exist_ok=True)
+    with open(results_path, "a") as file:
+        for record in records:
+            file.write(json.dumps(record) + "\n")
+
+    return records
+
+
+def compare(results_path: str = RESULTS_PATH):
+    """
+    Latest run of each benchmark against the previous run on the same host
+    with the same config, as ratios (above 1 is slower or larger).
+    """
+    import polars as pl
+
+    config_columns = ["host", "n_assets", "years", "zip_days", "end", "seed"]
+    results = (
+        pl.read_ndjson(results_path)
+        .filter(pl.col("status").eq("ok"))
+        .sort("run_id")
+    )
+
+    return (
+        results
+        .group_by("benchmark", *config_columns, maintain_order=True)
+        .agg(
+            pl.col("run_id", "commit").tail(2),
+            pl.col("wall_seconds", "cpu_seconds", "peak_rss_mb").tail(2),
+        )
+        .filter(pl.col("run_id").list.len().eq(2))
+        .select(
+            "benchmark",
+            "n_assets",
+            "years",
+            pl.col("commit").list.first().alias("previous_commit"),
+            pl.col("commit").list.last().alias("latest_commit"),
+            *[
+                pl.col(metric).list.last().alias(metric)
+                for metric in ["wall_seconds", "cpu_seconds", "peak_rss_mb"]
+            ],
+            *[
+                pl.col(metric).list.last().truediv(pl.col(metric).list.first()).alias(f"{metric}_ratio")
+                for metric in ["wall_seconds", "cpu_seconds", "peak_rss_mb"]
+            ],
+        )
+        .sort("benchmark")
+    )
@@ -0,0 +1,319 @@
+import os
+import zipfile
+import numpy as np
+import polars as pl
+import datetime as dt
+from pipelines.utils import barra_columns
+from pipelines.utils.factors import factors
+from pipelines.utils.id_index import build_id_index
+from pipelines.utils.tables import Database
+from pipelines.utils.barra_datasets import (
+    BarraDataset,
+    barra_returns,
+    barra_specific_returns,
+    barra_risk,
+    barra_volume,
+    barra_exposures,
+    barra_covariances,
+)
+from pipelines.composite_alphas_flow import SIGNALS as COMPOSITE_SIGNALS
+from pipelines.signal_weights_flow import CONFIG as SIGNAL_WEIGHTS_CONFIG
+
+END_OF_FILE = "[End of File]"
+
+# Barra dataset -> (metadata lines above the header, multi-part history zips)
+BARRA_LAYOUTS: dict[str, tuple[BarraDataset, int, bool]] = {
+    "returns": (barra_returns, 1, False),
+    "specific_returns": (barra_specific_returns, 2, False),
+    "volume": (barra_volume, 1, False),
+    "risk": (barra_risk, 2, True),
+    "exposures": (barra_exposures, 2, True),
+    "covariances": (barra_covariances, 2, True),
+}
+
+
+def trading_days(start: dt.date, end: dt.date) -> list[dt.date]:
+    """Weekdays in [start, end]; close enough to the exchange calendar for synthetic data."""
+    days = pl.date_range(start, end, eager=True)
+    return days.filter(days.dt.weekday() <= 5).to_list()
+
+
+def barrids(n_assets: int) -> list[str]:
+    return [f"USA{i:07d}" for i in range(n_assets)]
+
+
+def cusips(n_assets: int) -> list[str]:
+    return [f"{i:08d}0" for i in range(n_assets)]
+
+
+def asset_panel(days: list[dt.date], n_assets: int, rng: np.random.Generator) -> pl.DataFrame:
+    """
+    (date, barrid) rows for a universe with staggered listings, so early
+    dates hold fewer assets like the real history.
+    """
+    listing_day = rng.integers(0, max(len(days) // 10, 1), n_assets)
+    listing_day[: n_assets // 2] = 0
+
+    return (
+        pl.DataFrame({"date": days})
+        .with_row_index("day")
+        .join(
+            pl.DataFrame({"barrid": barrids(n_assets), "listing_day": listing_day}),
+            how="cross",
+        )
+        .filter(pl.col("day").ge(pl.col("listing_day")))
+        .drop("day", "listing_day")
+        .sort("date", "barrid")
+    )
+
+
+def barra_frames(panel: pl.DataFrame, rng: np.random.Generator) -> dict[str, pl.DataFrame]:
+    """Raw Barra columns (as named in the files) for each dataset on the given panel."""
+    n = panel.height
+    data_date = panel.select(pl.col("date").dt.strftime("%Y%m%d").alias("DataDate"))
+    barrid = panel.select(pl.col("barrid").alias("!Barrid"))
+
+    price = np.exp(rng.normal(3.5, 1.0, n))
+    volume = np.exp(rng.normal(13, 1.5, n))
+    spread = np.abs(rng.normal(0.002, 0.001, n))
+
+    frames = {
+        "returns": pl.DataFrame({
+            "!Barrid": barrid["!Barrid"],
+            "Price": price,
+            "Capt": price * np.exp(rng.normal(18, 1.5, n)),
+            "PriceSource": rng.choice(["NYSE", "NASDAQ", "AMEX"], n),
+            "Currency": "USD",
+            "DlyReturn%": rng.normal(0.04, 2.0, n),
+            "DataDate": data_date["DataDate"],
+        }),
+        "specific_returns": pl.DataFrame({
+            "!Barrid": barrid["!Barrid"],
+            "SpecificReturn": rng.normal(0, 1.5, n),
+            "DataDate": data_date["DataDate"],
+        }),
+        "risk": pl.DataFrame({
+            "!Barrid": barrid["!Barrid"],
+            "Yield%": np.abs(rng.normal(1.5, 1.0, n)),
+            "TotalRisk%": np.abs(rng.normal(35, 10, n)),
+            "SpecRisk%": np.abs(rng.normal(28, 10, n)) + 5,
+            "HistBeta": rng.normal(1, 0.3, n),
+            "PredBeta": rng.normal(1, 0.3, n),
+            "DataDate": data_date["DataDate"],
+        }),
+        "volume": pl.DataFrame({
+            "!Barrid": barrid["!Barrid"],
+            "DailyVolume": volume,
+            "ADTV_30": volume * rng.uniform(0.8, 1.2, n),
+            "ADTV_60": volume * rng.uniform(0.8, 1.2, n),
+            "ADTV_90": volume * rng.uniform(0.8, 1.2, n),
+            "BidAskSpread": spread,
+            "ADBAS_30": spread * rng.uniform(0.8, 1.2, n),
+            "ADBAS_60": spread * rng.uniform(0.8, 1.2, n),
+            "ADBAS_90": spread * rng.uniform(0.8, 1.2, n),
+            "DataDate": data_date["DataDate"],
+        }),
+    }
+    return frames
+
+
+def exposures_frame(panel: pl.DataFrame, rng: np.random.Generator) -> pl.DataFrame:
+    """Long (!Barrid, Factor, Exposure, DataDate) rows, one per asset and factor."""
+    long = panel.join(pl.DataFrame({"Factor": factors}), how="cross")
+    return long.select(
+        pl.col("barrid").alias("!Barrid"),
+        "Factor",
+        pl.Series("Exposure", rng.normal(0, 1, long.height)),
+        pl.col("date").dt.strftime("%Y%m%d").alias("DataDate"),
+    )
+
+
+def covariances_frame(days: list[dt.date], rng: np.random.Generator) -> pl.DataFrame:
+    """Long (!Factor1, Factor2, VarCovar, DataDate) rows of a PSD matrix in percent squared."""
+    k = len(factors)
+    loadings = rng.normal(0, 2, (k, k))
+    covariance = loadings @ loadings.T / k + np.eye(k)
+
+    day_frame = pl.DataFrame({
+        "!Factor1": np.repeat(factors, k),
+        "Factor2": np.tile(factors, k),
+        "VarCovar": covariance.ravel(),
+    })
+    return pl.concat([
+        day_frame.with_columns(pl.lit(day.strftime("%Y%m%d")).alias("DataDate"))
+        for day in days
+    ])
+
+
+def barra_member(frame: pl.DataFrame, metadata_lines: int) -> bytes:
+    """One pipe-delimited Barra file: metadata lines, header, rows and the end-of-file sentinel."""
+    metadata = "".join(f"!Synthetic Barra file, metadata line {i + 1}\n" for i in range(metadata_lines))
+    return (metadata + frame.write_csv(separator="|") + END_OF_FILE + "\n").encode()
+
+
+def write_barra_archive(
+    archive: str,
+    year: int,
+    n_days: int,
+    n_assets: int,
+    seed: int = 0,
+    days_per_part: int = 10,
+) -> None:
+    """
+    Write history zips for the first n_days trading days of year under archive,
+    laid out the way each BarraDataset expects. Single-zip datasets share
+    {history_zip_file}_{year}.zip; multi-part datasets are split into
+    {history_zip_file}_{year}_{part}.zip every days_per_part days.
+    """
+    rng = np.random.default_rng(seed)
+    days = trading_days(dt.date(year, 1, 1), dt.date(year, 12, 31))[:n_days]
+    panel = asset_panel(days, n_assets, rng)
+
+    frames = barra_frames(panel, rng)
+    frames["exposures"] = exposures_frame(panel, rng)
+    frames["covariances"] = covariances_frame(days, rng)
+
+    # zip path -> [(member name, contents)]
+    members: dict[str, list[tuple[str, bytes]]] = {}
+    for name, (dataset, metadata_lines, multi_part) in BARRA_LAYOUTS.items():
+        folder = os.path.join(archive, dataset._history_folder)
+        os.makedirs(folder, exist_ok=True)
+
+        day_frames = frames[name].partition_by("DataDate", as_dict=True)
+        for i, day in enumerate(days):
+            key = day.strftime("%Y%m%d")
+            if multi_part:
+                zip_name = f"{dataset.history_zip_file(year)}_{i // days_per_part + 1:02d}.zip"
+            else:
+                zip_name = f"{dataset.history_zip_file(year)}.zip"
+
+            members.setdefault(os.path.join(folder, zip_name), []).append(
+                (dataset.file_name(day), barra_member(day_frames[(key,)], metadata_lines))
+            )
+
+    for zip_path, zip_members in members.items():
+        with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as zip_folder:
+            for member_name, contents in zip_members:
+                zip_folder.writestr(member_name, contents)
+
+
+def write_barra_tables(
+    database: Database,
+    start: dt.date,
+    end: dt.date,
+    n_assets: int,
+    seed: int = 0,
+) -> None:
+    """Cleaned Barra source tables plus the id, id index and Russell tables assets_backfill_flow joins."""
+    rng = np.random.default_rng(seed)
+    days = trading_days(start, end)
+    panel = asset_panel(days, n_assets, rng)
+    raw = barra_frames(panel, rng)
+
+    tables = {
+        "returns": database.barra_returns_table,
+        "specific_returns": database.barra_specific_returns_table,
+        "risk": database.barra_risk_table,
+        "volume": database.barra_volume_table,
+    }
+    for name, table in tables.items():
+        clean = (
+            raw[name]
+            .rename(barra_columns, strict=False)
+            .with_columns(pl.col("date").str.strptime(pl.Date, "%Y%m%d"))
+            .select(table.schema.keys())
+        )
+        for year in range(start.year, end.year + 1):
+            table.write(year, clean.filter(pl.col("date").dt.year().eq(year)))
+
+    ids = barrids(n_assets)
+    listed = dt.date(1990, 1, 1)
+    open_end = dt.date(2099, 12, 31)
+
+    database.asset_ids_table.overwrite(pl.DataFrame({
+        "start_date": [listed] * n_assets,
+        "end_date": [open_end] * n_assets,
+        "rootid": ids,
+        "barrid": ids,
+        "issuerid": [barrid[:6] for barrid in ids],
+        "instrument": rng.choice(["STOCK", "ADR", "REIT"], n_assets),
+        "name": [f"Synthetic Asset {i}" for i in range(n_assets)],
+        "iso_country_code": "USA",
+        "iso_currency_code": "USD",
+    }))
+
+    database.barra_ids_table.overwrite(pl.concat([
+        pl.DataFrame({
+            "barrid": ids,
+            "asset_id_type": "CUSIP",
+            "asset_id": cusips(n_assets),
+            "start_date": [listed] * n_assets,
+            "end_date": [open_end] * n_assets,
+        }),
+        pl.DataFrame({
+            "barrid": ids,
+            "asset_id_type": "LOCALID",
+            "asset_id": [f"US{i:05d}" for i in range(n_assets)],
+            "start_date": [listed] * n_assets,
+            "end_date": [open_end] * n_assets,
+        }),
+    ]))
+
+    database.id_index_table.overwrite(build_id_index(database.barra_ids_table.read_id_file()))
+
+    # Annual reconstitution on the last weekday of June; roughly the top third is the Russell 1000
+    for year in range(start.year, end.year + 1):
+        june = trading_days(dt.date(year, 6, 1), dt.date(year, 6, 30))
+        size_rank = rng.permutation(n_assets)
+        database.ftse_russell_table.write(year, pl.DataFrame({
+            "date": [june[-1]] * n_assets,
+            "cusip": cusips(n_assets),
+            "russell_2000": size_rank >= n_assets // 3,
+            "russell_1000": size_rank < n_assets // 3,
+        }))
+
+
+def write_signal_tables(
+    database: Database,
+    start: dt.date,
+    end: dt.date,
+    n_assets: int,
+    seed: int = 0,
+) -> None:
+    """Alphas and signal weights for composite_alphas_flow, signal returns for signal_weights_flow."""
+    rng = np.random.default_rng(seed)
+    days = trading_days(start, end)
+    panel = asset_panel(days, n_assets, rng)
+
+    alphas = pl.concat([
+        panel.with_columns(
+            pl.lit(signal_name).alias("signal_name"),
+            pl.Series("alpha", rng.normal(0, 0.01, panel.height)),
+        )
+        for signal_name in COMPOSITE_SIGNALS
+    ])
+
+    weights = rng.dirichlet(np.ones(len(COMPOSITE_SIGNALS)), len(days))
+    signal_weights = pl.concat([
+        pl.DataFrame({
+            "date": days,
+            "signal_name": signal_name,
+            "weight": weights[:, i].astype(str),
+        })
+        for i, signal_name in enumerate(COMPOSITE_SIGNALS)
+    ])
+
+    signal_returns = pl.concat([
+        pl.DataFrame({
+            "date": days,
+            "signal_name": signal_name,
+            "forward_return": rng.normal(2e-4, 3e-3, len(days)),
+        })
+        for signal_name in SIGNAL_WEIGHTS_CONFIG["signals"]
+    ])
+
+    for year in range(start.year, end.year + 1):
+        year_filter = pl.col("date").dt.year().eq(year)
+        database.alpha_table.write(year, alphas.filter(year_filter).select(database.alpha_table.schema.keys()))
+        database.signal_weights_table.write(year, signal_weights.filter(year_filter))
+        database.signal_returns_table.write(year, signal_returns.filter(year_filter))
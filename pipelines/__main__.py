@@ -6,11 +6,19 @@ from pipelines.all_pipelines import (
     crsp_backfill_pipeline,
     crsp_v2_backfill_pipeline,
     barra_daily_pipeline,
+    crsp_assets_pipeline,
     fama_french_5_factors_flow,
+    performance_pipeline,
 )
 from pipelines.signals_flow import signals_flow
-from pipelines.utils.enums import DatabaseName
+from pipelines.signal_backtest_flow import signals_backtest_batch_flow
+from pipelines.signals import SIGNALS
+from pipelines.performance_flow import PORTFOLIOS
+from pipelines.utils.enums import DatabaseName, Precision
 from pipelines.utils.tables import Database
+from pipelines.utils.instrumentation import record_run_summary, record_versions
+from pipelines.utils.profiling import enable_profiling
+from pipelines.utils.weights_store import WeightsStore
 
 from dotenv import load_dotenv
 import os
@@ -21,9 +29,28 @@ PIPELINE_TYPES = ["backfill", "update"]
 
 
 @click.group()
-def cli():
+@click.option(
+    "--run-summary",
+    is_flag=True,
+    help="Also record per-stage metrics in the database's run_metrics table.",
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    help="Save query plans, plan graphs and per-node timings of the large collects under logs/profiles.",
+)
+@click.option(
+    "--keep-versions",
+    type=int,
+    default=None,
+    help="Commit a version of every table a flow writes, keeping this many per table (see Table.read(as_of_version=...)).",
+)
+def cli(run_summary, profile, keep_versions):
     """Main CLI entrypoint."""
-    pass
+    record_run_summary(run_summary)
+    record_versions(keep_versions)
+    if profile:
+        click.echo(f"Profiling query plans to {enable_profiling()}.")
 
 
 @cli.command()
@@ -276,7 +303,200 @@ def signals(pipeline_type, database, start, end):
             database_name = DatabaseName(database)
             database_instance = Database(database_name)
 
-            signals_flow(start, end, database_instance)
+            signals_flow(database_instance)
+
+
+
+@cli.command()
+@click.argument(
+    "pipeline_type", type=click.Choice(PIPELINE_TYPES, case_sensitive=False)
+)
+@click.option(
+    "--database",
+    type=click.Choice(VALID_DATABASES, case_sensitive=False),
+    required=True,
+    help="Target database (research, production, or development).",
+)
+@click.option(
+    "--start",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    default=str(dt.date(1995, 7, 31)),
+    show_default=True,
+    help="Start date (YYYY-MM-DD).",
+)
+@click.option(
+    "--end",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    default=str(dt.date.today()),
+    show_default=True,
+    help="End date (YYYY-MM-DD).",
+)
+def crsp_assets(pipeline_type, database, start, end):
+    """Assets panel with CRSP daily fields attached through the id index."""
+    start = start.date() if hasattr(start, "date") else start
+    end = end.date() if hasattr(end, "date") else end
+
+    database_name = DatabaseName(database)
+    database_instance = Database(database_name)
+
+    match pipeline_type:
+        case "backfill":
+            click.echo(f"Running crsp assets backfill on '{database}' from {start} to {end}.")
+            crsp_assets_pipeline(start, end, database_instance, incremental=False)
+
+        case "update":
+            click.echo(f"Running crsp assets update for {database} database.")
+            crsp_assets_pipeline(start, end, database_instance)
+
+@cli.command()
+@click.option(
+    "--database",
+    type=click.Choice(VALID_DATABASES, case_sensitive=False),
+    required=True,
+    help="Database to read assets and alphas from (research, production, or development).",
+)
+@click.option(
+    "--signal",
+    "signal_names",
+    type=click.Choice(list(SIGNALS)),
+    multiple=True,
+    help="Signal to backtest (repeatable). Every signal by default.",
+)
+@click.option(
+    "--start",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    default=str(dt.date(1996, 7, 31)),
+    show_default=True,
+    help="Start date (YYYY-MM-DD).",
+)
+@click.option(
+    "--end",
+    type=click.DateTime(formats=["%Y-%m-%d"]),
+    default=str(dt.date.today()),
+    show_default=True,
+    help="End date (YYYY-MM-DD).",
+)
+@click.option("--active-risk", type=float, default=0.05, show_default=True, help="Backtest risk target.")
+@click.option("--workers", type=int, default=None, help="Worker processes. One per CPU by default.")
+@click.option(
+    "--overwrite",
+    is_flag=True,
+    help="Allow replacing stored weights dated after --end, which the backtest would otherwise refuse to drop.",
+)
+def backtest(database, signal_names, start, end, active_risk, workers, overwrite):
+    """Backtest signals in process from one shared copy of the inputs, writing their weights stores."""
+    start = start.date() if hasattr(start, "date") else start
+    end = end.date() if hasattr(end, "date") else end
+    signal_names = list(signal_names or SIGNALS)
+
+    click.echo(f"Backtesting {len(signal_names)} signals on '{database}' from {start} to {end}.")
+    signals_backtest_batch_flow(
+        start,
+        end,
+        signal_names,
+        Database(DatabaseName(database)),
+        target_active_risk=active_risk,
+        max_workers=workers,
+        overwrite=overwrite,
+    )
+
+
+@cli.command()
+@click.option(
+    "--database",
+    type=click.Choice(VALID_DATABASES, case_sensitive=False),
+    required=True,
+    help="Database to read assets from and write performance to (research, production, or development).",
+)
+@click.option(
+    "--portfolio",
+    "portfolios",
+    type=click.Choice(PORTFOLIOS),
+    multiple=True,
+    help="Backtested portfolio to report (repeatable). The composite and every signal by default.",
+)
+@click.option("--active-risk", type=float, default=0.05, show_default=True, help="Backtest risk target.")
+@click.option("--weights-dir", default="weights", show_default=True, help="Root of the weights stores.")
+def performance(database, portfolios, active_risk, weights_dir):
+    """Signal returns, performance and factor attribution for the backtested portfolios."""
+    portfolios = list(portfolios or PORTFOLIOS)
+
+    click.echo(f"Updating performance of {len(portfolios)} portfolios on '{database}'.")
+    performance_pipeline(portfolios, Database(DatabaseName(database)), active_risk, weights_dir)
+
+
+@cli.command()
+@click.option(
+    "--signal",
+    "signal_names",
+    multiple=True,
+    help="Signal whose weights to compact (repeatable). Every signal by default.",
+)
+@click.option("--active-risk", type=float, default=0.05, show_default=True, help="Backtest risk target.")
+@click.option("--weights-dir", default="weights", show_default=True, help="Root of the weights stores.")
+def compact_weights(signal_names, active_risk, weights_dir):
+    """Move finished sf_backtester weight files into each signal's weights store."""
+    for signal_name in signal_names or SIGNALS:
+        store = WeightsStore(signal_name, active_risk, root=weights_dir)
+        n_files = len(store.pending())
+        if n_files:
+            store.compact()
+            click.echo(f"Compacted {n_files} files into the '{signal_name}' weights store.")
+
+
+@cli.command()
+@click.option(
+    "--database",
+    type=click.Choice(VALID_DATABASES, case_sensitive=False),
+    required=True,
+    help="Database to rewrite (research, production, or development).",
+)
+@click.option(
+    "--precision",
+    type=click.Choice([precision.value for precision in Precision], case_sensitive=False),
+    default=None,
+    help="Precision to rewrite into. ASSETS_PRECISION (or full) by default.",
+)
+def rewrite_precision(database, precision):
+    """Rewrite the assets tables in one precision, e.g. after changing ASSETS_PRECISION."""
+    database_instance = Database(DatabaseName(database), Precision(precision) if precision else None)
+    names = database_instance.rewrite_precision()
+    click.echo(f"Rewrote {', '.join(names)} on '{database}'.")
+
+
+@cli.command()
+@click.argument("direction", type=click.Choice(["push", "pull"], case_sensitive=False))
+@click.option(
+    "--database",
+    type=click.Choice(VALID_DATABASES, case_sensitive=False),
+    required=True,
+    help="Database to sync (research, production, or development).",
+)
+@click.option("--bucket", required=True, help="S3 bucket holding the mirror.")
+@click.option(
+    "--workers",
+    type=int,
+    default=8,
+    show_default=True,
+    help="Concurrent file transfers.",
+)
+@click.option(
+    "--delete",
+    is_flag=True,
+    help="On push, also remove objects whose local file is gone.",
+)
+def sync(direction, database, bucket, workers, delete):
+    """Mirror a database to an S3 bucket (push) or back (pull), skipping unchanged files."""
+    database_instance = Database(DatabaseName(database))
+
+    match direction:
+        case "push":
+            keys = database_instance.push(bucket, max_workers=workers, delete=delete)
+            click.echo(f"Uploaded {len(keys)} changed files from '{database}' to {bucket}.")
+
+        case "pull":
+            keys = database_instance.pull(bucket, max_workers=workers)
+            click.echo(f"Downloaded {len(keys)} changed files from {bucket} to '{database}'.")
 
 
 if __name__ == "__main__":
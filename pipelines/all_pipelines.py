@@ -8,6 +8,8 @@ from pipelines.barra_exposures_flow import (
     barra_exposures_history_flow,
 )
 from pipelines.barra_ids_flow import barra_asset_ids_daily_flow
+from pipelines.id_index_flow import id_index_flow
+from pipelines.crsp_assets_flow import crsp_assets_flow
 from pipelines.barra_returns_flow import barra_returns_daily_flow, barra_returns_history_flow
 from pipelines.barra_risk_flow import barra_risk_daily_flow, barra_risk_history_flow
 from pipelines.ftse_russell_flow import ftse_russell_backfill_flow
@@ -20,14 +22,19 @@ from pipelines.assets_flow import assets_backfill_flow
 from pipelines.crsp_daily_flow import crsp_daily_backfill_flow
 from pipelines.crsp_monthly_flow import crsp_monthly_backfill_flow
 from pipelines.crsp_events_flow import crsp_events_backfill_flow
+from pipelines.crsp_names_flow import crsp_names_backfill_flow, crsp_v2_names_backfill_flow
 from pipelines.crsp_v2_daily_flow import crsp_v2_daily_backfill_flow
 from pipelines.crsp_v2_monthly_flow import crsp_v2_monthly_backfill_flow
 from pipelines.barra_factors_flow import barra_factors_daily_flow
 from pipelines.fama_french_flow import fama_french_5_factors_flow
+from pipelines.signal_returns_flow import signal_returns_flow
+from pipelines.performance_flow import performance_flow
 import datetime as dt
 from pipelines.utils.tables import Database
+from pipelines.utils.instrumentation import instrumented
 
 
+@instrumented
 def barra_daily_flow(database: Database) -> None:
     # Assets table
     barra_returns_daily_flow(database)
@@ -43,6 +50,7 @@ def barra_daily_flow(database: Database) -> None:
     barra_factors_daily_flow(database)
 
 
+@instrumented
 def barra_history_flow(
     start_date: dt.date, end_date: dt.date, database: Database
 ) -> None:
@@ -51,18 +59,20 @@ def barra_history_flow(
     barra_specific_returns_history_flow(start_date, end_date, database)
     barra_risk_history_flow(start_date, end_date, database)
     barra_volume_history_flow(start_date, end_date, database)
-    assets_backfill_flow(start_date, end_date, database)
 
     # Covariance Matrix Components
     barra_exposures_history_flow(start_date, end_date, database)
     barra_covariances_history_flow(start_date, end_date, database)
 
 
+@instrumented
 def id_mappings_flow(database: Database) -> None:
     barra_asset_ids_daily_flow(database)
     barra_assets_daily_flow(database)
+    id_index_flow(database)
 
 
+@instrumented
 def ftse_history_flow(
     start_date: dt.date, end_date: dt.date, database: Database, user: str
 ) -> None:
@@ -70,28 +80,34 @@ def ftse_history_flow(
     ftse_russell_backfill_flow(start_date, end_date, database)
 
 
+@instrumented
 def crsp_history_flow(
     start_date: dt.date, end_date: dt.date, database: Database, user: str
 ) -> None:
     """Note: requires logging in to WRDS when running."""
     crsp_events_backfill_flow(start_date, end_date, database, user)
+    crsp_names_backfill_flow(start_date, end_date, database, user)
     crsp_monthly_backfill_flow(start_date, end_date, database, user)
     crsp_daily_backfill_flow(start_date, end_date, database, user)
 
+@instrumented
 def crsp_v2_history_flow(
     start_date: dt.date, end_date: dt.date, database: Database, user: str
 ) -> None:
     """Note: requires logging in to WRDS when running."""
+    crsp_v2_names_backfill_flow(start_date, end_date, database, user)
     crsp_v2_daily_backfill_flow(start_date, end_date, database, user)
     crsp_v2_monthly_backfill_flow(start_date, end_date, database, user)
 
 
+@instrumented
 def barra_daily_pipeline(database: Database) -> None:
     barra_daily_flow(database)
     id_mappings_flow(database)
     assets_backfill_flow(dt.date(1995, 7, 31), dt.date.today(), database)
 
 
+@instrumented
 def barra_backfill_pipeline(
     start_date: dt.date, end_date: dt.date, database: Database
 ) -> None:
@@ -100,18 +116,39 @@ def barra_backfill_pipeline(
     assets_backfill_flow(start_date, end_date, database)
 
 
+@instrumented
 def ftse_backfill_pipeline(
     start_date: dt.date, end_date: dt.date, database: Database, user: str
 ) -> None:
     ftse_history_flow(start_date, end_date, database, user)
 
 
+@instrumented
 def crsp_backfill_pipeline(
     start_date: dt.date, end_date: dt.date, database: Database, user: str
 ) -> None:
     crsp_history_flow(start_date, end_date, database, user)
 
+@instrumented
 def crsp_v2_backfill_pipeline(
     start_date: dt.date, end_date: dt.date, database: Database, user: str
 ) -> None:
     crsp_v2_history_flow(start_date, end_date, database, user)
+
+
+@instrumented
+def crsp_assets_pipeline(
+    start_date: dt.date, end_date: dt.date, database: Database, incremental: bool = True
+) -> None:
+    """Refresh the id index against the latest CRSP rows, then extend crsp_assets."""
+    id_index_flow(database)
+    crsp_assets_flow(start_date, end_date, database, incremental)
+
+
+@instrumented
+def performance_pipeline(
+    portfolios: list[str], database: Database, active_risk: float = 0.05, weights_dir: str = "weights"
+) -> None:
+    """Extend the backtested portfolios' signal returns, then their performance and attribution."""
+    signal_returns_flow(portfolios, database, active_risk, weights_dir=weights_dir)
+    performance_flow(portfolios, database, active_risk, weights_dir=weights_dir)
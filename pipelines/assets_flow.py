@@ -1,51 +1,49 @@
 from datetime import date
 import polars as pl
 from pipelines.utils.tables import Database
+from pipelines.utils.instrumentation import instrumented, stage
+from pipelines.utils.profiling import collect_profiled
+from pipelines.utils.id_index import interval_segments, join_segments
 from tqdm import tqdm
 
-def assets_backfill_flow(start_date: date, end_date: date, database: Database) -> None:
+def assets_plan(start_date: date, end_date: date, database: Database, encode: bool = True) -> pl.LazyFrame:
     """
-    Materialize assets table by combining data from multiple sources.
+    Lazy plan combining every assets source.
 
-    Strategy:
-    1. Lazy scan all sources at once
-    2. Chain all lazy joins on all data
-    3. Collect once on all data
-    4. Per year: filter, finalize, and write to parquet
+    With encode, each source is narrowed to the assets table's storage dtypes
+    as it is scanned, so the joins run on the compact columns. Tickers and
+    cusips come from the id_index table, so id_index_flow must have run.
     """
-    years = list(range(start_date.year, end_date.year + 1))
+    if not database.id_index_table.id_file_exists():
+        raise ValueError("The id_index table has not been built. Run id_index_flow first.")
+
+    narrow = database.assets_table.encode if encode else (lambda frame: frame)
 
     # Step 1: Lazy scan all sources
-    returns_lazy = database.barra_returns_table.read().filter(pl.col('date').is_between(start_date, end_date))
-    specific_returns_lazy = database.barra_specific_returns_table.read().filter(pl.col('date').is_between(start_date, end_date))
-    risk_lazy = database.barra_risk_table.read().filter(pl.col('date').is_between(start_date, end_date))
-    volume_lazy = database.barra_volume_table.read().filter(pl.col('date').is_between(start_date, end_date))
-    asset_ids_lazy = database.asset_ids_table.read_id_file()
-    barra_ids_lazy = database.barra_ids_table.read_id_file()
+    returns_lazy = database.barra_returns_table.read().filter(pl.col('date').is_between(start_date, end_date)).pipe(narrow)
+    specific_returns_lazy = database.barra_specific_returns_table.read().filter(pl.col('date').is_between(start_date, end_date)).pipe(narrow)
+    risk_lazy = database.barra_risk_table.read().filter(pl.col('date').is_between(start_date, end_date)).pipe(narrow)
+    volume_lazy = database.barra_volume_table.read().filter(pl.col('date').is_between(start_date, end_date)).pipe(narrow)
+    asset_ids_lazy = database.asset_ids_table.read_id_file().pipe(narrow)
+    id_index_lazy = database.id_index_table.read_id_file()
     ftse_russell_lazy = database.ftse_russell_table.read()
 
     # Step 2: Create secondary lazy frames
     barra_tickers = (
-        barra_ids_lazy
-        .filter(
-            pl.col("asset_id_type").eq("LOCALID"),
-            pl.col("barrid").str.starts_with('US')
-        )
-        .drop('asset_id_type')
-        .rename({"asset_id": "ticker"})
-        .with_columns(pl.col("ticker").str.replace("US", "")) # Only works for US securities
+        id_index_lazy
+        .filter(pl.col("id_type").eq("TICKER"))
+        .select("barrid", pl.col("id").alias("ticker"), "start_date", "end_date")
     )
 
     barra_cusips = (
-        barra_ids_lazy
-        .filter(
-            pl.col("asset_id_type").eq("CUSIP"),
-            pl.col("barrid").str.starts_with('US')
-        )
-        .drop('asset_id_type')
-        .rename({"asset_id": "cusip"})
+        id_index_lazy
+        .filter(pl.col("id_type").eq("CUSIP"))
+        .select("barrid", pl.col("id").alias("cusip"), "start_date", "end_date")
     )
 
+    # Asset ids, tickers and cusips cut into one set of segments per barrid
+    id_segments = interval_segments([asset_ids_lazy, barra_tickers, barra_cusips])
+
     russell_rebalance_dates = (
         ftse_russell_lazy
         .select("date", pl.lit(True).alias("russell_rebalance"))
@@ -73,53 +71,19 @@ def assets_backfill_flow(start_date: date, end_date: date, database: Database) -
         )
     )
 
-    # Step 4: Perform complex lazy join_asofs
-    combined = (
-        combined
-        # Join asset ids table
-        .sort('date', 'barrid')
-        .join_asof(
-            other=asset_ids_lazy.sort('barrid', 'start_date'),
-            left_on="date",
-            right_on="start_date",
-            by="barrid",
-            strategy="backward"
-        )
-        .drop('start_date', 'end_date')
-        # Join tickers
-        .sort('date', 'barrid')
-        .join_asof(
-            other=barra_tickers.sort('barrid', 'start_date'),
-            left_on="date",
-            right_on="start_date",
-            by="barrid",
-            strategy="backward"
-        )
-        .drop('start_date', 'end_date')
-        # Join cusips
-        .sort('date', 'barrid')
-        .join_asof(
-            other=barra_cusips.sort('barrid', 'start_date'),
-            left_on="date",
-            right_on="start_date",
-            by="barrid",
-            strategy="backward"
-        )
-    )
+    # Step 4: Attach every id source in force on each date in one as-of pass
+    combined = join_segments(combined, id_segments)
 
     # Step 5: Join raw ftse_russell and perform rebalance aware constituency forward fill
     combined = (
         combined
-        .drop('start_date', 'end_date')
         # Join ftse russell data
-        .sort('date', 'barrid')
         .join(
             other=ftse_russell_lazy,
             on=['date', 'cusip'],
             how='left'
         )
         # Join russell rebalance dates
-        .sort('date', 'barrid')
         .join(russell_rebalance_dates, on="date", how="left")
         # Forward fill russell constituency
         .with_columns(
@@ -138,15 +102,43 @@ def assets_backfill_flow(start_date: date, end_date: date, database: Database) -
             pl.col("russell_1000").or_(pl.col("russell_2000")).alias("in_universe")
         )
         .drop("russell_rebalance")
+        # Pack membership flags
+        .pipe(narrow)
     )
 
-    combined_eager = combined.collect()
+    return combined
 
-    # Step 6: Per year, filter and write to parquet
+
+@instrumented
+def assets_backfill_flow(start_date: date, end_date: date, database: Database) -> None:
+    """
+    Materialize assets table by combining data from multiple sources.
+
+    Strategy:
+    1. Lazy scan all sources, narrowed to the storage dtypes
+    2. Chain all lazy joins on all data
+    3. Collect once on all data
+    4. Per year: filter and write to parquet
+    """
+    years = list(range(start_date.year, end_date.year + 1))
+
+    with stage("assets_join"):
+        combined_eager = collect_profiled(assets_plan(start_date, end_date, database), "assets")
+
+    # Per year, filter and write to parquet
     for year in tqdm(years, desc="Assets Backfill"):
-        database.assets_table.delete(year)
         year_data = combined_eager.filter(pl.col("date").dt.year().eq(year))
-        year_data.write_parquet(database.assets_table._file_path(year))
+        database.assets_table.write(year, year_data)
+
+
+def assets_precision_report(year: int, database: Database) -> pl.DataFrame:
+    """Max error the assets storage policy introduces on one year of full precision data."""
+    storage_policy = database.assets_table.storage_policy
+    if storage_policy is None:
+        raise ValueError("The assets table is stored at full precision.")
+
+    full_precision = assets_plan(date(year, 1, 1), date(year, 12, 31), database, encode=False).collect()
+    return storage_policy.report(full_precision)
 
 if __name__ == '__main__':
     from pipelines.utils.enums import DatabaseName
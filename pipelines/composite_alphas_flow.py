@@ -1,54 +1,159 @@
 import polars as pl
+import numpy as np
 import datetime as dt
-from utils.tables import Database
+from pipelines.utils.tables import Database
+from pipelines.utils.profiling import collect_profiled
 from tqdm import tqdm
 
-SIGNALS = ['barra_reveral', 'beta', 'ivol']
+SIGNALS = ['barra_reversal', 'beta', 'ivol']
 
-def composite_alphas_flow(start: dt.date, end: dt.date, database: Database):
-    signal_weights = (
-        database.signal_weights_table.read()
-        .filter(
-            pl.col('date').is_between(start, end),
-            pl.col('signal_name').is_in(SIGNALS)
-        )
-        .cast({'weight': pl.Float64})
-        .drop_nans()
-        .sort('date', 'signal_name')
-        .collect()
+# How a (date, barrid) row with missing (null) signal alphas is combined:
+# - zero: missing alphas contribute nothing (previous inner-join behavior)
+# - renormalize: rescale by the weight of the signals that are present
+# - drop: only keep rows that have an alpha for every signal
+NULL_POLICIES = ['zero', 'renormalize', 'drop']
+
+
+def composite_alpha_matrix(
+    alphas_wide: pl.DataFrame,
+    weights_wide: pl.DataFrame,
+    signals: list[str],
+    null_policy: str = 'zero',
+) -> pl.DataFrame:
+    """
+    Apply each date's signal weight vector to that date's alpha matrix.
+
+    alphas_wide is (date, barrid) x signal sorted by date, weights_wide is date x signal.
+    Rows are aligned to their weight vector with a sorted search on date, so the
+    composite is a single elementwise product and row sum over an n x k matrix.
+
+    Only null alphas are missing. A NaN alpha makes its row's composite NaN, as the
+    inner-join sum did. Under 'zero', a row is kept when its date has a weight for
+    any signal, so rows whose alphas are all null get a composite of 0.
+    """
+    if null_policy not in NULL_POLICIES:
+        raise ValueError(f"Unknown null policy '{null_policy}'. Expected one of {NULL_POLICIES}.")
+
+    # Align rows to weight vectors; dates without weights are dropped
+    weight_dates = weights_wide['date']
+    date_idx = weight_dates.search_sorted(alphas_wide['date']).to_numpy()
+    date_idx = np.minimum(date_idx, len(weight_dates) - 1)
+    has_weights = (weight_dates.gather(date_idx) == alphas_wide['date']).to_numpy()
+
+    alphas_wide = alphas_wide.filter(has_weights)
+    date_idx = date_idx[has_weights]
+
+    alpha_matrix = alphas_wide.select(signals).cast(pl.Float64).fill_null(0).to_numpy()
+    present = alphas_wide.select(pl.col(signals).is_not_null()).to_numpy()
+    weights = weights_wide.select(signals).cast(pl.Float64).fill_nan(None)
+    weighted = weights.select(pl.all().is_not_null()).to_numpy()[date_idx]
+    weight_matrix = weights.fill_null(0).to_numpy()[date_idx]
+
+    composite = np.where(weighted, alpha_matrix * weight_matrix, 0.0).sum(axis=1)
+
+    keep = weighted.any(axis=1)
+    match null_policy:
+        case 'renormalize':
+            present_weight = (weight_matrix * present).sum(axis=1)
+            keep &= present_weight != 0
+            composite = np.divide(
+                composite * weight_matrix.sum(axis=1),
+                present_weight,
+                out=np.zeros_like(composite),
+                where=present_weight != 0,
+            )
+        case 'drop':
+            keep &= present.all(axis=1)
+
+    return (
+        alphas_wide
+        .select('date', 'barrid')
+        .with_columns(pl.Series('alpha', composite))
+        .filter(keep)
     )
 
-    alphas = (
-        database.alpha_table.read()
-        .filter(
-            pl.col('signal_name').is_in(SIGNALS),
-            pl.col('date').is_between(start, end)
+
+def composite_alphas_flow(
+    start: dt.date,
+    end: dt.date,
+    database: Database,
+    null_policy: str = 'zero',
+    incremental: bool = False,
+):
+    """
+    Materialize composite alphas from per-signal alphas and signal weights.
+
+    By default every year in [start, end] is recomputed, so revised alphas or
+    weights are picked up. With incremental=True only dates after the last
+    stored composite alpha are computed and revised history is left as is.
+
+    Strategy:
+    1. When incremental, start the day after the last stored composite alpha
+    2. Per year: pivot alphas into a (date, barrid) x signal matrix and weights into a date x signal matrix
+    3. Apply each date's weight vector to its alpha rows with a vectorized product
+    4. Upsert the year, so only one year of alphas is in memory at a time
+    """
+    if incremental:
+        last_date = database.composite_alphas_table.last_date()
+        if last_date is not None:
+            start = max(start, last_date + dt.timedelta(days=1))
+
+    if start > end:
+        return
+
+    for year in tqdm(range(start.year, end.year + 1), desc="Composite Alphas"):
+        year_start = max(start, dt.date(year, 1, 1))
+        year_end = min(end, dt.date(year, 12, 31))
+
+        signal_weights = (
+            collect_profiled(
+                database.signal_weights_table.read()
+                .filter(
+                    pl.col('date').is_between(year_start, year_end),
+                    pl.col('signal_name').is_in(SIGNALS)
+                )
+                .cast({'weight': pl.Float64}),
+                f"composite_signal_weights_{year}",
+            )
+            .pivot(index='date', on='signal_name', values='weight')
+            .sort('date')
         )
-        .sort('date', 'barrid', 'signal_name')
-        .collect()
-    )
 
-    composite_alphas = (
-        alphas
-        .join(signal_weights, on=['date', 'signal_name'], how='inner') # It would be better if this was "left" and we knew how to deal with weird values.
-        .group_by('date', 'barrid')
-        .agg(
-            pl.col('alpha').mul(pl.col('weight')).sum()
+        alphas = (
+            collect_profiled(
+                database.alpha_table.read()
+                .filter(
+                    pl.col('signal_name').is_in(SIGNALS),
+                    pl.col('date').is_between(year_start, year_end)
+                )
+                .select('date', 'barrid', 'signal_name', 'alpha'),
+                f"composite_alphas_{year}",
+            )
+            .pivot(index=['date', 'barrid'], on='signal_name', values='alpha')
+            .sort('date', 'barrid')
         )
-        .sort('date', 'barrid')
-    )
 
-    years = composite_alphas['date'].dt.year().unique().sort().to_list()
+        if signal_weights.is_empty() or alphas.is_empty():
+            continue
+
+        # Signals missing for the whole year are all-null columns
+        signal_weights = signal_weights.with_columns(
+            pl.lit(None, dtype=pl.Float64).alias(signal)
+            for signal in SIGNALS if signal not in signal_weights.columns
+        )
+        alphas = alphas.with_columns(
+            pl.lit(None, dtype=pl.Float64).alias(signal)
+            for signal in SIGNALS if signal not in alphas.columns
+        )
 
-    for year in tqdm(years, desc="Signal Returns"):
-        year_df = composite_alphas.filter(pl.col("date").dt.year().eq(year))
+        year_df = composite_alpha_matrix(alphas, signal_weights, SIGNALS, null_policy)
 
         database.composite_alphas_table.create_if_not_exists(year)
         database.composite_alphas_table.upsert(year, year_df)
 
 if __name__ == '__main__':
-    from utils.tables import DatabaseName
+    from pipelines.utils.enums import DatabaseName
     db = Database(DatabaseName.DEVELOPMENT)
     start = dt.date(2000, 1, 1)
     end = dt.date(2024, 12, 31)
-    composite_alphas_flow(start, end, db)
\ No newline at end of file
+    composite_alphas_flow(start, end, db)
@@ -0,0 +1,112 @@
+import datetime as dt
+import polars as pl
+from tqdm import tqdm
+from pipelines.utils.id_index import lookup_ids
+from pipelines.utils.tables import Database, Table
+from pipelines.utils.instrumentation import instrumented
+from pipelines.utils.profiling import collect_profiled
+
+# CRSP daily fields attached to the panel, by their names in crsp_assets
+CRSP_COLUMNS = {
+    "ret": "crsp_ret",
+    "retx": "crsp_retx",
+    "prc": "crsp_prc",
+    "vol": "crsp_vol",
+    "shrout": "crsp_shrout",
+}
+
+
+def crsp_daily_source(database: Database) -> Table | None:
+    """crsp_daily, or crsp_v2_daily when only that one has been backfilled, or None."""
+    return next(
+        (table for table in [database.crsp_daily_table, database.crsp_v2_daily_table] if table.years()),
+        None,
+    )
+
+
+def last_crsp_date(database: Database) -> dt.date | None:
+    """Latest date of crsp_assets with CRSP fields attached, or None if there is none."""
+    if not database.crsp_assets_table.years():
+        return None
+
+    return (
+        database.crsp_assets_table.read()
+        .filter(pl.any_horizontal(pl.col(CRSP_COLUMNS.values()).is_not_null()))
+        .select(pl.col("date").max())
+        .collect()
+        .item()
+    )
+
+
+@instrumented
+def crsp_assets_flow(
+    start: dt.date,
+    end: dt.date,
+    database: Database,
+    incremental: bool = True,
+) -> None:
+    """
+    Materialize crsp_assets: the assets panel with the permno each barrid
+    mapped to on each date (from id_index) and that permno's CRSP daily
+    returns, price, volume and shares outstanding.
+
+    Strategy:
+    1. When incremental, start the day after the last date with CRSP fields,
+       so days whose CRSP data arrived after the Barra data are filled in
+    2. Per year: attach permnos with one as-of lookup against id_index
+    3. Left join the year's CRSP rows on (date, permno)
+    4. Upsert the year, so only one year of the panel is in memory at a time
+
+    Needs id_index (see id_index_flow), with permnos from a backfilled
+    crsp_names, and a backfilled CRSP daily table.
+    """
+    crsp_table = crsp_daily_source(database)
+    if crsp_table is None:
+        raise ValueError("Neither crsp_daily nor crsp_v2_daily has been backfilled.")
+
+    if incremental:
+        last_date = last_crsp_date(database)
+        if last_date is not None:
+            start = max(start, last_date + dt.timedelta(days=1))
+
+    if start > end:
+        return
+
+    index = database.id_index_table.read_id_file()
+
+    for year in tqdm(range(start.year, end.year + 1), desc="CRSP Assets"):
+        if not database.assets_table.exists(year):
+            continue
+
+        year_start = max(start, dt.date(year, 1, 1))
+        year_end = min(end, dt.date(year, 12, 31))
+
+        panel = lookup_ids(
+            database.assets_table.read(year).filter(pl.col("date").is_between(year_start, year_end)),
+            index,
+            "PERMNO",
+        )
+
+        if crsp_table.exists(year):
+            crsp = (
+                crsp_table.read(year)
+                .filter(pl.col("date").is_between(year_start, year_end))
+                .select("date", "permno", *CRSP_COLUMNS)
+                .rename(CRSP_COLUMNS)
+            )
+            panel = panel.join(crsp, on=["date", "permno"], how="left")
+
+        panel = collect_profiled(panel, f"crsp_assets_{year}")
+
+        if panel.is_empty():
+            continue
+
+        database.crsp_assets_table.create_if_not_exists(year)
+        database.crsp_assets_table.upsert(year, panel)
+
+
+if __name__ == '__main__':
+    from pipelines.utils.enums import DatabaseName
+
+    db = Database(DatabaseName.DEVELOPMENT)
+    crsp_assets_flow(dt.date(1995, 7, 31), dt.date.today(), db)
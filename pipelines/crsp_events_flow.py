@@ -4,6 +4,7 @@ import polars as pl
 import wrds
 from tqdm import tqdm
 from pipelines.utils.tables import Database
+from pipelines.utils.instrumentation import instrumented
 
 
 def load_crsp_events_df(start_date: date, end_date: date, user: str) -> pl.DataFrame:
@@ -28,6 +29,7 @@ def load_crsp_events_df(start_date: date, end_date: date, user: str) -> pl.DataF
     return df
 
 
+@instrumented
 def crsp_events_backfill_flow(
     start_date: date, end_date: date, database: Database, user: str
 ) -> None:
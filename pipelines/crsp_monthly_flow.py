@@ -4,6 +4,7 @@ import polars as pl
 import wrds
 from tqdm import tqdm
 from pipelines.utils.tables import Database
+from pipelines.utils.instrumentation import instrumented
 
 
 def load_crsp_monthly_df(start_date: date, end_date: date, user: str) -> pl.DataFrame:
@@ -30,6 +31,7 @@ def load_crsp_monthly_df(start_date: date, end_date: date, user: str) -> pl.Data
     return df
 
 
+@instrumented
 def crsp_monthly_backfill_flow(
     start_date: date, end_date: date, database: Database, user: str
 ) -> None:
@@ -0,0 +1,73 @@
+from datetime import date
+from pipelines.utils import crsp_schema
+import polars as pl
+import wrds
+from pipelines.utils.tables import Database
+from pipelines.utils.instrumentation import instrumented
+
+
+def load_crsp_names_df(start_date: date, end_date: date, user: str) -> pl.DataFrame:
+    wrds_db = wrds.Connection(wrds_username=user)
+
+    df = wrds_db.raw_sql(
+        f"""
+            SELECT
+                permno,
+                namedt,
+                nameendt,
+                ncusip,
+                ticker
+            FROM crsp_m_stock.dsenames a
+            WHERE a.nameendt >= '{start_date}' AND a.namedt <= '{end_date}'
+            ;
+            """
+    )
+    df = pl.from_pandas(df, schema_overrides=crsp_schema)
+
+    return df
+
+
+def load_crsp_v2_names_df(start_date: date, end_date: date, user: str) -> pl.DataFrame:
+    """The CIZ security information history, under the legacy dsenames column names."""
+    wrds_db = wrds.Connection(wrds_username=user)
+
+    df = wrds_db.raw_sql(
+        f"""
+            SELECT
+                permno,
+                secinfostartdt AS namedt,
+                secinfoenddt AS nameendt,
+                cusip AS ncusip,
+                ticker
+            FROM crsp_m_stock.stksecurityinfohist a
+            WHERE a.secinfoenddt >= '{start_date}' AND a.secinfostartdt <= '{end_date}'
+            ;
+            """
+    )
+    df = pl.from_pandas(df, schema_overrides=crsp_schema)
+
+    return df
+
+
+@instrumented
+def crsp_names_backfill_flow(
+    start_date: date, end_date: date, database: Database, user: str
+) -> None:
+    """
+    Every CRSP name record in force between start_date and end_date. Unlike
+    the cusip column of crsp_daily, which is the permno's current (header)
+    CUSIP on every date, ncusip is the CUSIP the security had at the time.
+    """
+    df = load_crsp_names_df(start_date, end_date, user)
+
+    database.crsp_names_table.overwrite(df.sort("permno", "namedt"))
+
+
+@instrumented
+def crsp_v2_names_backfill_flow(
+    start_date: date, end_date: date, database: Database, user: str
+) -> None:
+    """crsp_names_backfill_flow from the CIZ (v2) security information history."""
+    df = load_crsp_v2_names_df(start_date, end_date, user)
+
+    database.crsp_names_table.overwrite(df.sort("permno", "namedt"))
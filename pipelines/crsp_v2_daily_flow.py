@@ -4,6 +4,7 @@ import polars as pl
 import wrds
 from tqdm import tqdm
 from pipelines.utils.tables import Database
+from pipelines.utils.instrumentation import instrumented
 
 
 def load_crsp_v2_daily_df(start_date: date, end_date: date, user: str) -> pl.DataFrame:
@@ -37,6 +38,7 @@ def load_crsp_v2_daily_df(start_date: date, end_date: date, user: str) -> pl.Dat
     return df
 
 
+@instrumented
 def crsp_v2_daily_backfill_flow(
     start_date: date, end_date: date, database: Database, user: str
 ) -> None:
@@ -4,6 +4,7 @@ import polars as pl
 import wrds
 from tqdm import tqdm
 from pipelines.utils.tables import Database
+from pipelines.utils.instrumentation import instrumented
 
 
 def load_crsp_v2_monthly_df(start_date: date, end_date: date, user: str) -> pl.DataFrame:
@@ -33,6 +34,7 @@ def load_crsp_v2_monthly_df(start_date: date, end_date: date, user: str) -> pl.D
     return df
 
 
+@instrumented
 def crsp_v2_monthly_backfill_flow(
     start_date: date, end_date: date, database: Database, user: str
 ) -> None:
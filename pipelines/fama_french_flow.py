@@ -4,9 +4,11 @@ from pathlib import Path
 import polars as pl
 import io
 from pipelines.utils.tables import Database
+from pipelines.utils.instrumentation import instrumented
 from pipelines.utils.enums import DatabaseName
 
 
+@instrumented
 def fama_french_5_factors_flow(database: Database) -> None:
     """
     Download and process Fama-French 5-factor daily data.
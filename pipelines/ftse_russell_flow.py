@@ -4,6 +4,7 @@ import polars as pl
 import wrds
 from tqdm import tqdm
 from pipelines.utils.tables import Database
+from pipelines.utils.instrumentation import instrumented
 import os
 
 
@@ -33,6 +34,7 @@ def clean(df: pl.DataFrame) -> pl.DataFrame:
     )
 
 
+@instrumented
 def ftse_russell_backfill_flow(
     start_date: date, end_date: date, database: Database
 ) -> None:
@@ -0,0 +1,30 @@
+from pipelines.utils.id_index import build_id_index
+from pipelines.utils.tables import Database
+from pipelines.utils.instrumentation import instrumented
+
+
+@instrumented
+def id_index_flow(database: Database) -> None:
+    """
+    Rebuild the id_index table from barra_ids, bridging to permno through
+    the historical CUSIPs in crsp_names when it has been backfilled (see
+    crsp_names_backfill_flow). Run after every barra_ids refresh.
+
+    A barrid maps to a permno on the dates both Barra and CRSP recorded the
+    same 8 character CUSIP for it, so the mapping follows CUSIP changes. It
+    ends where the CRSP name history ends, i.e. at its last backfill.
+    """
+    crsp_names = None
+    if database.crsp_names_table.id_file_exists():
+        crsp_names = database.crsp_names_table.read_id_file()
+
+    index = build_id_index(database.barra_ids_table.read_id_file(), crsp_names)
+
+    database.id_index_table.overwrite(index)
+
+
+if __name__ == '__main__':
+    from pipelines.utils.enums import DatabaseName
+
+    db = Database(DatabaseName.DEVELOPMENT)
+    id_index_flow(db)
@@ -0,0 +1,248 @@
+import polars as pl
+import datetime as dt
+from pipelines.utils.tables import Database
+from pipelines.utils.weights_store import WeightsStore
+from pipelines.utils.factors import factors
+from pipelines.signals import SIGNALS
+from tqdm import tqdm
+
+ROLLING_WINDOW = 252
+
+# The composite portfolio (see portfolio_weights_backtest_flow) and every single-signal backtest
+PORTFOLIOS = ['composite_active', *SIGNALS]
+
+
+def benchmark_returns(start: dt.date, end: dt.date, database: Database) -> pl.DataFrame:
+    """
+    Cap-weighted in-universe returns, using the previous trading date's weights.
+
+    Weights are joined on the previous trading date rather than each asset's
+    previous row, so an asset that leaves the universe and returns does not
+    carry a stale weight across the gap.
+    """
+    assets = (
+        database.assets_table.read()
+        .filter(pl.col('date').is_between(start, end))
+    )
+
+    previous_dates = (
+        assets
+        .select('date')
+        .unique()
+        .sort('date')
+        .with_columns(pl.col('date').shift(1).alias('previous_date'))
+    )
+
+    previous_weights = (
+        assets
+        .filter(pl.col('in_universe'))
+        .select(
+            pl.col('date').alias('previous_date'),
+            'barrid',
+            pl.col('market_cap').truediv(pl.col('market_cap').sum()).over('date').alias('weight'),
+        )
+    )
+
+    return (
+        assets
+        .select('date', 'barrid', pl.col('return').truediv(100))
+        .join(previous_dates, on='date')
+        .join(previous_weights, on=['previous_date', 'barrid'])
+        .group_by('date')
+        .agg(pl.col('return').mul(pl.col('weight')).sum().alias('benchmark_return'))
+        .sort('date')
+        .collect()
+    )
+
+
+def factor_attribution(weights: pl.LazyFrame, start: dt.date, database: Database) -> pl.LazyFrame:
+    """
+    Previous day's portfolio factor exposures times today's factor returns.
+
+    Factor returns are stored in percent, so contributions are rescaled to decimals.
+    """
+    portfolio_exposures = (
+        weights
+        .join(
+            database.exposures_table.read().filter(pl.col('date').ge(start)),
+            on=['date', 'barrid'],
+            how='inner'
+        )
+        .group_by('date')
+        .agg(pl.col(factors).mul(pl.col('weight')).sum())
+        .sort('date')
+        .with_columns(pl.col(factors).shift(1))
+        .unpivot(index='date', on=factors, variable_name='factor', value_name='exposure')
+    )
+
+    factor_returns = (
+        database.factors_table.read()
+        .unpivot(index='date', variable_name='factor', value_name='factor_return')
+    )
+
+    return (
+        portfolio_exposures
+        .join(factor_returns, on=['date', 'factor'], how='left')
+        .with_columns(
+            pl.col('exposure').mul(pl.col('factor_return')).truediv(100).alias('contribution')
+        )
+        .drop('factor_return')
+        .filter(pl.col('exposure').is_not_null())
+    )
+
+
+def performance_metrics(performance: pl.DataFrame) -> pl.DataFrame:
+    """Cumulative active return, rolling Sharpe and drawdown over each portfolio's full history."""
+    return (
+        performance
+        .sort('portfolio', 'date')
+        .with_columns(
+            pl.col('active_return').log1p().cum_sum().over('portfolio').alias('cumulative_active_return'),
+            pl.col('active_return').rolling_mean(ROLLING_WINDOW)
+            .truediv(pl.col('active_return').rolling_std(ROLLING_WINDOW))
+            .mul(pl.lit(252).sqrt())
+            .over('portfolio')
+            .alias('rolling_sharpe'),
+        )
+        .with_columns(
+            pl.col('cumulative_active_return')
+            .sub(pl.col('cumulative_active_return').cum_max().over('portfolio'))
+            .exp()
+            .sub(1)
+            .alias('drawdown')
+        )
+    )
+
+
+def performance_flow(
+    portfolios: list[str],
+    database: Database,
+    active_risk: float = 0.05,
+    active_weights: bool = True,
+    weights_dir: str = "weights",
+) -> None:
+    """
+    Materialize daily performance and factor attribution for backtested portfolios.
+
+    Strategy:
+    1. Find each portfolio's last stored date; only later dates are computed
+    2. Take portfolio returns from signal_returns and compute benchmark returns once for the new dates
+    3. Read turnover from the weights store deltas and compute factor attribution for the new dates
+    4. Recompute cumulative return, rolling Sharpe and drawdown over the (small) daily series
+    5. Upsert the years that changed
+
+    Backtests hold active weights by default, so the stored return is
+    benchmark plus active return.
+    """
+    end = dt.date.today()
+
+    stored = pl.DataFrame(schema=database.performance_table.schema)
+    if database.performance_table.last_date() is not None:
+        stored = (
+            database.performance_table.read()
+            .filter(pl.col('portfolio').is_in(portfolios))
+            .collect()
+        )
+
+    last_dates = dict(stored.group_by('portfolio').agg(pl.col('date').max()).iter_rows())
+    seed_dates = {portfolio: last_dates.get(portfolio, dt.date(1995, 6, 30)) for portfolio in portfolios}
+
+    new_returns = (
+        database.signal_returns_table.read()
+        .filter(pl.col('signal_name').is_in(portfolios))
+        .select(
+            'date',
+            pl.col('signal_name').alias('portfolio'),
+            pl.col('forward_return').cast(pl.Float64).alias('portfolio_return'),
+        )
+        .join(
+            pl.LazyFrame({'portfolio': list(seed_dates), 'seed_date': list(seed_dates.values())}),
+            on='portfolio',
+        )
+        .filter(pl.col('date').gt(pl.col('seed_date')))
+        .drop('seed_date')
+        .collect()
+    )
+
+    if new_returns.is_empty():
+        return
+
+    first_new_date = new_returns['date'].min()
+    benchmark = benchmark_returns(min(seed_dates.values()), end, database)
+
+    turnovers = []
+    attributions = []
+    for portfolio in tqdm(portfolios, desc="Portfolio Attribution"):
+        store = WeightsStore(portfolio, active_risk, root=weights_dir)
+        if not store.exists():
+            continue
+
+        turnovers.append(
+            store.turnover(seed_dates[portfolio])
+            .filter(pl.col('date').gt(seed_dates[portfolio]))
+            .with_columns(pl.lit(portfolio).alias('portfolio'))
+        )
+        attributions.append(
+            factor_attribution(store.read(seed_dates[portfolio]), seed_dates[portfolio], database)
+            .filter(pl.col('date').gt(seed_dates[portfolio]))
+            .with_columns(pl.lit(portfolio).alias('portfolio'))
+        )
+
+    turnover_df = (
+        pl.concat(turnovers).collect()
+        if turnovers
+        else pl.DataFrame(schema={'date': pl.Date, 'turnover': pl.Float64, 'portfolio': pl.String})
+    )
+
+    new_performance = (
+        new_returns
+        .join(benchmark, on='date', how='left')
+        .join(turnover_df, on=['date', 'portfolio'], how='left')
+        .select(
+            'date',
+            'portfolio',
+            (
+                pl.col('portfolio_return').add(pl.col('benchmark_return'))
+                if active_weights
+                else pl.col('portfolio_return')
+            ).alias('return'),
+            'benchmark_return',
+            (
+                pl.col('portfolio_return')
+                if active_weights
+                else pl.col('portfolio_return').sub(pl.col('benchmark_return'))
+            ).alias('active_return'),
+            'turnover',
+        )
+    )
+
+    performance = performance_metrics(
+        pl.concat(
+            [stored.select(new_performance.columns), new_performance],
+            how='vertical_relaxed',
+        )
+    ).filter(pl.col('date').ge(first_new_date))
+
+    years = performance['date'].dt.year().unique().sort().to_list()
+    for year in tqdm(years, desc="Performance"):
+        year_df = performance.filter(pl.col('date').dt.year().eq(year))
+
+        database.performance_table.create_if_not_exists(year)
+        database.performance_table.upsert(year, year_df)
+
+    if not attributions:
+        return
+
+    attribution_df = pl.concat(attributions).collect()
+    years = attribution_df['date'].dt.year().unique().sort().to_list()
+    for year in tqdm(years, desc="Factor Attribution"):
+        year_df = attribution_df.filter(pl.col('date').dt.year().eq(year))
+
+        database.factor_attribution_table.create_if_not_exists(year)
+        database.factor_attribution_table.upsert(year, year_df)
+
+
+if __name__ == '__main__':
+    from pipelines.utils.enums import DatabaseName
+    db = Database(DatabaseName.DEVELOPMENT)
+    performance_flow(PORTFOLIOS, db)
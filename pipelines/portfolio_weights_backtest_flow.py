@@ -1,11 +1,17 @@
 import datetime as dt
 from pipelines.signals import SIGNALS
 import polars as pl
-from utils.tables import Database
+from pipelines.utils.tables import Database
+from pipelines.utils.backtester import run_native_backtest
+from pipelines.signal_backtest_flow import BACKTEST_MODES
 from sf_backtester import BacktestDynamicConfig, BacktestDynamicRunner, SlurmConfig
 import os
+import tempfile
+
+def portfolio_weights_backtest_flow(start: dt.date, end: dt.date, database: Database, mode: str = 'slurm', overwrite: bool = False) -> None:
+    if mode not in BACKTEST_MODES:
+        raise ValueError(f"Unknown backtest mode '{mode}'. Expected one of {BACKTEST_MODES}.")
 
-def portfolio_weights_backtest_flow(start: dt.date, end: dt.date, database: Database) -> None:
     # Load necessary data
     assets =(
         database.assets_table.read()
@@ -17,6 +23,7 @@ def portfolio_weights_backtest_flow(start: dt.date, end: dt.date, database: Data
                 "date",
                 "barrid",
                 "predicted_beta",
+                "specific_risk",
                 pl.col("market_cap")
                 .truediv(pl.col("market_cap").sum())
                 .over("date")
@@ -34,10 +41,28 @@ def portfolio_weights_backtest_flow(start: dt.date, end: dt.date, database: Data
         .sort('date', 'barrid')
     )
 
-    # Save data to temporary file
     os.makedirs("data", exist_ok=True)
+
+    if mode == 'native':
+        # A file per run, removed even if the backtest fails
+        fd, data_path = tempfile.mkstemp(prefix=f"composite_{start}_{end}_", suffix=".parquet", dir="data")
+        os.close(fd)
+        try:
+            data.drop('benchmark_weight').rename({'alpha': 'composite_active'}).sink_parquet(data_path)
+            run_native_backtest(
+                data_path=data_path,
+                database=database,
+                signals={'composite_active': ['ZeroInvestment', 'ZeroBeta']},
+                target_active_risk=0.05,
+                overwrite=overwrite,
+            )
+        finally:
+            os.remove(data_path)
+        return
+
+    # Save data for the Slurm jobs to read
     data_path = f"data/composite_{start}_{end}.parquet"
-    data.write_parquet(data_path)
+    data.drop('specific_risk').sink_parquet(data_path)
 
     # Slurm config
     slurm_config = SlurmConfig(
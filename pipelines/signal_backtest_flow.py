@@ -1,16 +1,18 @@
 import datetime as dt
 from pipelines.signals import SIGNALS
 import polars as pl
-from utils.tables import Database
+from pipelines.utils.tables import Database
+from pipelines.utils.backtester import run_native_backtest
 from sf_backtester import BacktestDynamicConfig, BacktestDynamicRunner, SlurmConfig
 import os
+import tempfile
 
-def signal_returns_backfill_flow(start: dt.date, end: dt.date, signal_name: str, database: Database) -> None:
-    # Get signal config
-    signal_config = SIGNALS[signal_name]
+# slurm: submit sf_backtester jobs, native: optimize in process on this node
+BACKTEST_MODES = ['slurm', 'native']
 
-    # Load necessary data
-    assets =(
+def load_backtest_assets(start: dt.date, end: dt.date, database: Database) -> pl.LazyFrame:
+    """In-universe assets with betas, specific risk and cap-weighted benchmark weights."""
+    return (
         database.assets_table.read()
             .filter(
                 pl.col('date').is_between(start, end),
@@ -20,6 +22,7 @@ def signal_returns_backfill_flow(start: dt.date, end: dt.date, signal_name: str,
                 "date",
                 "barrid",
                 "predicted_beta",
+                "specific_risk",
                 pl.col("market_cap")
                 .truediv(pl.col("market_cap").sum())
                 .over("date")
@@ -27,6 +30,16 @@ def signal_returns_backfill_flow(start: dt.date, end: dt.date, signal_name: str,
             )
             .sort(["barrid", "date"])
         )
+
+def signal_returns_backfill_flow(start: dt.date, end: dt.date, signal_name: str, database: Database, mode: str = 'slurm', overwrite: bool = False) -> None:
+    if mode not in BACKTEST_MODES:
+        raise ValueError(f"Unknown backtest mode '{mode}'. Expected one of {BACKTEST_MODES}.")
+
+    # Get signal config
+    signal_config = SIGNALS[signal_name]
+
+    # Load necessary data
+    assets = load_backtest_assets(start, end, database)
     alphas = database.alpha_table.read().filter(pl.col('date').is_between(start,end), pl.col('signal_name') == signal_name).drop('signal_name')
 
     # Combine data
@@ -37,10 +50,28 @@ def signal_returns_backfill_flow(start: dt.date, end: dt.date, signal_name: str,
         .sort('date', 'barrid')
     )
 
-    # Save data to temporary file
     os.makedirs("data", exist_ok=True)
+
+    if mode == 'native':
+        # A file per run, removed even if the backtest fails
+        fd, data_path = tempfile.mkstemp(prefix=f"{signal_name}_{start}_{end}_", suffix=".parquet", dir="data")
+        os.close(fd)
+        try:
+            data.drop('benchmark_weight').rename({'alpha': signal_name}).sink_parquet(data_path)
+            run_native_backtest(
+                data_path=data_path,
+                database=database,
+                signals={signal_name: signal_config['constraints']},
+                target_active_risk=0.05,
+                overwrite=overwrite,
+            )
+        finally:
+            os.remove(data_path)
+        return
+
+    # Save data for the Slurm jobs to read
     data_path = f"data/{signal_name}_{start}_{end}.parquet"
-    data.write_parquet(data_path)
+    data.drop('specific_risk').sink_parquet(data_path)
 
     # Slurm config
     slurm_config = SlurmConfig(
@@ -67,7 +98,66 @@ def signal_returns_backfill_flow(start: dt.date, end: dt.date, signal_name: str,
     # Run backtest
     runner = BacktestDynamicRunner(config)
     runner.submit()
-    
+
+
+def signals_backtest_batch_flow(
+    start: dt.date,
+    end: dt.date,
+    signal_names: list[str],
+    database: Database,
+    target_active_risk: float = 0.05,
+    max_workers: int | None = None,
+    overwrite: bool = False,
+) -> None:
+    """
+    Backtest many signals at once from a single shared copy of the inputs.
+
+    Strategy:
+    1. Scan assets, betas and specific risk once
+    2. Attach every signal's alpha as its own column
+    3. Stream the result to one Arrow IPC file that workers memory-map read-only
+    4. Fan years out across workers; each factors a date's risk model once and solves all signals
+
+    A weights store holding dates after end is only rewritten with overwrite.
+    """
+    signals = {signal_name: SIGNALS[signal_name]['constraints'] for signal_name in signal_names}
+
+    # One scan of the alpha table, one column per signal (all null for a signal with no alphas)
+    alphas = (
+        database.alpha_table.read()
+        .filter(
+            pl.col('date').is_between(start, end),
+            pl.col('signal_name').is_in(list(signals))
+        )
+        .pivot('signal_name', on_columns=list(signals), index=['date', 'barrid'], values='alpha')
+    )
+
+    data = load_backtest_assets(start, end, database).join(alphas, on=['date', 'barrid'], how='left')
+
+    # A file per run, so concurrent batches never share inputs; removed even if the backtest fails
+    os.makedirs("data", exist_ok=True)
+    fd, data_path = tempfile.mkstemp(prefix=f"signals_{start}_{end}_", suffix=".arrow", dir="data")
+    os.close(fd)
+    try:
+        (
+            data
+            .drop('benchmark_weight')
+            .with_columns(pl.col(list(signals)).fill_null(0))
+            .sort('date', 'barrid')
+            .sink_ipc(data_path)
+        )
+
+        run_native_backtest(
+            data_path=data_path,
+            database=database,
+            signals=signals,
+            target_active_risk=target_active_risk,
+            max_workers=max_workers,
+            overwrite=overwrite,
+        )
+    finally:
+        os.remove(data_path)
+
 
 if __name__ == '__main__':
     start = dt.date(1995, 1, 1)
@@ -1,59 +1,103 @@
 import polars as pl
-import sf_quant.data as sfd
 import datetime as dt
-from utils.tables import Database
+from pipelines.utils.tables import Database
+from pipelines.utils.weights_store import WeightsStore
 from tqdm import tqdm
-from utils.tables import Database
-
-def signal_returns_flow(signal_names: list[str], database: Database, active_risk: float = 0.05):
-    all_signal_returns_list = []
-    for signal_name in signal_names:        
-        weights_path = f"weights/{signal_name}/{active_risk}/*.parquet"
-        weights = pl.read_parquet(weights_path)
-
-        start = dt.date(1995, 6, 30)
-        end = dt.date.today()
-        returns = (database.assets_table.read()
-            .filter(pl.col('date').is_between(start, end))
-            .select('date', 'barrid', 'return')
-            .sort('date', 'barrid')
-            .with_columns(
-                pl.col('return')
-                .truediv(100)
-                .over('barrid')
-            )
-        )
 
-        signal_returns = (
-            weights
-            .sort('date', 'barrid')
-            .with_columns(
-                pl.col('weight').shift(1).over('barrid')
-            )
-            .join(returns, on=['date', 'barrid'], how='left')
-            .group_by('date')
-            .agg(
-                pl.col('return').mul(pl.col('weight')).sum()
-            )
-            .with_columns(
-                pl.lit(signal_name).alias('signal_name')
-            )
-            .sort('date')
+def signal_returns_flow(
+    signal_names: list[str],
+    database: Database,
+    active_risk: float = 0.05,
+    incremental: bool = True,
+    weights_dir: str = "weights",
+):
+    """
+    Compute daily returns for every signal's backtest weights in one pass.
+
+    Strategy:
+    1. Lazily scan every signal's weights from its store into a single plan
+    2. When incremental, keep each signal's last stored date only to seed yesterday's weights
+    3. Read asset returns once and join them to each signal's weights from its previous trading date
+    4. Sum weight * return grouped by (date, signal_name) and upsert per year
+    """
+    start = dt.date(1995, 6, 30)
+    end = dt.date.today()
+
+    last_dates = pl.DataFrame(schema={'signal_name': pl.String, 'last_date': pl.Date})
+    if incremental and database.signal_returns_table.last_date() is not None:
+        last_dates = (
+            database.signal_returns_table.read()
+            .filter(pl.col('signal_name').is_in(signal_names))
+            .group_by('signal_name')
+            .agg(pl.col('date').max().alias('last_date'))
+            .collect()
         )
-        all_signal_returns_list.append(signal_returns)
 
+    # Signals without stored returns need their full history
+    if last_dates.height == len(signal_names):
+        start = max(start, last_dates['last_date'].min())
+
+    # Stores include Slurm backtest output not yet compacted (see WeightsStore.compact)
+    stores = {signal_name: WeightsStore(signal_name, active_risk, root=weights_dir) for signal_name in signal_names}
+
+    weights_scans = [
+        store.read(start, end).with_columns(pl.lit(signal_name).alias('signal_name'))
+        for signal_name, store in stores.items()
+        if store.exists()
+    ]
+
+    if not weights_scans:
+        return
+
+    weights = (
+        pl.concat(weights_scans, how='vertical_relaxed')
+        .join(last_dates.lazy(), on='signal_name', how='left')
+        .filter(pl.col('last_date').is_null() | pl.col('date').ge(pl.col('last_date')))
+    )
+
+    returns = (
+        database.assets_table.read()
+        .filter(pl.col('date').is_between(start, end))
+        .select('date', 'barrid', pl.col('return').truediv(100))
+    )
+
+    # Each backtest's weights are held until its next trading date, so an asset
+    # absent from a day's weights carries no stale weight into a later return
+    previous_dates = (
+        weights
+        .select('signal_name', 'date', 'last_date')
+        .unique()
+        .sort('signal_name', 'date')
+        .with_columns(pl.col('date').shift(1).over('signal_name').alias('previous_date'))
+    )
+
+    signal_returns = (
+        previous_dates
+        # The last stored date only seeds the lagged weights
+        .filter(pl.col('last_date').is_null() | pl.col('date').gt(pl.col('last_date')))
+        .join(
+            weights.select('signal_name', pl.col('date').alias('previous_date'), 'barrid', 'weight'),
+            on=['signal_name', 'previous_date'],
+        )
+        .join(returns, on=['date', 'barrid'], how='left')
+        .group_by('date', 'signal_name')
+        .agg(
+            pl.col('return').mul(pl.col('weight')).sum().alias('forward_return')
+        )
+        .sort('date', 'signal_name')
+        .collect()
+    )
 
-    all_signal_returns = pl.concat(all_signal_returns_list)
-    years = all_signal_returns['date'].dt.year().unique().sort().to_list()
+    years = signal_returns['date'].dt.year().unique().sort().to_list()
 
     for year in tqdm(years, desc="Signal Returns"):
-        year_df = all_signal_returns.filter(pl.col("date").dt.year().eq(year))
+        year_df = signal_returns.filter(pl.col("date").dt.year().eq(year))
 
         database.signal_returns_table.create_if_not_exists(year)
         database.signal_returns_table.upsert(year, year_df)
 
 if __name__ == '__main__':
-    from utils.tables import DatabaseName
+    from pipelines.utils.enums import DatabaseName
+    from pipelines.performance_flow import PORTFOLIOS
     db = Database(DatabaseName.DEVELOPMENT)
-    signal_names = ['reversal', 'momentum', 'beta', 'barra_reversal', 'barra_momentum', 'ivol']
-    signal_returns_flow(signal_names, db)
\ No newline at end of file
+    signal_returns_flow(PORTFOLIOS, db)
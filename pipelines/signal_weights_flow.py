@@ -1,5 +1,5 @@
 import polars as pl
-from utils.tables import Database
+from pipelines.utils.tables import Database
 import numpy as np
 import datetime as dt
 from tqdm import tqdm
@@ -100,7 +100,7 @@ def signal_weights_flow(start: dt.date, end: dt.date, database: Database):
         database.signal_weights_table.upsert(year, year_df)
 
 if __name__ == '__main__':
-    from utils.tables import DatabaseName
+    from pipelines.utils.enums import DatabaseName
     db = Database(DatabaseName.DEVELOPMENT)
     start = dt.date(2000, 1, 1)
     end = dt.date(2024, 12, 31)
@@ -1,9 +1,12 @@
 from datetime import date
 import polars as pl
 from pipelines.utils.tables import Database
+from pipelines.utils.instrumentation import instrumented
+from pipelines.utils.profiling import collect_profiled
 from pipelines.signals import SIGNALS
 
 
+@instrumented
 def signals_flow(database: Database) -> None:
     """
     Compute signals, scores, and alphas from assets table.
@@ -13,7 +16,7 @@ def signals_flow(database: Database) -> None:
 
     Strategy:
     1. Lazy scan assets_table (all years needed for rolling window lookback)
-    2. Filter to in_universe=True and select needed columns
+    2. Filter to in_universe=True and select needed columns (Float32 under the compact storage policy)
     3. Collect eagerly (rolling windows require full sorted history)
     4. For each signal: compute signal_value, score (z-score), and alpha
     5. Write parquet files partitioned by year for each table
@@ -48,7 +51,7 @@ def signals_flow(database: Database) -> None:
     )
 
     # Collect eagerly (rolling windows need full history in memory)
-    assets_df = needed_cols.collect().sort(["barrid", "date"])
+    assets_df = collect_profiled(needed_cols, "signals_assets").sort(["barrid", "date"])
 
     # Lists to accumulate results for each table
     signals_rows = []
@@ -57,15 +60,17 @@ def signals_flow(database: Database) -> None:
 
     # Compute each signal
     for signal_name, signal_config in SIGNALS.items():
-        signal_df = (
-            assets_df
+        signal_df = collect_profiled(
+            assets_df.lazy()
             .with_columns(signal_config["expr"])
             .with_columns(pl.col(signal_name).alias("signal_value"))
-        ).filter(
+            .filter(
                 pl.col(signal_name).is_not_null(),
                 pl.col("predicted_beta").is_not_null(),
                 pl.col("specific_risk").is_not_null(),
-            )
+            ),
+            f"signal_{signal_name}",
+        )
         signals_rows.append(signal_df.select([
             "date",
             "barrid",
@@ -1,6 +1,7 @@
 import polars as pl
 import exchange_calendars as xcals
 from datetime import date
+from pipelines.utils.atomic import file_lock, write_parquet_atomic
 
 barra_columns = {
     "!Barrid": "barrid",
@@ -69,6 +70,7 @@ barra_schema = {
     "PredBeta": pl.Float64,
     "Factor": pl.String,
     "Exposures": pl.Float64,
+    "Exposure": pl.Float64,
     "!Factor1": pl.String,
     "Factor2": pl.String,
     "VarCovar": pl.Float64,
@@ -119,6 +121,9 @@ crsp_schema = {
     "ticker": pl.String,
     "shrcd": pl.Int64,
     "exchcd": pl.Int64,
+    "ncusip": pl.String,
+    "namedt": pl.Date,
+    "nameendt": pl.Date,
 }
 
 crsp_v2_schema = {
@@ -174,30 +179,29 @@ def get_last_market_date(
     return df
 
 
+def add_missing_columns(frame: pl.LazyFrame, schema: dict[str, pl.DataType]) -> pl.LazyFrame:
+    """Null columns for every column in schema that frame lacks, added in a single projection."""
+    existing = set(frame.collect_schema().names())
+    return frame.with_columns(
+        pl.lit(None, dtype=dtype).alias(column)
+        for column, dtype in schema.items()
+        if column not in existing
+    )
+
+
 def merge_into_master(
     master_file: str, df: pl.DataFrame, on: list[str], how: str
 ) -> None:
-    # Get master columns lazily
-    master_columns = pl.scan_parquet(master_file).collect_schema().names()
-
-    # Add missing columns
-    missing_columns = set(df.columns) - set(master_columns)
-    for col in missing_columns:
-        dtype = df.schema[col]
-        (
+    # New columns and updated rows go out in one rewrite of the master file
+    with file_lock(master_file):
+        merged = (
+            # Scan master parquet file
             pl.scan_parquet(master_file)
-            .with_columns(pl.lit(None, dtype=dtype).alias(col))
+            # Add missing columns
+            .pipe(add_missing_columns, df.schema)
+            # Update
+            .update(df.lazy(), on=on, how=how)
             .collect()
-            .write_parquet(master_file)
         )
-
-    # Update rows
-    (
-        # Scan master parquet file
-        pl.scan_parquet(master_file)
-        # Update
-        .update(df.lazy(), on=on, how=how)
-        .collect()
         # Write
-        .write_parquet(master_file)
-    )
+        write_parquet_atomic(merged, master_file)
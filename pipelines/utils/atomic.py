@@ -0,0 +1,76 @@
+import os
+import fcntl
+import threading
+import polars as pl
+from contextlib import contextmanager
+from typing import BinaryIO, Iterator
+
+
+def _temp_path(path: str) -> str:
+    # Unique per process and thread, in the target's folder so the rename stays on one filesystem
+    return f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+def _fsync_folder(path: str) -> None:
+    """Persist the rename itself, not only the file contents."""
+    folder = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(folder)
+    finally:
+        os.close(folder)
+
+
+@contextmanager
+def atomic_file(path: str) -> Iterator[BinaryIO]:
+    """
+    A file to write path's new contents to. On success it is fsynced and
+    renamed over path, so readers see either the old file or the complete
+    new one, never a partial write. On failure path is left untouched.
+    """
+    temp_path = _temp_path(path)
+    try:
+        with open(temp_path, "wb") as file:
+            yield file
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    _fsync_folder(path)
+
+
+def write_parquet_atomic(df: pl.DataFrame, path: str) -> None:
+    with atomic_file(path) as file:
+        df.write_parquet(file)
+
+
+def link_atomic(source: str, path: str) -> None:
+    """Point path at source's contents (a hard link) in one rename."""
+    temp_path = _temp_path(path)
+    os.link(source, temp_path)
+    os.replace(temp_path, path)
+    _fsync_folder(path)
+
+
+def remove_atomic(path: str) -> None:
+    if os.path.exists(path):
+        os.remove(path)
+        _fsync_folder(path)
+
+
+@contextmanager
+def file_lock(path: str) -> Iterator[None]:
+    """
+    Exclusive advisory lock on path, held through {path}.lock, for a whole
+    read-modify-write. Writers to different files do not block each other,
+    and readers never need the lock because writes are atomic.
+    """
+    with open(f"{path}.lock", "a") as lock_file:
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
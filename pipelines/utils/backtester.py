@@ -0,0 +1,256 @@
+import multiprocessing
+import numpy as np
+import polars as pl
+from concurrent.futures import ProcessPoolExecutor
+from tqdm import tqdm
+from pipelines.utils.factors import factors
+from pipelines.utils.tables import Database
+from pipelines.utils.weights_store import WeightsStore
+
+VALID_CONSTRAINTS = ["ZeroInvestment", "ZeroBeta"]
+
+
+class FactorRiskModel:
+    """
+    Asset covariance V = X F X' + D held in factored form.
+
+    Barra reports factor covariances and specific risk in annualized percent,
+    so both are rescaled to annualized decimal units here.
+    """
+
+    def __init__(
+        self,
+        exposures: np.ndarray,
+        factor_covariance: np.ndarray,
+        specific_risk: np.ndarray,
+    ) -> None:
+        self._exposures = exposures
+        self._factor_covariance = factor_covariance / 100**2
+        self._specific_variance = (specific_risk / 100) ** 2
+        self._specific_precision = 1 / self._specific_variance
+
+        # Woodbury core (I + X'D^-1X F), k x k
+        scaled_exposures = self._exposures.T * self._specific_precision
+        self._core = (
+            np.eye(self._factor_covariance.shape[0])
+            + scaled_exposures @ self._exposures @ self._factor_covariance
+        )
+
+    def variance(self, weights: np.ndarray) -> np.ndarray:
+        """Portfolio variance for each column of weights (n x m)."""
+        factor_weights = self._exposures.T @ weights
+        factor_variance = (factor_weights * (self._factor_covariance @ factor_weights)).sum(axis=0)
+        specific_variance = (self._specific_variance[:, None] * weights**2).sum(axis=0)
+        return factor_variance + specific_variance
+
+    def solve(self, rhs: np.ndarray) -> np.ndarray:
+        """V^-1 @ rhs for an n x m right hand side in O(nk^2)."""
+        scaled_rhs = rhs * self._specific_precision[:, None]
+        correction = self._exposures @ (
+            self._factor_covariance
+            @ np.linalg.solve(self._core, self._exposures.T @ scaled_rhs)
+        )
+        return scaled_rhs - correction * self._specific_precision[:, None]
+
+
+def factor_covariance_matrix(covariances: pl.DataFrame, day_factors: list[str]) -> np.ndarray:
+    """
+    k x k factor covariance from one date's (factor_1, factor...) rows.
+
+    A pair may be stored in only one triangle, so missing entries are taken
+    from their transpose before the two triangles are averaged.
+    """
+    matrix = (
+        pl.DataFrame({"factor_1": day_factors})
+        .join(covariances, on="factor_1", how="left")
+        .select(day_factors)
+        .cast(pl.Float64)
+        .to_numpy()
+    )
+    matrix = np.where(np.isnan(matrix), matrix.T, matrix)
+    matrix = np.nan_to_num(matrix, nan=0.0)
+    return (matrix + matrix.T) / 2
+
+
+def constraint_matrix(constraints: list[str], betas: np.ndarray) -> np.ndarray:
+    """Columns a_i of the equality constraints a_i'w = 0."""
+    columns = []
+    for constraint in constraints:
+        match constraint:
+            case "ZeroInvestment":
+                columns.append(np.ones_like(betas))
+            case "ZeroBeta":
+                columns.append(betas)
+            case _:
+                raise ValueError(
+                    f"Unsupported constraint '{constraint}'. Expected one of {VALID_CONSTRAINTS}."
+                )
+    return np.column_stack(columns) if columns else np.empty((len(betas), 0))
+
+
+def optimal_weights(
+    model: FactorRiskModel,
+    alpha: np.ndarray,
+    constraints: np.ndarray,
+    target_active_risk: float,
+) -> np.ndarray:
+    """
+    Mean-variance weights subject to equality constraints, scaled to the target risk.
+
+    max a'w - gamma/2 w'Vw s.t. A'w = 0 has the closed form
+    w = V^-1 (a - A lambda) / gamma with lambda = (A'V^-1A)^-1 A'V^-1 a.
+    The weights scale with 1/gamma, so gamma is implied exactly by the risk target.
+    """
+    solved = model.solve(np.column_stack([alpha, constraints]))
+    precision_alpha, precision_constraints = solved[:, 0], solved[:, 1:]
+
+    if constraints.shape[1] > 0:
+        multipliers = np.linalg.lstsq(
+            constraints.T @ precision_constraints,
+            constraints.T @ precision_alpha,
+            rcond=None,
+        )[0]
+        precision_alpha = precision_alpha - precision_constraints @ multipliers
+
+    risk = np.sqrt(model.variance(precision_alpha[:, None])[0])
+    if not np.isfinite(risk) or risk == 0:
+        return np.zeros_like(alpha)
+
+    return precision_alpha * (target_active_risk / risk)
+
+
+def scan_backtest_data(data_path: str) -> pl.LazyFrame:
+    """Scan backtest inputs; Arrow IPC files are memory-mapped so workers share pages."""
+    if data_path.endswith(".arrow"):
+        return pl.scan_ipc(data_path, memory_map=True)
+    return pl.scan_parquet(data_path)
+
+
+def backtest_year(
+    year: int,
+    data_path: str,
+    database: Database,
+    signals: dict[str, list[str]],
+    target_active_risk: float,
+) -> dict[str, pl.DataFrame]:
+    """
+    Backtest every signal for one year.
+
+    data_path holds (date, barrid, predicted_beta, specific_risk) and one alpha
+    column per signal. The risk model is factored once per date and shared by
+    all signals. Returns each signal's (date, barrid, weight) rows.
+    """
+    data = (
+        scan_backtest_data(data_path)
+        .filter(pl.col("date").dt.year().eq(year))
+        .collect()
+    )
+
+    if data.is_empty() or not database.exposures_table.exists(year) or not database.covariances_table.exists(year):
+        return {}
+
+    exposures = database.exposures_table.read(year).collect().partition_by("date", as_dict=True)
+    covariances = database.covariances_table.read(year).collect().partition_by("date", as_dict=True)
+
+    results = {signal_name: [] for signal_name in signals}
+
+    for (date_,), day in sorted(data.partition_by("date", as_dict=True).items()):
+        if (date_,) not in exposures or (date_,) not in covariances:
+            continue
+
+        day_covariances = covariances[(date_,)]
+        day_factors = [
+            factor
+            for factor in factors
+            if factor in day_covariances.columns and factor in day_covariances["factor_1"]
+        ]
+
+        day = (
+            day
+            .join(exposures[(date_,)].select("barrid", *day_factors), on="barrid", how="inner")
+            .filter(
+                pl.col("predicted_beta").is_not_null(),
+                pl.col("specific_risk").is_not_null() & pl.col("specific_risk").gt(0),
+            )
+            .sort("barrid")
+        )
+
+        if day.is_empty():
+            continue
+
+        model = FactorRiskModel(
+            exposures=day.select(day_factors).fill_null(0).to_numpy(),
+            factor_covariance=factor_covariance_matrix(day_covariances, day_factors),
+            specific_risk=day["specific_risk"].to_numpy(),
+        )
+        betas = day["predicted_beta"].to_numpy()
+
+        for signal_name, constraints in signals.items():
+            weights = optimal_weights(
+                model=model,
+                alpha=day[signal_name].fill_null(0).to_numpy(),
+                constraints=constraint_matrix(constraints, betas),
+                target_active_risk=target_active_risk,
+            )
+            results[signal_name].append(
+                day.select("date", "barrid").with_columns(pl.Series("weight", weights))
+            )
+
+    return {
+        signal_name: pl.concat(frames)
+        for signal_name, frames in results.items()
+        if frames
+    }
+
+
+def run_native_backtest(
+    data_path: str,
+    database: Database,
+    signals: dict[str, list[str]],
+    target_active_risk: float = 0.05,
+    output_dir: str = "weights",
+    max_workers: int | None = None,
+    overwrite: bool = False,
+) -> None:
+    """
+    Run a backtest in process, fanning years out across worker processes.
+
+    signals maps each alpha column in data_path to its constraints. Weights are
+    written to each signal's WeightsStore under output_dir, in year order.
+    A store holding dates after the backtest's last one raises before any
+    work starts, unless overwrite (see WeightsStore.write).
+    """
+    for constraints in signals.values():
+        constraint_matrix(constraints, np.empty(0))
+
+    dates = scan_backtest_data(data_path).select(pl.col("date").unique().sort()).collect()["date"]
+    years = dates.dt.year().unique().sort().to_list()
+
+    stores = {
+        signal_name: WeightsStore(signal_name, target_active_risk, root=output_dir)
+        for signal_name in signals
+    }
+    for store in stores.values():
+        store.check_overwrite(dates.max(), overwrite)
+
+    # Polars is not fork-safe, so workers are spawned
+    with ProcessPoolExecutor(
+        max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        futures = [
+            executor.submit(
+                backtest_year,
+                year,
+                data_path,
+                database,
+                signals,
+                target_active_risk,
+            )
+            for year in years
+        ]
+
+        # Deltas chain from one year into the next, so years are written in order.
+        # Each year drops the later ones, which were checked above and are rewritten next.
+        for future in tqdm(futures, desc="Native Backtest"):
+            for signal_name, weights in future.result().items():
+                stores[signal_name].write(weights, overwrite=True)
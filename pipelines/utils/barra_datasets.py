@@ -1,7 +1,56 @@
 from dotenv import load_dotenv
 from datetime import date
+from io import BytesIO
 import os
+import polars as pl
 from pathlib import Path
+from typing import Callable
+from pipelines.utils import barra_schema
+from pipelines.utils.factors import factors
+from pipelines.utils.zip_reader import read_zip_member, read_zip_members
+
+# Last line of every Barra file, in its first column
+END_OF_FILE = "[End of File]"
+
+# Barra writes every date as YYYYMMDD
+DATE_COLUMNS = ["DataDate", "StartDate", "EndDate"]
+DATE_FORMAT = "%Y%m%d"
+
+
+def check_factors(df: pl.DataFrame, *columns: str) -> None:
+    """Raise if columns name a factor missing from factors.py, which the pivots would drop."""
+    unknown = sorted(set().union(*(df[column].unique().to_list() for column in columns)) - set(factors))
+    if unknown:
+        raise ValueError(f"Barra data has factors missing from factors.py: {unknown}. Add them there first.")
+
+
+def pivot_exposures(df: pl.DataFrame) -> pl.DataFrame:
+    """
+    One day's long exposures to one column per factor. Columns follow the
+    fixed order in factors.py, so every day's frame has the same schema.
+    """
+    check_factors(df, "Factor")
+    return df.pivot(
+        "Factor",
+        on_columns=factors,
+        index=["DataDate", "!Barrid"],
+        values="Exposure",
+    )
+
+
+def pivot_covariances(df: pl.DataFrame) -> pl.DataFrame:
+    """One day's long covariances to a factor by factor matrix, columns as in pivot_exposures."""
+    check_factors(df, "!Factor1", "Factor2")
+    return df.pivot(
+        "Factor2",
+        on_columns=factors,
+        index=["DataDate", "!Factor1"],
+        values="VarCovar",
+    )
+
+
+# Columns each Barra file is read for, across every dataset reading it (None: all)
+_file_columns: dict[str, list[str] | None] = {}
 
 
 class BarraDataset:
@@ -12,17 +61,48 @@ class BarraDataset:
         history_zip_file: str | None,
         daily_zip_file: str,
         file_name: str,
+        skip_rows: int,
+        key_column: str = "!Barrid",
+        multi_part: bool = False,
+        columns: list[str] | None = None,
+        reshape: Callable[[pl.DataFrame], pl.DataFrame] | None = None,
     ) -> None:
+        """
+        skip_rows: metadata lines before the header.
+        key_column: first column of the file, which holds the end of file sentinel.
+        multi_part: history years are split across {history_zip_file}_{year}_NN.zip parts.
+        columns: source columns to load (all when None). A file is parsed and cached
+        with the columns of every dataset reading it, and only these columns are
+        read back from the cache.
+        reshape: applied to each file after it is read from the cache, before the files are concatenated.
+        """
         load_dotenv(override=True)
 
-        home, user = os.getenv("ROOT").split("/")[1:3]
-        self._base_path = Path(f"/{home}/{user}/groups/grp_msci_barra/nobackup/archive")
+        # BARRA_ARCHIVE points at another archive, e.g. synthetic zips for benchmarks
+        if os.getenv("BARRA_ARCHIVE"):
+            self._base_path = Path(os.getenv("BARRA_ARCHIVE"))
+        else:
+            home, user = os.getenv("ROOT").split("/")[1:3]
+            self._base_path = Path(f"/{home}/{user}/groups/grp_msci_barra/nobackup/archive")
 
         self._history_folder = history_folder
         self._daily_folder = daily_folder
         self._history_zip_file = history_zip_file
         self._daily_zip_file = daily_zip_file
         self._file_name = file_name
+        self._skip_rows = skip_rows
+        self._key_column = key_column
+        self._multi_part = multi_part
+        self._columns = columns
+        self._reshape = reshape
+
+        if file_name not in _file_columns:
+            _file_columns[file_name] = columns and list(columns)
+        elif columns is None:
+            _file_columns[file_name] = None
+        elif _file_columns[file_name] is not None:
+            known = _file_columns[file_name]
+            _file_columns[file_name] = known + [column for column in columns if column not in known]
 
     def history_zip_folder(self) -> Path:
         return self._base_path / self._history_folder
@@ -50,6 +130,94 @@ class BarraDataset:
             / f"{self._daily_zip_file}_{date_.strftime('%y%m%d')}.zip"
         )
 
+    def history_zip_paths(self, year: int) -> list[Path]:
+        if not self._multi_part:
+            return [self.history_zip_folder_path(year)]
+
+        return [
+            self.history_zip_folder() / zip_folder_name
+            for zip_folder_name in sorted(os.listdir(self.history_zip_folder()))
+            if self.history_zip_file(year) in zip_folder_name
+        ]
+
+    def cache_columns(self) -> list[str] | None:
+        """Columns the raw cache holds for this dataset's file: the union of every reader's columns."""
+        return _file_columns[self._file_name]
+
+    def parse(self, data: bytes) -> pl.DataFrame:
+        """
+        Parse one raw Barra file, reading only cache_columns, and drop the end of
+        file sentinel row. Date columns are parsed with the fixed Barra format
+        rather than inferred. This is what the raw cache holds, so it does not
+        depend on this dataset's own columns or reshape.
+        """
+        columns = self.cache_columns()
+        if columns is not None and self._key_column not in columns:
+            columns = [self._key_column, *columns]
+
+        df = pl.read_csv(
+            BytesIO(data),
+            skip_rows=self._skip_rows,
+            separator="|",
+            columns=columns,
+            schema_overrides=barra_schema,
+            infer_schema_length=10000,
+        )
+
+        return (
+            df
+            .filter(pl.col(self._key_column).ne(END_OF_FILE))
+            .with_columns(
+                pl.col(column).str.strptime(pl.Date, DATE_FORMAT)
+                for column in DATE_COLUMNS
+                if column in df.columns
+            )
+        )
+
+    def load_history(self, year: int) -> pl.DataFrame:
+        dfs = read_zip_members(
+            self.history_zip_paths(year),
+            self.file_name(),
+            self.parse,
+            self._columns,
+            self._reshape,
+            self.cache_columns(),
+        )
+
+        return pl.concat(dfs, how="vertical") if dfs else pl.DataFrame()
+
+    def load_daily(self, dates: list[date]) -> pl.DataFrame:
+        """Every file published for dates, skipping dates without a zip."""
+        dates = [date_ for date_ in dates if os.path.exists(self.daily_zip_folder_path(date_))]
+
+        dfs = read_zip_members(
+            [self.daily_zip_folder_path(date_) for date_ in dates],
+            [self.file_name(date_) for date_ in dates],
+            self.parse,
+            self._columns,
+            self._reshape,
+            self.cache_columns(),
+        )
+
+        return pl.concat(dfs, how="vertical") if dfs else pl.DataFrame()
+
+    def load_latest(self, dates: list[date]) -> pl.DataFrame:
+        """The file for the most recent of dates that has a zip."""
+        for date_ in reversed(dates):
+            zip_folder_path = self.daily_zip_folder_path(date_)
+
+            if os.path.exists(zip_folder_path):
+                return read_zip_member(
+                    zip_folder_path,
+                    self.file_name(date_),
+                    self.parse,
+                    self._columns,
+                    self._reshape,
+                    self.cache_columns(),
+                )
+
+        return pl.DataFrame()
+
 
 barra_returns = BarraDataset(
     history_folder="history/usslow/sm/daily",
@@ -57,6 +225,16 @@ barra_returns = BarraDataset(
     daily_folder="us/usslow",
     daily_zip_file="SMD_USSLOWL_100",
     file_name="USSLOW_Daily_Asset_Price",
+    skip_rows=1,
+    columns=[
+        "!Barrid",
+        "DataDate",
+        "Price",
+        "Capt",
+        "PriceSource",
+        "Currency",
+        "DlyReturn%",
+    ],
 )
 
 barra_specific_returns = BarraDataset(
@@ -65,6 +243,8 @@ barra_specific_returns = BarraDataset(
     daily_folder="us/usslow",
     daily_zip_file="SMD_USSLOWL_100",
     file_name="USSLOW_100_Asset_DlySpecRet",
+    skip_rows=2,
+    columns=["!Barrid", "DataDate", "SpecificReturn"],
 )
 
 barra_risk = BarraDataset(
@@ -73,6 +253,17 @@ barra_risk = BarraDataset(
     daily_folder="us/usslow",
     daily_zip_file="SMD_USSLOWL_100",
     file_name="USSLOWL_100_Asset_Data",
+    skip_rows=2,
+    multi_part=True,
+    columns=[
+        "!Barrid",
+        "DataDate",
+        "Yield%",
+        "TotalRisk%",
+        "SpecRisk%",
+        "HistBeta",
+        "PredBeta",
+    ],
 )
 
 barra_volume = BarraDataset(
@@ -81,6 +272,19 @@ barra_volume = BarraDataset(
     daily_folder="bime",
     daily_zip_file="SMD_USSLOW_Market_Data",
     file_name="USSLOW_Market_Data",
+    skip_rows=1,
+    columns=[
+        "!Barrid",
+        "DataDate",
+        "DailyVolume",
+        "ADTV_30",
+        "ADTV_60",
+        "ADTV_90",
+        "BidAskSpread",
+        "ADBAS_30",
+        "ADBAS_60",
+        "ADBAS_90",
+    ],
 )
 
 barra_assets = BarraDataset(
@@ -89,6 +293,18 @@ barra_assets = BarraDataset(
     daily_folder="bime",
     daily_zip_file="SMD_USSLOW_XSEDOL_ID",
     file_name="USA_Asset_Identity",
+    skip_rows=1,
+    columns=[
+        "!Barrid",
+        "Name",
+        "Instrument",
+        "IssuerID",
+        "ISOCountryCode",
+        "ISOCurrencyCode",
+        "RootID",
+        "StartDate",
+        "EndDate",
+    ],
 )
 
 barra_ids = BarraDataset(
@@ -97,6 +313,8 @@ barra_ids = BarraDataset(
     daily_folder="bime",
     daily_zip_file="SMD_USSLOW_XSEDOL_ID",
     file_name="USA_XSEDOL_Asset_ID",
+    skip_rows=1,
+    columns=["!Barrid", "AssetIDType", "AssetID", "StartDate", "EndDate"],
 )
 
 barra_covariances = BarraDataset(
@@ -105,6 +323,11 @@ barra_covariances = BarraDataset(
     daily_folder="us/usslow",
     daily_zip_file="SMD_USSLOWL_100",
     file_name="USSLOWL_100_Covariance",
+    skip_rows=2,
+    key_column="!Factor1",
+    multi_part=True,
+    columns=["!Factor1", "Factor2", "VarCovar", "DataDate"],
+    reshape=pivot_covariances,
 )
 
 barra_exposures = BarraDataset(
@@ -113,6 +336,10 @@ barra_exposures = BarraDataset(
     daily_folder="us/usslow",
     daily_zip_file="SMD_USSLOWL_100",
     file_name="USSLOWL_100_Asset_Exposure",
+    skip_rows=2,
+    multi_part=True,
+    columns=["!Barrid", "Factor", "Exposure", "DataDate"],
+    reshape=pivot_exposures,
 )
 
 
@@ -122,4 +349,7 @@ barra_factors = BarraDataset(
     daily_folder="bime",
     daily_zip_file="SMD_USSLOWL_100",
     file_name="USSLOWL_100_DlyFacRet",
+    skip_rows=2,
+    key_column="!Factor",
+    columns=["!Factor", "DlyReturn", "DataDate"],
 )
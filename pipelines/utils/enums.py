@@ -5,3 +5,8 @@ class DatabaseName(Enum):
     RESEARCH = "research"
     PRODUCTION = "production"
     DEVELOPMENT = "development"
+
+
+class Precision(Enum):
+    FULL = "full"
+    COMPACT = "compact"
@@ -0,0 +1,282 @@
+import polars as pl
+from datetime import timedelta
+
+# Identifier types held in the index. TICKER comes from Barra's LOCALID,
+# PERMNO from matching Barra CUSIPs to CRSP's historical CUSIPs (ncusip)
+# on their first 8 characters.
+ID_TYPES = ["CUSIP", "TICKER", "PERMNO"]
+
+ID_INDEX_SCHEMA = {
+    "barrid": pl.String,
+    "id_type": pl.String,
+    "id": pl.String,
+    "start_date": pl.Date,
+    "end_date": pl.Date,
+}
+
+
+def barra_id_intervals(barra_ids: pl.LazyFrame) -> pl.LazyFrame:
+    """CUSIP and ticker intervals of US assets from the barra_ids table."""
+    return (
+        barra_ids
+        .filter(
+            pl.col("asset_id_type").is_in(["CUSIP", "LOCALID"]),
+            pl.col("barrid").str.starts_with("US"),
+        )
+        .select(
+            "barrid",
+            pl.col("asset_id_type").replace({"LOCALID": "TICKER"}).alias("id_type"),
+            # LOCALIDs of US securities are the ticker prefixed with US
+            pl.when(pl.col("asset_id_type").eq("LOCALID"))
+            .then(pl.col("asset_id").str.replace("US", ""))
+            .otherwise(pl.col("asset_id"))
+            .alias("id"),
+            "start_date",
+            "end_date",
+        )
+    )
+
+
+def crsp_cusip_intervals(crsp_names: pl.LazyFrame) -> pl.LazyFrame:
+    """
+    [first, last date + 1) over which each permno had each 8 character
+    historical CUSIP, from CRSP's name history (permno, namedt, nameendt,
+    ncusip). Consecutive name records with the same CUSIP, e.g. around a
+    ticker change, are merged into one interval.
+    """
+    return (
+        crsp_names
+        .filter(pl.col("ncusip").is_not_null())
+        .select(
+            "permno",
+            pl.col("ncusip").str.slice(0, 8).alias("cusip"),
+            pl.col("namedt").alias("start_date"),
+            (pl.col("nameendt") + timedelta(days=1)).alias("end_date"),
+        )
+        .sort("permno", "cusip", "start_date")
+        .with_columns(
+            pl.col("start_date")
+            .gt(pl.col("end_date").shift(1).over("permno", "cusip"))
+            .fill_null(True)
+            .cum_sum()
+            .over("permno", "cusip")
+            .alias("run")
+        )
+        .group_by("permno", "cusip", "run")
+        .agg(pl.col("start_date").min(), pl.col("end_date").max())
+        .drop("run")
+    )
+
+
+def permno_intervals(barra_cusips: pl.LazyFrame, crsp_cusips: pl.LazyFrame) -> pl.LazyFrame:
+    """
+    Barrid to permno: each Barra CUSIP interval intersected with the CRSP
+    intervals of the same 8 character historical CUSIP. Both sides are
+    point-in-time, so a barrid keeps its permno across a CUSIP change as
+    long as both vendors record the change.
+    """
+    return (
+        barra_cusips
+        .filter(pl.col("id_type").eq("CUSIP"))
+        .join(crsp_cusips, left_on=pl.col("id").str.slice(0, 8), right_on="cusip", suffix="_crsp")
+        .select(
+            "barrid",
+            pl.lit("PERMNO").alias("id_type"),
+            pl.col("permno").cast(pl.String).alias("id"),
+            pl.max_horizontal("start_date", "start_date_crsp").alias("start_date"),
+            pl.min_horizontal("end_date", "end_date_crsp").alias("end_date"),
+        )
+        .filter(pl.col("start_date") < pl.col("end_date"))
+    )
+
+
+def build_id_index(barra_ids: pl.LazyFrame, crsp_names: pl.LazyFrame | None = None) -> pl.DataFrame:
+    """
+    Every identifier interval [start_date, end_date) of every barrid, sorted
+    by start_date. That order is what the lookups' as-of joins need, so the
+    index is sorted once here rather than on every lookup.
+
+    crsp_names: CRSP's name history (permno, namedt, nameendt, ncusip), see
+    crsp_names_table. PERMNO intervals are left out without it. The cusip
+    column of CRSP's daily files is the current (header) CUSIP on every
+    date, so it cannot date a mapping and is not used.
+    """
+    barra_intervals = barra_id_intervals(barra_ids)
+
+    intervals = [barra_intervals]
+    if crsp_names is not None:
+        intervals.append(permno_intervals(barra_intervals, crsp_cusip_intervals(crsp_names)))
+
+    return (
+        pl.concat(intervals)
+        .select(ID_INDEX_SCHEMA.keys())
+        .cast(ID_INDEX_SCHEMA)
+        .unique()
+        .sort("start_date", "id_type", "barrid")
+        .collect()
+    )
+
+
+def _id_column(id_type: str) -> str:
+    return id_type.lower()
+
+
+def _within_interval(column: str, date_column: str) -> pl.Expr:
+    """column, or null where the as-of match has already ended (a null end_date never ends)."""
+    return (
+        pl.when(pl.col("end_date").is_null() | (pl.col(date_column) < pl.col("end_date")))
+        .then(pl.col(column))
+    )
+
+
+def interval_segments(sources: list[pl.LazyFrame], key: str = "barrid") -> pl.LazyFrame:
+    """
+    Several interval sources (key, start_date, end_date and value columns)
+    cut into one set of segments per key. Each segment starts where some
+    source's interval starts or ends, and carries every source's values in
+    force from there to the next segment, null where an interval has ended.
+
+    Attaching all sources to a panel is then a single backward as-of join on
+    start_date (see join_segments), with end dates already applied. Only
+    the small interval frames are sorted here.
+    """
+    breakpoints = (
+        pl.concat([
+            source.select(key, pl.col(bound).alias("start_date"))
+            for source in sources
+            for bound in ["start_date", "end_date"]
+        ])
+        .drop_nulls()
+        .unique()
+        .sort("start_date")
+    )
+
+    segments = breakpoints
+    for source in sources:
+        values = [column for column in source.collect_schema().names() if column not in (key, "start_date", "end_date")]
+
+        segments = (
+            segments
+            .join_asof(
+                source.rename({"start_date": "_start_date"}).sort("_start_date"),
+                left_on="start_date",
+                right_on="_start_date",
+                by=key,
+                strategy="backward",
+                check_sortedness=False,
+            )
+            .with_columns(_within_interval(column, "start_date") for column in values)
+            .drop("_start_date", "end_date")
+        )
+
+    return segments
+
+
+def join_segments(frame: pl.LazyFrame, segments: pl.LazyFrame, key: str = "barrid", date_column: str = "date") -> pl.LazyFrame:
+    """Attach the segment in force on each row's date, sorting frame by date once."""
+    return (
+        frame
+        .sort(date_column)
+        .join_asof(
+            segments,
+            left_on=date_column,
+            right_on="start_date",
+            by=key,
+            strategy="backward",
+            check_sortedness=False,
+        )
+        .drop("start_date")
+    )
+
+
+def _check_id_type(id_type: str) -> None:
+    if id_type not in ID_TYPES:
+        raise ValueError(f"Unknown id type {id_type}. Expected one of {ID_TYPES}.")
+
+
+def lookup_ids(
+    frame: pl.LazyFrame,
+    index: pl.LazyFrame,
+    id_type: str,
+    date_column: str = "date",
+) -> pl.LazyFrame:
+    """
+    Attach the id_type identifier each barrid held on each row's date, as a
+    column named after the type (cusip, ticker or permno), null where none
+    was in force. frame is sorted by date_column once; the index is already
+    in start_date order.
+    """
+    _check_id_type(id_type)
+    column = _id_column(id_type)
+
+    intervals = (
+        index
+        .filter(pl.col("id_type").eq(id_type))
+        .select("barrid", pl.col("id").alias(column), "start_date", "end_date")
+    )
+
+    matched = (
+        frame
+        .sort(date_column)
+        .join_asof(
+            intervals,
+            left_on=date_column,
+            right_on="start_date",
+            by="barrid",
+            strategy="backward",
+            check_sortedness=False,
+        )
+        .with_columns(_within_interval(column, date_column))
+        .drop("start_date", "end_date")
+    )
+
+    if id_type == "PERMNO":
+        matched = matched.with_columns(pl.col(column).cast(pl.Int64))
+    return matched
+
+
+def lookup_barrids(
+    frame: pl.LazyFrame,
+    index: pl.LazyFrame,
+    id_type: str,
+    id_column: str | None = None,
+    date_column: str = "date",
+) -> pl.LazyFrame:
+    """
+    Attach the barrid that held each row's identifier on its date, the
+    reverse of lookup_ids. CUSIPs match on their first 8 characters, so
+    8 character CRSP CUSIPs and 9 character Barra ones both resolve. Where
+    several barrids share an identifier on a date, the latest to take it wins.
+    """
+    _check_id_type(id_type)
+    id_column = id_column or _id_column(id_type)
+
+    key = pl.col("id")
+    if id_type == "CUSIP":
+        key = key.str.slice(0, 8)
+
+    intervals = (
+        index
+        .filter(pl.col("id_type").eq(id_type))
+        .select(key.alias("_id"), "barrid", "start_date", "end_date")
+    )
+
+    frame_key = pl.col(id_column).cast(pl.String)
+    if id_type == "CUSIP":
+        frame_key = frame_key.str.slice(0, 8)
+
+    return (
+        frame
+        .with_columns(frame_key.alias("_id"))
+        .sort(date_column)
+        .join_asof(
+            intervals,
+            left_on=date_column,
+            right_on="start_date",
+            by="_id",
+            strategy="backward",
+            check_sortedness=False,
+        )
+        .with_columns(_within_interval("barrid", date_column))
+        .drop("_id", "start_date", "end_date")
+    )
@@ -0,0 +1,212 @@
+import os
+import sys
+import json
+import time
+import uuid
+import resource
+import functools
+import polars as pl
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Any, Callable, Iterator
+
+METRICS_PATH_DEFAULT = "logs/pipeline_metrics.jsonl"
+
+_current_stage: ContextVar["Stage | None"] = ContextVar("current_stage", default=None)
+_current_run: ContextVar["Run | None"] = ContextVar("current_run", default=None)
+_record_summary = False
+_versions_kept: int | None = None
+
+# Table operations that change its files
+WRITE_OPERATIONS = {"write", "overwrite", "upsert", "update", "update_asof"}
+
+
+def record_run_summary(enabled: bool = True) -> None:
+    """
+    Also upsert each top-level run's stages into the database's run_metrics
+    table, and count the rows and bytes each table read covers.
+    """
+    global _record_summary
+    _record_summary = enabled
+
+
+def counting_reads() -> bool:
+    """
+    Whether lazy table reads record the rows and bytes they cover. Counting
+    reads every file's footer and size before the query runs (a HEAD and a
+    ranged GET per object in S3), so it is only done for run summaries.
+    """
+    return _record_summary
+
+
+def record_versions(keep: int | None) -> None:
+    """
+    After each successful top-level run, commit a version of every table it
+    wrote, keeping the newest keep versions per table (None turns this off).
+    """
+    global _versions_kept
+    _versions_kept = keep
+
+
+def peak_rss_mb() -> float:
+    """Process high-water resident set size in MB (ru_maxrss is KB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024**2 if sys.platform == "darwin" else peak / 1024
+
+
+class Stage:
+    """
+    Counters for one instrumented stage.
+
+    Rows and bytes recorded by nested stages roll up into their parent when
+    they finish, so a flow reports the totals of its table reads and writes.
+    """
+
+    def __init__(self, name: str, parent: "Stage | None") -> None:
+        self.name = name
+        self.parent = parent
+        self.rows_in = 0
+        self.rows_out = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    def add(
+        self,
+        rows_in: int = 0,
+        rows_out: int = 0,
+        bytes_read: int = 0,
+        bytes_written: int = 0,
+    ) -> None:
+        self.rows_in += rows_in
+        self.rows_out += rows_out
+        self.bytes_read += bytes_read
+        self.bytes_written += bytes_written
+
+
+class Run:
+    """Stages recorded under one top-level flow call."""
+
+    def __init__(self) -> None:
+        self.run_id = uuid.uuid4().hex[:12]
+        self.records: list[dict[str, Any]] = []
+
+
+def _emit(record: dict[str, Any]) -> None:
+    path = os.getenv("METRICS_PATH", METRICS_PATH_DEFAULT)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a") as file:
+        file.write(json.dumps(record, default=str) + "\n")
+
+
+@contextmanager
+def stage(name: str) -> Iterator[Stage]:
+    """
+    Measure a block and emit one JSON line for it when it finishes.
+
+    Lines go to METRICS_PATH (logs/pipeline_metrics.jsonl by default).
+
+    peak_rss_mb is the process's high-water mark at the end of the stage, not
+    the stage's own peak: it never falls, so a light stage after a heavy one
+    reports the heavy one's peak. The stage where it jumps is the one that
+    raised it.
+    """
+    parent = _current_stage.get()
+    current = Stage(name, parent)
+    token = _current_stage.set(current)
+
+    started_at = datetime.now()
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    status = "ok"
+    try:
+        yield current
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        _current_stage.reset(token)
+
+        run = _current_run.get()
+        record = {
+            "run_id": run.run_id if run is not None else None,
+            "stage": name,
+            "parent": parent.name if parent is not None else None,
+            "started_at": started_at,
+            "wall_seconds": time.perf_counter() - wall_start,
+            "cpu_seconds": time.process_time() - cpu_start,
+            # Process high-water mark so far, not this stage's own peak
+            "peak_rss_mb": peak_rss_mb(),
+            "rows_in": current.rows_in,
+            "rows_out": current.rows_out,
+            "bytes_read": current.bytes_read,
+            "bytes_written": current.bytes_written,
+            "status": status,
+        }
+        _emit(record)
+        if run is not None:
+            run.records.append(record)
+
+        if parent is not None:
+            parent.add(current.rows_in, current.rows_out, current.bytes_read, current.bytes_written)
+
+
+def _write_run_summary(database: Any, records: list[dict[str, Any]]) -> None:
+    table = database.run_metrics_table
+    summary = pl.DataFrame(records, schema=table.schema)
+
+    for year in summary["started_at"].dt.year().unique().sort().to_list():
+        table.create_if_not_exists(year)
+        table.upsert(year, summary.filter(pl.col("started_at").dt.year().eq(year)))
+
+
+def _commit_versions(database: Any, records: list[dict[str, Any]]) -> None:
+    written = {
+        record["stage"].rsplit(".", 1)[0]
+        for record in records
+        if "." in record["stage"] and record["stage"].rsplit(".", 1)[1] in WRITE_OPERATIONS
+    }
+    for name in sorted(written):
+        database.table(name).commit_version(keep=_versions_kept)
+
+
+def _find_database(args: tuple, kwargs: dict) -> Any:
+    for value in [*args, *kwargs.values()]:
+        if hasattr(type(value), "run_metrics_table"):
+            return value
+    return None
+
+
+def instrumented(func: Callable) -> Callable:
+    """
+    Run a flow inside a stage named after it.
+
+    The outermost instrumented call starts a run; with run summaries enabled
+    its stages are upserted into the run_metrics table of the flow's database,
+    and with versions enabled every table it wrote gets a new version once it
+    succeeds.
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if _current_run.get() is not None:
+            with stage(func.__name__):
+                return func(*args, **kwargs)
+
+        run = Run()
+        token = _current_run.set(run)
+        succeeded = False
+        try:
+            with stage(func.__name__):
+                result = func(*args, **kwargs)
+            succeeded = True
+            return result
+        finally:
+            _current_run.reset(token)
+            database = _find_database(args, kwargs)
+            if succeeded and _versions_kept is not None and database is not None:
+                _commit_versions(database, run.records)
+            if _record_summary and database is not None:
+                _write_run_summary(database, run.records)
+
+    return wrapper
@@ -0,0 +1,53 @@
+import os
+import polars as pl
+from datetime import datetime
+
+PROFILE_DIR_DEFAULT = "logs/profiles"
+
+_profile_path: str | None = None
+
+
+def enable_profiling(profile_dir: str | None = None) -> str:
+    """
+    Profile every collect() that goes through collect_profiled for the rest
+    of the process. Output goes to a timestamped folder under profile_dir
+    (PROFILE_DIR or logs/profiles), which is returned.
+    """
+    global _profile_path
+    profile_dir = profile_dir or os.getenv("PROFILE_DIR", PROFILE_DIR_DEFAULT)
+    _profile_path = os.path.join(profile_dir, datetime.now().strftime("%Y%m%d_%H%M%S"))
+    os.makedirs(_profile_path, exist_ok=True)
+    return _profile_path
+
+
+def profiling_enabled() -> bool:
+    return _profile_path is not None
+
+
+def collect_profiled(frame: pl.LazyFrame, name: str) -> pl.DataFrame:
+    """
+    Collect a lazy plan. When profiling is enabled, also save under the run's profile folder:
+    - {name}.plan.txt: the unoptimized and optimized plans
+    - {name}.dot: the optimized plan graph (render with `dot -Tsvg`)
+    - {name}.timings.csv: per-node start/end microseconds from LazyFrame.profile()
+    """
+    if _profile_path is None:
+        return frame.collect()
+
+    with open(os.path.join(_profile_path, f"{name}.plan.txt"), "w") as file:
+        file.write("UNOPTIMIZED\n")
+        file.write(frame.explain(optimized=False))
+        file.write("\n\nOPTIMIZED\n")
+        file.write(frame.explain(optimized=True))
+
+    with open(os.path.join(_profile_path, f"{name}.dot"), "w") as file:
+        file.write(frame.show_graph(optimized=True, raw_output=True))
+
+    df, timings = frame.profile()
+    (
+        timings
+        .with_columns(pl.col("end").sub(pl.col("start")).alias("duration"))
+        .write_csv(os.path.join(_profile_path, f"{name}.timings.csv"))
+    )
+
+    return df
@@ -0,0 +1,77 @@
+import os
+import glob
+import zlib
+import zipfile
+import polars as pl
+from pathlib import Path
+from dotenv import load_dotenv
+from typing import Callable
+from pipelines.utils.atomic import write_parquet_atomic
+
+# Bump when the raw parse itself (dtypes, date handling) changes so stale
+# entries are not reused. Projection and reshaping happen after the cache.
+CACHE_VERSION = 7
+
+
+def cache_root() -> Path:
+    """BARRA_CACHE if set, else a raw cache beside the quant database."""
+    load_dotenv(override=True)
+    if os.getenv("BARRA_CACHE"):
+        return Path(os.getenv("BARRA_CACHE"))
+    return Path(f"{os.getenv('ROOT')}/groups/grp_quant/barra_raw_cache")
+
+
+def columns_tag(columns: list[str] | None) -> str:
+    """Short stable name for the column set a cache entry holds."""
+    if columns is None:
+        return "all"
+    return f"{zlib.crc32('|'.join(sorted(columns)).encode()):08x}"
+
+
+def cache_path(zip_path: str | Path, info: zipfile.ZipInfo, cache_columns: list[str] | None = None) -> Path:
+    """
+    Cache entries are keyed by their zip, member name and the member's CRC
+    and size from the zip's central directory, so a re-delivered member is
+    re-parsed without any bookkeeping beyond the file name. The key also
+    names the columns the entry holds.
+    """
+    return (
+        cache_root()
+        / Path(zip_path).stem
+        / f"{info.filename}.{info.CRC:08x}.{info.file_size}.{columns_tag(cache_columns)}.v{CACHE_VERSION}.parquet"
+    )
+
+
+def read_cached_member(
+    zip_folder: zipfile.ZipFile,
+    zip_path: str | Path,
+    member: str,
+    parse: Callable[[bytes], pl.DataFrame],
+    columns: list[str] | None = None,
+    cache_columns: list[str] | None = None,
+) -> pl.DataFrame:
+    """
+    Parsed contents of a zip member, from the raw cache when present, with
+    only columns (all when None).
+
+    On a miss the member is decompressed and parsed once, then written to
+    the cache as typed parquet. parse reads only cache_columns (all when
+    None), the union of the columns every reader of the member declares, so
+    each of those column sets can be read from the entry later. Entries for
+    older versions or other column sets of the same member are removed.
+    """
+    path = cache_path(zip_path, zip_folder.getinfo(member), cache_columns)
+    if path.exists():
+        return pl.read_parquet(path, columns=columns)
+
+    df = parse(zip_folder.read(member))
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    for stale in glob.glob(f"{glob.escape(str(path.parent / member))}.*.parquet"):
+        if stale != str(path):
+            os.remove(stale)
+
+    # Concurrent readers never see a partial file
+    write_parquet_atomic(df, str(path))
+
+    return df.select(columns) if columns is not None else df
@@ -1,58 +1,285 @@
-import boto3
 import polars as pl
-from io import StringIO, BytesIO
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pipelines.utils.atomic import atomic_file
+from io import BytesIO
 from dotenv import load_dotenv
+from typing import TYPE_CHECKING
 import os
 
-load_dotenv(override=True)
+if TYPE_CHECKING:
+    from boto3.s3.transfer import TransferConfig
+    from botocore.client import BaseClient
 
-aws_access_key_id = os.getenv("COGNITO_ACCESS_KEY_ID")
-aws_secret_access_key = os.getenv("COGNITO_SECRET_ACCESS_KEY")
-region_name = os.getenv("COGNITO_REGION")
+# Connections per client. Sync workers and the parts of each multipart
+# transfer all draw from this one pool, so it covers both at their defaults.
+MAX_POOL_CONNECTIONS_DEFAULT = 32
+MAX_ATTEMPTS_DEFAULT = 5
 
-client = boto3.client(
-    "s3",
-    aws_access_key_id=aws_access_key_id,
-    aws_secret_access_key=aws_secret_access_key,
-    region_name=region_name,
-)
+SYNC_WORKERS_DEFAULT = 8
 
+_lock = threading.Lock()
+_settings: dict[str, str | None] | None = None
+_clients: dict[tuple[int, int], "BaseClient"] = {}
+_transfer_config: "TransferConfig | None" = None
+
+
+def settings() -> dict[str, str | None]:
+    """
+    Credentials and endpoint, read from the environment (and .env) on first
+    use rather than at import. S3_ENDPOINT_URL points at an S3-compatible
+    stand-in such as MinIO or moto.
+    """
+    global _settings
+    with _lock:
+        if _settings is None:
+            load_dotenv(override=True)
+            _settings = {
+                "aws_access_key_id": os.getenv("COGNITO_ACCESS_KEY_ID"),
+                "aws_secret_access_key": os.getenv("COGNITO_SECRET_ACCESS_KEY"),
+                "region_name": os.getenv("COGNITO_REGION"),
+                "endpoint_url": os.getenv("S3_ENDPOINT_URL"),
+            }
+        return _settings
+
+
+def get_client(max_pool_connections: int | None = None, max_attempts: int | None = None) -> "BaseClient":
+    """
+    The shared S3 client, created on first use. boto3 clients are thread
+    safe, so every thread reuses one client and its connection pool.
+
+    max_pool_connections: S3_MAX_POOL_CONNECTIONS, or 32.
+    max_attempts: attempts per request, with standard retry backoff. S3_MAX_ATTEMPTS, or 5.
+    """
+    max_pool_connections = max_pool_connections or int(
+        os.getenv("S3_MAX_POOL_CONNECTIONS", MAX_POOL_CONNECTIONS_DEFAULT)
+    )
+    max_attempts = max_attempts or int(os.getenv("S3_MAX_ATTEMPTS", MAX_ATTEMPTS_DEFAULT))
+
+    key = (max_pool_connections, max_attempts)
+    if key in _clients:
+        return _clients[key]
+
+    credentials = settings()
+
+    with _lock:
+        if key not in _clients:
+            import boto3
+            from botocore.config import Config
+
+            # A session of its own, since boto3's default session is not safe to share across threads
+            session = boto3.session.Session(
+                aws_access_key_id=credentials["aws_access_key_id"],
+                aws_secret_access_key=credentials["aws_secret_access_key"],
+                region_name=credentials["region_name"],
+            )
+            _clients[key] = session.client(
+                "s3",
+                endpoint_url=credentials["endpoint_url"],
+                config=Config(
+                    max_pool_connections=max_pool_connections,
+                    retries={"total_max_attempts": max_attempts, "mode": "standard"},
+                ),
+            )
+        return _clients[key]
 
-def get_file(bucket_name: str, file_key: str) -> pl.DataFrame:
-    s3_object = client.get_object(Bucket=bucket_name, Key=file_key)
 
-    file_content = s3_object["Body"].read().decode("utf-8")
+def transfer_config() -> "TransferConfig":
+    """
+    Objects above 64 MB go up and down as 16 MB parts, four at a time, read
+    from disk a part at a time. Four parts for each of the eight sync
+    workers fit the default connection pool.
+    """
+    global _transfer_config
+    with _lock:
+        if _transfer_config is None:
+            from boto3.s3.transfer import TransferConfig
 
-    return pl.read_csv(StringIO(file_content))
+            _transfer_config = TransferConfig(
+                multipart_threshold=64 * 1024**2,
+                multipart_chunksize=16 * 1024**2,
+                max_concurrency=4,
+            )
+        return _transfer_config
+
+
+def storage_options() -> dict[str, str]:
+    """Credentials for Polars' own S3 reader, which does ranged GETs of parquet footers and row groups."""
+    credentials = settings()
+    options = {
+        "aws_access_key_id": credentials["aws_access_key_id"],
+        "aws_secret_access_key": credentials["aws_secret_access_key"],
+        "aws_region": credentials["region_name"],
+    }
+    if credentials["endpoint_url"]:
+        options["aws_endpoint_url"] = credentials["endpoint_url"]
+        options["aws_allow_http"] = str(credentials["endpoint_url"].startswith("http://")).lower()
+    return {key: value for key, value in options.items() if value is not None}
+
+
+def get_file(bucket_name: str, file_key: str) -> pl.DataFrame:
+    s3_object = get_client().get_object(Bucket=bucket_name, Key=file_key)
+
+    return pl.read_csv(s3_object["Body"].read())
 
 
 def drop_file(file_name: str, bucket_name: str, file_data: pl.DataFrame) -> None:
-    csv_buffer = StringIO()
+    csv_buffer = BytesIO()
 
     file_data.write_csv(csv_buffer)
 
-    csv_bytes = BytesIO(csv_buffer.getvalue().encode())
+    csv_buffer.seek(0)
 
-    client.upload_fileobj(csv_bytes, bucket_name, file_name)
+    get_client().upload_fileobj(csv_buffer, bucket_name, file_name, Config=transfer_config())
 
 
 def write_parquet(file_name: str, bucket_name: str, file_data: pl.DataFrame) -> None:
-    parquet_buffer = BytesIO()
+    # Spooled through disk so the upload streams in parts instead of holding a second copy in memory
+    with tempfile.TemporaryFile() as parquet_file:
+        file_data.write_parquet(parquet_file)
+
+        parquet_file.seek(0)
+
+        get_client().upload_fileobj(parquet_file, bucket_name, file_name, Config=transfer_config())
+
+
+def upload_file(path: str, bucket_name: str, file_key: str) -> None:
+    """Stream a local file to S3, as a multipart upload when it is large."""
+    get_client().upload_file(path, bucket_name, file_key, Config=transfer_config())
 
-    file_data.write_parquet(parquet_buffer)
 
-    parquet_buffer.seek(0)
+def scan_parquet(bucket_name: str, file_key: str, **kwargs) -> pl.LazyFrame:
+    """
+    Lazy scan of parquet objects (file_key may be a glob). Only the footers
+    and the row groups and columns the query needs are fetched.
+    """
+    return pl.scan_parquet(
+        f"s3://{bucket_name}/{file_key}",
+        storage_options=storage_options(),
+        **kwargs,
+    )
 
-    client.upload_fileobj(parquet_buffer, bucket_name, file_name)
+
+def list_objects(bucket_name: str, prefix: str = "") -> list[dict]:
+    """Every object under prefix (Key, Size, LastModified, ETag, ...), across all listing pages."""
+    paginator = get_client().get_paginator("list_objects_v2")
+
+    return [
+        object
+        for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix)
+        for object in page.get("Contents", [])
+    ]
 
 
 def list_files(bucket_name: str):
-    file_paths = []
+    return [bucket_name + "/" + object["Key"] for object in list_objects(bucket_name)]
+
+
+def _local_files(folder: str) -> dict[str, str]:
+    """Parquet files under folder by their path relative to it, leaving out versions, locks and temp files."""
+    files = {}
+    for directory, subdirectories, file_names in os.walk(folder):
+        subdirectories[:] = [name for name in subdirectories if name != "_versions"]
+        for file_name in file_names:
+            if file_name.endswith(".parquet"):
+                path = os.path.join(directory, file_name)
+                files[os.path.relpath(path, folder).replace(os.sep, "/")] = path
+    return files
+
+
+def _is_current(path: str, object: dict, newer_side: str) -> bool:
+    """
+    Same size, and the side being copied to is not older than the source,
+    which is how aws s3 sync decides a file is unchanged.
+    """
+    stat = os.stat(path)
+    if stat.st_size != object["Size"]:
+        return False
+
+    # LastModified is kept to the second, so local times are compared at that precision too
+    local_mtime = int(stat.st_mtime)
+    remote_mtime = object["LastModified"].timestamp()
+    return remote_mtime >= local_mtime if newer_side == "remote" else local_mtime >= remote_mtime
+
+
+def sync_up(
+    folder: str,
+    bucket_name: str,
+    prefix: str,
+    max_workers: int = SYNC_WORKERS_DEFAULT,
+    delete: bool = False,
+) -> list[str]:
+    """
+    Mirror the parquet files under folder to bucket_name/prefix/, uploading
+    only new or changed files on a bounded pool. With delete, objects with
+    no local file are removed. Returns the uploaded keys.
+    """
+    prefix = prefix.rstrip("/")
+    remote = {object["Key"]: object for object in list_objects(bucket_name, f"{prefix}/")}
+    local = _local_files(folder)
+
+    uploads = {
+        f"{prefix}/{relative}": path
+        for relative, path in local.items()
+        if f"{prefix}/{relative}" not in remote
+        or not _is_current(path, remote[f"{prefix}/{relative}"], newer_side="remote")
+    }
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(lambda item: upload_file(item[1], bucket_name, item[0]), uploads.items()))
+
+    if delete:
+        stale = [key for key in remote if key.removeprefix(f"{prefix}/") not in local]
+        # delete_objects takes at most 1000 keys
+        for start in range(0, len(stale), 1000):
+            get_client().delete_objects(
+                Bucket=bucket_name,
+                Delete={"Objects": [{"Key": key} for key in stale[start:start + 1000]]},
+            )
+
+    return sorted(uploads)
+
+
+def _download_file(bucket_name: str, object: dict, path: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    # Renamed into place when complete, so local readers never see a partial file
+    with atomic_file(path) as file:
+        get_client().download_fileobj(bucket_name, object["Key"], file, Config=transfer_config())
+
+    # Stamp the object's time so the next sync sees the file as current
+    remote_mtime = object["LastModified"].timestamp()
+    os.utime(path, (remote_mtime, remote_mtime))
+
+
+def sync_down(
+    bucket_name: str,
+    prefix: str,
+    folder: str,
+    max_workers: int = SYNC_WORKERS_DEFAULT,
+) -> list[str]:
+    """
+    Mirror bucket_name/prefix/ into folder, downloading only new or changed
+    objects on a bounded pool. Returns the downloaded keys.
+    """
+    prefix = prefix.rstrip("/")
+    local = _local_files(folder)
 
-    response = client.list_objects_v2(Bucket=bucket_name)
+    downloads = {
+        object["Key"]: object
+        for object in list_objects(bucket_name, f"{prefix}/")
+        if object["Key"].endswith(".parquet")
+        and (
+            object["Key"].removeprefix(f"{prefix}/") not in local
+            or not _is_current(local[object["Key"].removeprefix(f"{prefix}/")], object, newer_side="local")
+        )
+    }
 
-    for object in response["Contents"]:
-        file_path = bucket_name + "/" + object["Key"]
-        file_paths.append(file_path)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        list(executor.map(
+            lambda object: _download_file(bucket_name, object, os.path.join(folder, object["Key"].removeprefix(f"{prefix}/"))),
+            downloads.values(),
+        ))
 
-    return file_paths
+    return sorted(downloads)
@@ -0,0 +1,151 @@
+import os
+import glob
+import fnmatch
+import polars as pl
+from abc import ABC, abstractmethod
+from contextlib import AbstractContextManager, nullcontext
+from pipelines.utils import s3
+from pipelines.utils.atomic import file_lock, remove_atomic, write_parquet_atomic
+
+
+def union_schema(schemas: list[dict[str, pl.DataType]]) -> dict[str, pl.DataType]:
+    """
+    Every column across schemas, in first-seen order. A float column stored
+    at different widths is Float64.
+    """
+    union = {}
+    for schema in schemas:
+        for column, dtype in schema.items():
+            if column in union and union[column] != dtype and union[column].is_float() and dtype.is_float():
+                union[column] = pl.Float64
+            else:
+                union.setdefault(column, dtype)
+    return union
+
+
+class Storage(ABC):
+    """Where a table's parquet files live. Paths are full paths or s3:// URLs."""
+
+    # Hard-linked versions (see Table.commit_version) need a local filesystem
+    supports_versions = False
+
+    @abstractmethod
+    def makedirs(self, folder: str) -> None:
+        ...
+
+    @abstractmethod
+    def exists(self, path: str) -> bool:
+        ...
+
+    @abstractmethod
+    def glob(self, pattern: str) -> list[str]:
+        ...
+
+    @abstractmethod
+    def size(self, path: str) -> int:
+        ...
+
+    @abstractmethod
+    def scan(self, source: str | list[str], **kwargs) -> pl.LazyFrame:
+        ...
+
+    @abstractmethod
+    def write(self, df: pl.DataFrame, path: str) -> None:
+        ...
+
+    @abstractmethod
+    def remove(self, path: str) -> None:
+        ...
+
+    @abstractmethod
+    def lock(self, path: str) -> AbstractContextManager:
+        ...
+
+    def file_bytes(self, paths: list[str]) -> int:
+        return sum(self.size(path) for path in paths if self.exists(path))
+
+    def parquet_rows(self, paths: list[str]) -> int:
+        """Row count from the parquet footers, without reading any data."""
+        # Per file, so years with differing columns can still be counted
+        return sum(self.scan(path).select(pl.len()).collect().item() for path in paths)
+
+
+class LocalStorage(Storage):
+    """Files on the shared filesystem, written atomically under per-file advisory locks."""
+
+    supports_versions = True
+
+    def makedirs(self, folder: str) -> None:
+        os.makedirs(folder, exist_ok=True)
+
+    def exists(self, path: str) -> bool:
+        return os.path.exists(path)
+
+    def glob(self, pattern: str) -> list[str]:
+        return glob.glob(pattern)
+
+    def size(self, path: str) -> int:
+        return os.path.getsize(path)
+
+    def scan(self, source: str | list[str], **kwargs) -> pl.LazyFrame:
+        return pl.scan_parquet(source, **kwargs)
+
+    def write(self, df: pl.DataFrame, path: str) -> None:
+        write_parquet_atomic(df, path)
+
+    def remove(self, path: str) -> None:
+        remove_atomic(path)
+
+    def lock(self, path: str) -> AbstractContextManager:
+        return file_lock(path)
+
+
+def split_url(url: str) -> tuple[str, str]:
+    """s3://bucket/key to (bucket, key)."""
+    bucket_name, file_key = url.removeprefix("s3://").split("/", 1)
+    return bucket_name, file_key
+
+
+class S3Storage(Storage):
+    """
+    Objects in S3 or an S3-compatible store (see S3_ENDPOINT_URL).
+
+    Scans go through Polars' own reader, which fetches only the parquet
+    footers and the row groups and columns a query needs. A PUT replaces an
+    object whole, so readers never see a partial file. There is no locking,
+    so a table should have one writer at a time.
+    """
+
+    def makedirs(self, folder: str) -> None:
+        pass
+
+    def exists(self, path: str) -> bool:
+        return bool(self.glob(path))
+
+    def glob(self, pattern: str) -> list[str]:
+        bucket_name, key_pattern = split_url(pattern)
+        prefix = key_pattern.split("*", 1)[0]
+
+        return [
+            f"s3://{bucket_name}/{object['Key']}"
+            for object in s3.list_objects(bucket_name, prefix)
+            if fnmatch.fnmatchcase(object["Key"], key_pattern)
+        ]
+
+    def size(self, path: str) -> int:
+        bucket_name, file_key = split_url(path)
+        return s3.get_client().head_object(Bucket=bucket_name, Key=file_key)["ContentLength"]
+
+    def scan(self, source: str | list[str], **kwargs) -> pl.LazyFrame:
+        return pl.scan_parquet(source, storage_options=s3.storage_options(), **kwargs)
+
+    def write(self, df: pl.DataFrame, path: str) -> None:
+        bucket_name, file_key = split_url(path)
+        s3.write_parquet(file_key, bucket_name, df)
+
+    def remove(self, path: str) -> None:
+        bucket_name, file_key = split_url(path)
+        s3.get_client().delete_object(Bucket=bucket_name, Key=file_key)
+
+    def lock(self, path: str) -> AbstractContextManager:
+        return nullcontext()
@@ -0,0 +1,152 @@
+import polars as pl
+from typing import TypeVar
+
+Frame = TypeVar("Frame", pl.DataFrame, pl.LazyFrame)
+
+
+class StoragePolicy:
+    """
+    How a table's columns are narrowed on disk and restored on read.
+
+    - float32: Float64 columns stored as Float32
+    - categorical: low-cardinality string columns stored as Categorical
+    - flags: maps a packed UInt8 column to the boolean columns it holds, one bit each in order
+
+    Packed flags cannot hold nulls, so a null flag is stored as False.
+    Float32 columns stay Float32 after decoding; only packed flags are unpacked.
+    """
+
+    def __init__(
+        self,
+        float32: list[str] | None = None,
+        categorical: list[str] | None = None,
+        flags: dict[str, list[str]] | None = None,
+    ) -> None:
+        self._float32 = float32 or []
+        self._categorical = categorical or []
+        self._flags = flags or {}
+
+        for packed, columns in self._flags.items():
+            if len(columns) > 8:
+                raise ValueError(f"Packed column '{packed}' can hold at most 8 flags, got {len(columns)}.")
+
+    def storage_schema(self, schema: dict[str, pl.DataType]) -> dict[str, pl.DataType]:
+        """The on-disk schema for a table's logical schema."""
+        flag_columns = {column for columns in self._flags.values() for column in columns}
+        storage_schema = {}
+        for column, dtype in schema.items():
+            if column in flag_columns:
+                continue
+            elif column in self._float32:
+                storage_schema[column] = pl.Float32
+            elif column in self._categorical:
+                storage_schema[column] = pl.Categorical
+            else:
+                storage_schema[column] = dtype
+
+        for packed in self._flags:
+            storage_schema[packed] = pl.UInt8
+
+        return storage_schema
+
+    def encode(self, frame: Frame) -> Frame:
+        """
+        Narrow whichever policy columns the frame has. Flags are packed once all
+        of a packed column's flags are present, so partial frames (e.g. a single
+        source in a join) can be encoded early.
+        """
+        names = set(frame.collect_schema().names())
+
+        frame = frame.with_columns(
+            *[pl.col(column).cast(pl.Float32) for column in self._float32 if column in names],
+            *[pl.col(column).cast(pl.Categorical) for column in self._categorical if column in names],
+        )
+
+        for packed, columns in self._flags.items():
+            if not set(columns) <= names:
+                continue
+
+            frame = frame.with_columns(
+                pl.sum_horizontal(
+                    pl.col(column).fill_null(False).cast(pl.UInt8).mul(1 << bit)
+                    for bit, column in enumerate(columns)
+                )
+                .cast(pl.UInt8)
+                .alias(packed)
+            ).drop(columns)
+
+        return frame
+
+    def decode(self, frame: Frame) -> Frame:
+        """Unpack flag columns back into booleans."""
+        names = set(frame.collect_schema().names())
+
+        for packed, columns in self._flags.items():
+            if packed not in names:
+                continue
+
+            frame = frame.with_columns(
+                pl.col(packed).and_(pl.lit(1 << bit, dtype=pl.UInt8)).gt(0).alias(column)
+                for bit, column in enumerate(columns)
+            ).drop(packed)
+
+        return frame
+
+    def report(self, df: pl.DataFrame) -> pl.DataFrame:
+        """
+        Round trip a full precision frame through the policy and measure what it loses.
+
+        Float32 columns report max absolute and relative error. Categorical and
+        flag columns report how many values changed.
+        """
+        restored = self.decode(self.encode(df))
+        rows = []
+
+        for column in self._float32:
+            if column not in df.columns:
+                continue
+            original = df[column].cast(pl.Float64)
+            error = (restored[column].cast(pl.Float64) - original).abs()
+            nonzero = original.ne(0)
+            relative_error = error.filter(nonzero) / original.filter(nonzero).abs()
+            rows.append({
+                "column": column,
+                "storage_dtype": "Float32",
+                "max_abs_error": error.max(),
+                "max_rel_error": relative_error.max(),
+                "mismatches": 0,
+            })
+
+        for column in self._categorical:
+            if column not in df.columns:
+                continue
+            rows.append({
+                "column": column,
+                "storage_dtype": "Categorical",
+                "max_abs_error": None,
+                "max_rel_error": None,
+                "mismatches": restored[column].cast(pl.String).ne_missing(df[column]).sum(),
+            })
+
+        for packed, columns in self._flags.items():
+            for column in columns:
+                if column not in df.columns:
+                    continue
+                rows.append({
+                    "column": column,
+                    "storage_dtype": f"{packed} (UInt8 bit)",
+                    "max_abs_error": None,
+                    "max_rel_error": None,
+                    "mismatches": restored[column].ne_missing(df[column]).sum(),
+                })
+
+        return pl.DataFrame(
+            rows,
+            schema={
+                "column": pl.String,
+                "storage_dtype": pl.String,
+                "max_abs_error": pl.Float64,
+                "max_rel_error": pl.Float64,
+                "mismatches": pl.Int64,
+            },
+        )
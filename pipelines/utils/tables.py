@@ -1,9 +1,25 @@
 import polars as pl
 import os
+import json
+import shutil
+from datetime import date, datetime
 from dotenv import load_dotenv
+from pipelines.utils import add_missing_columns
 from pipelines.utils.factors import factors
+from pipelines.utils.id_index import ID_INDEX_SCHEMA
 from typing import Optional
-from pipelines.utils.enums import DatabaseName
+from pipelines.utils.enums import DatabaseName, Precision
+from pipelines.utils.storage_policy import StoragePolicy
+from pipelines.utils.instrumentation import counting_reads, stage
+from pipelines.utils.atomic import atomic_file, file_lock, link_atomic, remove_atomic
+from pipelines.utils.storage import LocalStorage, S3Storage, union_schema
+from pipelines.utils import s3
+
+
+def database_folder(database: DatabaseName, root: str | None = None) -> str:
+    """Local folder of a database, under root or the ROOT environment variable."""
+    root = root or os.getenv("ROOT")
+    return f"{root}/groups/grp_quant/database/{database.value}"
 
 
 class Table:
@@ -13,16 +29,35 @@ class Table:
         name: str,
         schema: dict[str, pl.DataType],
         ids=list[str],
+        storage_policy: StoragePolicy | None = None,
+        root: str | None = None,
+        fixed_columns: bool = False,
+        bucket: str | None = None,
     ) -> None:
+        """
+        fixed_columns: every year's file holds exactly the schema's columns in
+        declared order (absent ones as nulls), so multi-year scans need no
+        schema reconciliation.
+        bucket: keep the files in this S3 bucket, under {database}/{name}/,
+        instead of under root.
+        """
         load_dotenv(override=True)
-        root = os.getenv("ROOT")
-        self._base_path = f"{root}/groups/grp_quant/database/{database.value}"
+        if bucket is not None:
+            self._storage = S3Storage()
+            self._base_path = f"s3://{bucket}/{database.value}"
+        else:
+            self._storage = LocalStorage()
+            self._base_path = database_folder(database, root)
+
+        self._database = database
 
         self._name = name
         self._schema = schema
         self._ids = ids
+        self._storage_policy = storage_policy
+        self._fixed_columns = fixed_columns
 
-        os.makedirs(f"{self._base_path}/{self._name}", exist_ok=True)
+        self._storage.makedirs(f"{self._base_path}/{self._name}")
 
     def _file_path(self, year: int | None = None) -> str:
         if year is not None:
@@ -31,48 +66,358 @@ class Table:
             return f"{self._base_path}/{self._name}/{self._name}_*.parquet"
 
     def exists(self, year: int) -> bool:
-        return os.path.exists(self._file_path(year))
+        return self._storage.exists(self._file_path(year))
+
+    def years(self) -> list[int]:
+        """Years with a file, oldest first."""
+        return sorted(
+            int(os.path.basename(path).removeprefix(f"{self._name}_").removesuffix(".parquet"))
+            for path in self._storage.glob(self._file_path())
+        )
+
+    @property
+    def schema(self) -> dict[str, pl.DataType]:
+        return self._schema
+
+    @property
+    def storage_policy(self) -> StoragePolicy | None:
+        return self._storage_policy
+
+    def _storage_schema(self) -> dict[str, pl.DataType]:
+        if self._storage_policy is None:
+            return self._schema
+        return self._storage_policy.storage_schema(self._schema)
+
+    def encode(self, frame: pl.DataFrame | pl.LazyFrame) -> pl.DataFrame | pl.LazyFrame:
+        """Narrow a frame to the table's storage dtypes (a no-op without a storage policy)."""
+        if self._storage_policy is None:
+            return frame
+        return self._storage_policy.encode(frame)
+
+    def conform(self, frame: pl.DataFrame | pl.LazyFrame, stored: bool = False) -> pl.DataFrame | pl.LazyFrame:
+        """
+        Exactly the schema's columns in order, adding absent ones as nulls (a
+        no-op without fixed columns). stored frames, scanned from the table's
+        files, are conformed to the storage schema instead.
+        """
+        if not self._fixed_columns:
+            return frame
+
+        schema = self._storage_schema() if stored else self._schema
+        columns = frame.collect_schema().names()
+        return frame.select(
+            pl.col(column).cast(dtype) if column in columns else pl.lit(None, dtype=dtype).alias(column)
+            for column, dtype in schema.items()
+        )
 
     def create_if_not_exists(self, year: int) -> None:
-        if not os.path.exists(self._file_path(year)):
-            pl.DataFrame(schema=self._schema).write_parquet(self._file_path(year))
+        with self._storage.lock(self._file_path(year)):
+            if not self._storage.exists(self._file_path(year)):
+                self._record_columns(self._storage_schema())
+                self._storage.write(pl.DataFrame(schema=self._storage_schema()), self._file_path(year))
 
-    def read(self, year: int | None = None) -> pl.LazyFrame:
-        if year is None:
-            return pl.scan_parquet(self._file_path())
-        else:
-            return pl.scan_parquet(self._file_path(year))
+    def read(self, year: int | None = None, as_of_version: int | None = None) -> pl.LazyFrame:
+        """
+        Lazy scan of one year, or of all years. With as_of_version the files
+        of that committed version are scanned instead of the live ones, so a
+        long query sees one consistent snapshot while writers carry on.
+        """
+        # Reads are lazy, so the stage records what the scan covers rather than its runtime
+        with stage(f"{self._name}.read") as current:
+            if as_of_version is None:
+                source = self._file_path(year)
+                paths = self._storage.glob(source)
+            else:
+                paths = self._version_paths(as_of_version, year)
+                source = paths
+
+            # Float columns may be narrower in files written under another precision
+            options = {"cast_options": pl.ScanCastOptions(float_cast=["upcast", "downcast"])}
+            if self._fixed_columns:
+                # Files written before the columns were fixed are padded to the schema while scanning
+                options |= {"schema": self._storage_schema(), "missing_columns": "insert", "extra_columns": "ignore"}
+            elif len(paths) > 1:
+                # Years written before a column was added lack it and read back as nulls
+                options |= {"schema": self._column_record(paths), "missing_columns": "insert"}
+
+            scan = self._storage.scan(source, **options)
+
+            if counting_reads():
+                current.add(rows_in=self._storage.parquet_rows(paths), bytes_read=self._storage.file_bytes(paths))
+
+        if self._storage_policy is None:
+            return scan
+        return self._storage_policy.decode(scan)
+
+    def _schema_path(self) -> str:
+        return f"{self._base_path}/{self._name}/_schema.parquet"
+
+    def _recorded_schema(self) -> dict[str, pl.DataType] | None:
+        if not self._storage.exists(self._schema_path()):
+            return None
+        return dict(self._storage.scan(self._schema_path()).collect_schema())
+
+    def _record_columns(self, schema: dict[str, pl.DataType]) -> None:
+        """
+        Add schema's columns to the table's column record, an empty parquet
+        file holding every column written to any year. Reads pad older years
+        from it, so they never open each year's footer. Fixed-column tables
+        are padded to their schema instead and keep no record.
+        """
+        if self._fixed_columns:
+            return
+
+        with self._storage.lock(self._schema_path()):
+            recorded = self._recorded_schema() or {}
+            union = union_schema([recorded, dict(schema)])
+            if union != recorded:
+                self._storage.write(pl.DataFrame(schema=union), self._schema_path())
+
+    def _column_record(self, paths: list[str]) -> dict[str, pl.DataType]:
+        """The recorded columns, built once from the files' footers for tables written before the record."""
+        recorded = self._recorded_schema()
+        if recorded is None:
+            recorded = union_schema([dict(self._storage.scan(path).collect_schema()) for path in paths])
+            self._record_columns(recorded)
+        return recorded
+
+    def write(self, year: int, df: pl.DataFrame) -> None:
+        """Replace a year's file with df, encoded to the storage dtypes."""
+        with stage(f"{self._name}.write") as current, self._storage.lock(self._file_path(year)):
+            df = self.encode(self.conform(df))
+            self._record_columns(df.schema)
+            self._storage.write(df, self._file_path(year))
+            current.add(rows_out=df.height, bytes_written=self._storage.file_bytes([self._file_path(year)]))
+
+    def rewrite(self, decode: StoragePolicy | None = None) -> None:
+        """
+        Rewrite every year's file in the table's storage dtypes. Files are
+        unpacked with decode (the table's own policy by default), so files
+        written under another storage policy can be migrated. The column
+        record is rebuilt from the rewritten files.
+        """
+        decode = decode or self._storage_policy
+        with self._storage.lock(self._schema_path()):
+            if self._storage.exists(self._schema_path()):
+                self._storage.remove(self._schema_path())
+
+        for path in sorted(self._storage.glob(self._file_path())):
+            year = int(os.path.splitext(os.path.basename(path))[0].removeprefix(f"{self._name}_"))
+            df = self._storage.scan(path).collect()
+            self.write(year, decode.decode(df) if decode is not None else df)
 
-    def read_id_file(self) -> pl.LazyFrame:
-        return pl.scan_parquet(f"{self._base_path}/{self._name}/{self._name}.parquet")
+    def last_date(self, column: str = "date") -> date | None:
+        """Latest value of `column` across all years, or None if the table is empty."""
+        if not self._storage.glob(self._file_path()):
+            return None
+
+        return self.read().select(pl.col(column).max()).collect().item()
+
+    def _id_file_path(self) -> str:
+        return f"{self._base_path}/{self._name}/{self._name}.parquet"
+
+    def id_file_exists(self) -> bool:
+        """Whether the table's single (non-yearly) file has been written, see overwrite."""
+        return self._storage.exists(self._id_file_path())
+
+    def read_id_file(self, as_of_version: int | None = None) -> pl.LazyFrame:
+        with stage(f"{self._name}.read_id_file") as current:
+            if as_of_version is None:
+                path = self._id_file_path()
+            else:
+                path = self._version_path(as_of_version, os.path.basename(self._id_file_path()))
+            if counting_reads():
+                paths = self._storage.glob(path)
+                current.add(rows_in=self._storage.parquet_rows(paths), bytes_read=self._storage.file_bytes(paths))
+
+        return self._storage.scan(path)
     
     def overwrite(self, df: pl.DataFrame) -> None:
-        df.write_parquet(f"{self._base_path}/{self._name}/{self._name}.parquet")
+        with stage(f"{self._name}.overwrite") as current, self._storage.lock(self._id_file_path()):
+            self._storage.write(df, self._id_file_path())
+            current.add(rows_out=df.height, bytes_written=self._storage.file_bytes([self._id_file_path()]))
 
-    def upsert(self, year: int, rows: pl.DataFrame) -> None:
-        (
-            pl.scan_parquet(self._file_path(year))
-            .update(rows.lazy(), on=self._ids, how="full")
-            .collect()
-            .write_parquet(self._file_path(year))
+    def _versions_path(self) -> str:
+        return f"{self._base_path}/{self._name}/_versions"
+
+    def _live_paths(self) -> list[str]:
+        return sorted(self._storage.glob(self._file_path()) + self._storage.glob(self._id_file_path()))
+
+    def _require_versions(self) -> None:
+        if not self._storage.supports_versions:
+            raise ValueError(f"Table {self._name} is in S3. Versions need local storage.")
+
+    def versions(self) -> list[int]:
+        """Committed versions, oldest first."""
+        return sorted(
+            int(os.path.basename(path).removesuffix(".json"))
+            for path in self._storage.glob(f"{self._versions_path()}/*.json")
         )
 
+    def _manifest(self, version: int) -> dict:
+        self._require_versions()
+        path = f"{self._versions_path()}/{version}.json"
+        if not os.path.exists(path):
+            raise ValueError(f"Table {self._name} has no version {version}. Expected one of {self.versions()}.")
+
+        with open(path) as file:
+            return json.load(file)
+
+    def _version_path(self, version: int, file_name: str) -> str:
+        if file_name not in self._manifest(version)["files"]:
+            raise ValueError(f"Table {self._name} version {version} has no {file_name}.")
+        return f"{self._versions_path()}/{version}/{file_name}"
+
+    def _version_paths(self, version: int, year: int | None = None) -> list[str]:
+        if year is not None:
+            return [self._version_path(version, os.path.basename(self._file_path(year)))]
+
+        id_file = os.path.basename(self._id_file_path())
+        return [
+            f"{self._versions_path()}/{version}/{file_name}"
+            for file_name in self._manifest(version)["files"]
+            if file_name != id_file
+        ]
+
+    def commit_version(self, keep: int | None = None) -> int:
+        """
+        Record the current files as a new version and return its number.
+
+        Files are hard linked into _versions/{version}/, so a version copies
+        no data. Writes always replace files by rename, so a linked file never
+        changes afterwards. The manifest is written last and atomically, so a
+        version is either complete or invisible. keep prunes to the newest
+        keep versions.
+        """
+        self._require_versions()
+        os.makedirs(self._versions_path(), exist_ok=True)
+        with file_lock(f"{self._versions_path()}/manifest"):
+            version = max(self.versions(), default=0) + 1
+            folder = f"{self._versions_path()}/{version}"
+
+            # Left over from a commit that died before its manifest
+            shutil.rmtree(folder, ignore_errors=True)
+            os.makedirs(folder)
+
+            files = []
+            for path in self._live_paths():
+                with file_lock(path):
+                    if os.path.exists(path):
+                        os.link(path, f"{folder}/{os.path.basename(path)}")
+                        files.append(os.path.basename(path))
+
+            manifest = {"version": version, "created_at": datetime.now().isoformat(), "files": files}
+            with atomic_file(f"{self._versions_path()}/{version}.json") as file:
+                file.write(json.dumps(manifest, indent=2).encode())
+
+            if keep is not None:
+                self._prune_versions(keep)
+
+        return version
+
+    def _prune_versions(self, keep: int) -> None:
+        # Scans already collecting from a pruned version keep their open files
+        for version in self.versions()[:-keep]:
+            os.remove(f"{self._versions_path()}/{version}.json")
+            shutil.rmtree(f"{self._versions_path()}/{version}", ignore_errors=True)
+
+    def rollback(self, version: int) -> int:
+        """
+        Make a version's files live again, without rerunning any flow, and
+        commit that state as a new version, which is returned. Each file
+        switches atomically. Files created after the version are removed.
+        """
+        files = self._manifest(version)["files"]
+        folder = f"{self._versions_path()}/{version}"
+
+        for file_name in files:
+            path = f"{self._base_path}/{self._name}/{file_name}"
+            with file_lock(path):
+                link_atomic(f"{folder}/{file_name}", path)
+
+        for path in self._live_paths():
+            if os.path.basename(path) not in files:
+                with file_lock(path):
+                    remove_atomic(path)
+
+        return self.commit_version()
+
+    def mirror(self, bucket: str) -> list[str]:
+        """
+        Upload the live files to bucket under {database}/{name}/, the layout a
+        Table with that bucket reads, and return their keys.
+        """
+        if not isinstance(self._storage, LocalStorage):
+            raise ValueError(f"Table {self._name} is already in S3.")
+
+        # The column record goes along, so reads of the mirror do not rebuild it from footers
+        paths = self._live_paths()
+        if self._storage.exists(self._schema_path()):
+            paths.append(self._schema_path())
+
+        keys = []
+        for path in paths:
+            file_key = f"{self._database.value}/{self._name}/{os.path.basename(path)}"
+            s3.upload_file(path, bucket, file_key)
+            keys.append(file_key)
+        return keys
+
+    def _with_new_columns(self, existing: pl.LazyFrame, rows: pl.LazyFrame, add_columns: bool) -> pl.LazyFrame:
+        """The existing file widened by the columns of rows it lacks, when add_columns is set."""
+        if not add_columns:
+            return existing
+        if self._fixed_columns:
+            raise ValueError(f"Table {self._name} has fixed columns. Add new columns to its schema instead.")
+        return add_missing_columns(existing, rows.collect_schema())
+
+    def upsert(self, year: int, rows: pl.DataFrame, add_columns: bool = False) -> None:
+        """
+        Insert or update rows by the table's ids. Columns of rows the file
+        lacks are dropped, unless add_columns is set, in which case they are
+        added in the same rewrite.
+        """
+        with stage(f"{self._name}.upsert") as current, self._storage.lock(self._file_path(year)):
+            current.add(rows_in=rows.height, bytes_read=self._storage.file_bytes([self._file_path(year)]))
+            rows = self.encode(self.conform(rows.lazy()))
+            result = (
+                self._storage.scan(self._file_path(year))
+                .pipe(self.conform, stored=True)
+                .pipe(self._with_new_columns, rows, add_columns)
+                .update(rows, on=self._ids, how="full")
+                .collect()
+            )
+            self._record_columns(result.schema)
+            self._storage.write(result, self._file_path(year))
+            current.add(rows_out=result.height, bytes_written=self._storage.file_bytes([self._file_path(year)]))
+
     def update(
-        self, year: int, rows: pl.DataFrame, on: Optional[list[str]] = None
+        self,
+        year: int,
+        rows: pl.DataFrame,
+        on: Optional[list[str]] = None,
+        add_columns: bool = False,
     ) -> None:
+        """Update existing rows matched on `on` (the table's ids by default). add_columns as in upsert."""
         on = on or self._ids
-        (
-            pl.scan_parquet(self._file_path(year))
-            .update(rows.lazy(), on=on, how="left")
-            .collect()
-            .write_parquet(self._file_path(year))
-        )
+        with stage(f"{self._name}.update") as current, self._storage.lock(self._file_path(year)):
+            current.add(rows_in=rows.height, bytes_read=self._storage.file_bytes([self._file_path(year)]))
+            rows = self.encode(rows.lazy())
+            result = (
+                self._storage.scan(self._file_path(year))
+                .pipe(self.conform, stored=True)
+                .pipe(self._with_new_columns, rows, add_columns)
+                .update(rows, on=on, how="left")
+                .collect()
+            )
+            self._record_columns(result.schema)
+            self._storage.write(result, self._file_path(year))
+            current.add(rows_out=result.height, bytes_written=self._storage.file_bytes([self._file_path(year)]))
 
     def delete(self, year: int) -> None:
         """Delete parquet file for a specific year."""
-        file_path = self._file_path(year)
-        if os.path.exists(file_path):
-            os.remove(file_path)
+        with self._storage.lock(self._file_path(year)):
+            if self._storage.exists(self._file_path(year)):
+                self._storage.remove(self._file_path(year))
 
     def update_asof(
         self,
@@ -102,7 +447,7 @@ class Table:
         Returns:
             Joined DataFrame with resolved column conflicts
         """
-        left_df = pl.scan_parquet(self._file_path(year))
+        left_df = self._storage.scan(self._file_path(year))
 
         if drop_right_cols is None:
             drop_right_cols = []
@@ -150,17 +495,85 @@ class Table:
         for col in sorted(right_only_cols):
             select_exprs.append(pl.col(col))
 
-        joined.select(select_exprs).collect().write_parquet(self._file_path(year))
+        with stage(f"{self._name}.update_asof") as current, self._storage.lock(self._file_path(year)):
+            current.add(rows_in=right_df.height, bytes_read=self._storage.file_bytes([self._file_path(year)]))
+            result = joined.select(select_exprs).collect()
+            self._record_columns(result.schema)
+            self._storage.write(result, self._file_path(year))
+            current.add(rows_out=result.height, bytes_written=self._storage.file_bytes([self._file_path(year)]))
         
 
 class Database:
-    def __init__(self, database_name: DatabaseName):
+    def __init__(
+        self,
+        database_name: DatabaseName,
+        precision: Precision | None = None,
+        root: str | None = None,
+        bucket: str | None = None,
+    ):
+        """
+        precision overrides the ASSETS_PRECISION environment variable (full by default).
+        root overrides the ROOT environment variable, e.g. for a scratch copy of the database.
+        bucket reads and writes the S3 mirror of the database instead (see Table.mirror).
+        """
+        if precision is None:
+            load_dotenv(override=True)
+            precision = Precision(os.getenv("ASSETS_PRECISION", Precision.FULL.value))
+
         self._database_name = database_name
+        self._precision = precision
+        self._root = root
+        self._bucket = bucket
+
+    def _local_folder(self) -> str:
+        if self._bucket is not None:
+            raise ValueError(f"Database {self._database_name.value} is already in S3.")
+        load_dotenv(override=True)
+        return database_folder(self._database_name, self._root)
+
+    def push(self, bucket: str, max_workers: int = s3.SYNC_WORKERS_DEFAULT, delete: bool = False) -> list[str]:
+        """
+        Sync every table's live files to bucket under {database}/, the layout
+        Database(..., bucket=bucket) reads. Files whose object already has the
+        same size and is no older are skipped. With delete, objects with no
+        local file are removed. Returns the uploaded keys.
+        """
+        return s3.sync_up(self._local_folder(), bucket, self._database_name.value, max_workers, delete)
+
+    def pull(self, bucket: str, max_workers: int = s3.SYNC_WORKERS_DEFAULT) -> list[str]:
+        """Sync the bucket's copy of the database back into the local folder, the reverse of push."""
+        return s3.sync_down(bucket, self._database_name.value, self._local_folder(), max_workers)
+
+    def rewrite_precision(self) -> list[str]:
+        """
+        Rewrite the assets tables' files in this database's precision, e.g. after
+        changing ASSETS_PRECISION. Files in either precision are read, so a
+        database with a mix of both can be rewritten. Returns the rewritten tables.
+        """
+        compact = Database(self._database_name, Precision.COMPACT, self._root, self._bucket)
+        names = ["assets", "crsp_assets"]
+        for name in names:
+            self.table(name).rewrite(decode=compact.table(name).storage_policy)
+
+        return names
+
+    # Tables whose property is not named {name}_table
+    _TABLE_PROPERTIES = {"alphas": "alpha_table"}
+
+    def table(self, name: str) -> Table:
+        """Table by its name, e.g. "barra_returns". Only that table is built."""
+        attribute = self._TABLE_PROPERTIES.get(name, f"{name}_table")
+        if not isinstance(getattr(type(self), attribute, None), property):
+            raise ValueError(f"Database {self._database_name.value} has no table {name}.")
+
+        return getattr(self, attribute)
 
     @property
     def assets_table(self) -> Table:
         return Table(
             database=self._database_name,
+            root=self._root,
+            bucket=self._bucket,
             name="assets",
             schema={
                 "date": pl.Date,
@@ -199,12 +612,73 @@ class Database:
                 "average_daily_bid_ask_spread_90": pl.Float64,
             },
             ids=["date", "barrid"],
+            storage_policy=self._assets_storage_policy(),
+        )
+
+    def _assets_storage_policy(self, float32: list[str] | None = None) -> StoragePolicy | None:
+        """Storage policy of the assets table, narrowing float32 columns as well."""
+        if self._precision is not Precision.COMPACT:
+            return None
+
+        # market_cap stays Float64: cap weights sum it across the universe
+        return StoragePolicy(
+            float32=[
+                "price",
+                "return",
+                "specific_return",
+                "yield",
+                "total_risk",
+                "specific_risk",
+                "historical_beta",
+                "predicted_beta",
+                "daily_volume",
+                "average_daily_volume_30",
+                "average_daily_volume_60",
+                "average_daily_volume_90",
+                "bid_ask_spread",
+                "average_daily_bid_ask_spread_30",
+                "average_daily_bid_ask_spread_60",
+                "average_daily_bid_ask_spread_90",
+                *(float32 or []),
+            ],
+            categorical=[
+                "instrument",
+                "price_source",
+                "currency",
+                "iso_country_code",
+                "iso_currency_code",
+            ],
+            flags={"membership": ["russell_1000", "russell_2000", "in_universe"]},
+        )
+
+    @property
+    def crsp_assets_table(self) -> Table:
+        """The assets panel with the permno and CRSP daily fields each barrid mapped to on each date."""
+        return Table(
+            database=self._database_name,
+            root=self._root,
+            bucket=self._bucket,
+            name="crsp_assets",
+            schema={
+                **self.assets_table.schema,
+                "permno": pl.Int64,
+                "crsp_ret": pl.Float64,
+                "crsp_retx": pl.Float64,
+                "crsp_prc": pl.Float64,
+                "crsp_vol": pl.Int64,
+                "crsp_shrout": pl.Int64,
+            },
+            ids=["date", "barrid"],
+            storage_policy=self._assets_storage_policy(float32=["crsp_ret", "crsp_retx", "crsp_prc"]),
+            fixed_columns=True,
         )
 
     @property
     def barra_returns_table(self) -> Table:
         return Table(
             database=self._database_name,
+            root=self._root,
+            bucket=self._bucket,
             name="barra_returns",
             schema={
                 "barrid": pl.String,
@@ -222,6 +696,8 @@ class Database:
     def barra_specific_returns_table(self) -> Table:
         return Table(
             database=self._database_name,
+            root=self._root,
+            bucket=self._bucket,
             name="barra_specific_returns",
             schema={
                 "barrid": pl.String,
@@ -235,6 +711,8 @@ class Database:
     def barra_risk_table(self) -> Table:
         return Table(
             database=self._database_name,
+            root=self._root,
+            bucket=self._bucket,
             name="barra_risk",
             schema={
                 "barrid": pl.String,
@@ -252,6 +730,8 @@ class Database:
     def barra_volume_table(self) -> Table:
         return Table(
             database=self._database_name,
+            root=self._root,
+            bucket=self._bucket,
             name="barra_volume",
             schema={
                 "date": pl.Date,
@@ -272,7 +752,10 @@ class Database:
     def exposures_table(self) -> Table:
         return Table(
             database=self._database_name,
+            root=self._root,
+            bucket=self._bucket,
             name="exposures",
+            fixed_columns=True,
             schema={
                 "date": pl.Date,
                 "barrid": pl.String,
@@ -285,7 +768,10 @@ class Database:
     def covariances_table(self) -> Table:
         return Table(
             database=self._database_name,
+            root=self._root,
+            bucket=self._bucket,
             name="covariances",
+            fixed_columns=True,
             schema={
                 "date": pl.Date,
                 "factor_1": pl.String,
@@ -298,6 +784,8 @@ class Database:
     def crsp_events_table(self) -> Table:
         return Table(
             database=self._database_name,
+            root=self._root,
+            bucket=self._bucket,
             name="crsp_events",
             schema={
                 "date": pl.Date,
@@ -309,10 +797,30 @@ class Database:
             ids=["date", "permno"],
         )
 
+    @property
+    def crsp_names_table(self) -> Table:
+        """CRSP's name history: each permno's historical CUSIP (ncusip) and ticker over [namedt, nameendt]."""
+        return Table(
+            database=self._database_name,
+            root=self._root,
+            bucket=self._bucket,
+            name="crsp_names",
+            schema={
+                "permno": pl.Int64,
+                "namedt": pl.Date,
+                "nameendt": pl.Date,
+                "ncusip": pl.String,
+                "ticker": pl.String,
+            },
+            ids=["permno", "namedt"],
+        )
+
     @property
     def crsp_monthly_table(self) -> Table:
         return Table(
             database=self._database_name,
+            root=self._root,
+            bucket=self._bucket,
             name="crsp_monthly",
             schema={
                 "date": pl.Date,
@@ -331,6 +839,8 @@ class Database:
     def crsp_daily_table(self) -> Table:
         return Table(
             database=self._database_name,
+            root=self._root,
+            bucket=self._bucket,
             name="crsp_daily",
             schema={
                 "date": pl.Date,
@@ -352,6 +862,8 @@ class Database:
     def crsp_v2_monthly_table(self) -> Table:
         return Table(
             database=self._database_name,
+            root=self._root,
+            bucket=self._bucket,
             name="crsp_v2_monthly",
             schema={
                 "date": pl.Date,
@@ -373,6 +885,8 @@ class Database:
     def crsp_v2_daily_table(self) -> Table:
         return Table(
             database=self._database_name,
+            root=self._root,
+            bucket=self._bucket,
             name="crsp_v2_daily",
             schema={
                 "date": pl.Date,
@@ -398,6 +912,8 @@ class Database:
     def factors_table(self) -> Table:
         return Table(
             database=self._database_name,
+            root=self._root,
+            bucket=self._bucket,
             name="factors",
             schema={
                 "date": pl.Date,
@@ -410,6 +926,8 @@ class Database:
     def asset_ids_table(self) -> Table:
         return Table(
             database=self._database_name,
+            root=self._root,
+            bucket=self._bucket,
             name ="asset_ids",
             schema={
                 "start_date": pl.Date,
@@ -429,6 +947,8 @@ class Database:
     def barra_ids_table(self) -> Table:
         return Table(
             database=self._database_name,
+            root=self._root,
+            bucket=self._bucket,
             name="barra_ids",
             schema={
                 "barrid": pl.String,
@@ -440,10 +960,23 @@ class Database:
             ids=['barrid','start_date', "asset_id_type", "end_date"]
         )
 
+    @property
+    def id_index_table(self) -> Table:
+        return Table(
+            database=self._database_name,
+            root=self._root,
+            bucket=self._bucket,
+            name="id_index",
+            schema=ID_INDEX_SCHEMA,
+            ids=["barrid", "id_type", "start_date"],
+        )
+
     @property
     def fama_french_table(self) -> Table:
         return Table(
             database=self._database_name,
+            root=self._root,
+            bucket=self._bucket,
             name="fama_french",
             schema={
                 "date": pl.Date,
@@ -461,6 +994,8 @@ class Database:
     def ftse_russell_table(self) -> Table:
         return Table(
             database=self._database_name,
+            root=self._root,
+            bucket=self._bucket,
             name="ftse_russell",
             schema={
                 "date": pl.Date,
@@ -476,6 +1011,8 @@ class Database:
     def signals_table(self) -> Table:
         return Table(
             database=self._database_name,
+            root=self._root,
+            bucket=self._bucket,
             name="signals",
             schema={
                 "date": pl.Date,
@@ -490,6 +1027,8 @@ class Database:
     def scores_table(self) -> Table:
         return Table(
             database=self._database_name,
+            root=self._root,
+            bucket=self._bucket,
             name="scores",
             schema={
                 "date": pl.Date,
@@ -505,6 +1044,8 @@ class Database:
     def alpha_table(self) -> Table:
         return Table(
             database=self._database_name,
+            root=self._root,
+            bucket=self._bucket,
             name="alphas",
             schema={
                 "date": pl.Date,
@@ -519,6 +1060,8 @@ class Database:
     def active_weights_table(self) -> Table:
         return Table(
             database=self._database_name,
+            root=self._root,
+            bucket=self._bucket,
             name="active_weights",
             schema={
                 "date": pl.Date,
@@ -533,6 +1076,8 @@ class Database:
     def composite_alphas_table(self) -> Table:
         return Table(
             database=self._database_name,
+            root=self._root,
+            bucket=self._bucket,
             name="composite_alphas",
             schema={
                 "date": pl.Date,
@@ -546,11 +1091,13 @@ class Database:
     def signal_returns_table(self) -> Table:
         return Table(
             database=self._database_name,
+            root=self._root,
+            bucket=self._bucket,
             name="signal_returns",
             schema={
                 "date": pl.Date,
                 "signal_name": pl.String,
-                "forward_return": pl.String,
+                "forward_return": pl.Float64,
             },
             ids=["date", "signal_name"],
         )
@@ -559,6 +1106,8 @@ class Database:
     def signal_weights_table(self) -> Table:
         return Table(
             database=self._database_name,
+            root=self._root,
+            bucket=self._bucket,
             name="signal_weights",
             schema={
                 "date": pl.Date,
@@ -567,4 +1116,66 @@ class Database:
             },
             ids=["date", "signal_name"],
         )
-    
\ No newline at end of file
+    
+
+    @property
+    def performance_table(self) -> Table:
+        return Table(
+            database=self._database_name,
+            root=self._root,
+            bucket=self._bucket,
+            name="performance",
+            schema={
+                "date": pl.Date,
+                "portfolio": pl.String,
+                "return": pl.Float64,
+                "benchmark_return": pl.Float64,
+                "active_return": pl.Float64,
+                "turnover": pl.Float64,
+                "cumulative_active_return": pl.Float64,
+                "rolling_sharpe": pl.Float64,
+                "drawdown": pl.Float64,
+            },
+            ids=["date", "portfolio"],
+        )
+
+    @property
+    def factor_attribution_table(self) -> Table:
+        return Table(
+            database=self._database_name,
+            root=self._root,
+            bucket=self._bucket,
+            name="factor_attribution",
+            schema={
+                "date": pl.Date,
+                "portfolio": pl.String,
+                "factor": pl.String,
+                "exposure": pl.Float64,
+                "contribution": pl.Float64,
+            },
+            ids=["date", "portfolio", "factor"],
+        )
+
+    @property
+    def run_metrics_table(self) -> Table:
+        return Table(
+            database=self._database_name,
+            root=self._root,
+            bucket=self._bucket,
+            name="run_metrics",
+            schema={
+                "run_id": pl.String,
+                "stage": pl.String,
+                "parent": pl.String,
+                "started_at": pl.Datetime,
+                "wall_seconds": pl.Float64,
+                "cpu_seconds": pl.Float64,
+                "peak_rss_mb": pl.Float64,
+                "rows_in": pl.Int64,
+                "rows_out": pl.Int64,
+                "bytes_read": pl.Int64,
+                "bytes_written": pl.Int64,
+                "status": pl.String,
+            },
+            ids=["run_id", "stage", "started_at"],
+        )
@@ -0,0 +1,403 @@
+import os
+import glob
+import polars as pl
+from datetime import date
+from pipelines.utils.tables import Database
+from pipelines.utils.atomic import file_lock, remove_atomic, write_parquet_atomic
+
+SCHEMAS = {
+    "calendar": {"date": pl.Date, "is_snapshot": pl.Boolean},
+    "snapshots": {"date": pl.Date, "barrid": pl.String, "weight": pl.Float64},
+    "deltas": {"date": pl.Date, "barrid": pl.String, "change": pl.Float64, "exit": pl.Boolean},
+}
+WEIGHTS_SCHEMA = SCHEMAS["snapshots"]
+
+TRADING_DAYS = 252
+
+
+def weight_changes(weights: pl.LazyFrame, tolerance: float = 0.0) -> pl.LazyFrame:
+    """
+    (date, barrid, change, exit) of every name whose weight differs from the
+    previous date in weights. Entries change from 0 and exits to 0, and are
+    kept whatever the tolerance; other changes at or below it are dropped.
+    The first date has no previous date, so every name on it enters.
+    """
+    next_dates = (
+        weights
+        .select(pl.col("date").unique().sort())
+        .with_columns(pl.col("date").shift(-1).alias("next_date"))
+    )
+    previous_weights = (
+        weights
+        .join(next_dates, on="date", how="inner")
+        .select(pl.col("next_date").alias("date"), "barrid", pl.col("weight").alias("previous_weight"))
+        .filter(pl.col("date").is_not_null())
+    )
+
+    return (
+        weights
+        .join(previous_weights, on=["date", "barrid"], how="full", coalesce=True)
+        .select(
+            "date",
+            "barrid",
+            pl.col("weight").fill_null(0).sub(pl.col("previous_weight").fill_null(0)).alias("change"),
+            pl.col("weight").is_null().alias("exit"),
+            pl.col("previous_weight").is_null().alias("entry"),
+        )
+        .filter(pl.col("change").abs().gt(tolerance) | pl.col("exit") | pl.col("entry"))
+        .drop("entry")
+        .sort("date", "barrid")
+    )
+
+
+class WeightsStore:
+    """
+    Backtest weights for one signal and risk target, stored as monthly full
+    snapshots plus daily deltas.
+
+    Layout under {root}/{signal_name}/{active_risk}/:
+    - calendar/calendar_{year}.parquet: (date, is_snapshot), every stored date
+    - snapshots/snapshots_{year}.parquet: (date, barrid, weight) on the first date of each month
+    - deltas/deltas_{year}.parquet: (date, barrid, change, exit) against the previous date
+    - *.parquet: daily (date, barrid, weight) files written by sf_backtester
+      jobs. Until compact() moves them in, they are read as part of the store
+      for the dates it does not hold; they never override stored dates.
+
+    Read weights through the store: a glob of the top-level files only finds
+    the backtest files not yet compacted.
+
+    Writes replace everything from their first date onward, so weights are
+    written in date order, and first compact any backtest files. A write
+    ending before the stored dates needs overwrite=True. With a
+    non-zero tolerance, changes at or below it are not recorded.
+    Reconstructed weights then drift by at most the tolerance times the
+    number of dates since the month's snapshot.
+    """
+
+    def __init__(
+        self,
+        signal_name: str,
+        active_risk: float,
+        root: str = "weights",
+        tolerance: float = 0.0,
+    ) -> None:
+        self._signal_name = signal_name
+        self._path = f"{root}/{signal_name}/{active_risk}"
+        self._tolerance = tolerance
+
+    def _file_path(self, kind: str, year: int | None = None) -> str:
+        if year is not None:
+            return f"{self._path}/{kind}/{kind}_{year}.parquet"
+        else:
+            return f"{self._path}/{kind}/{kind}_*.parquet"
+
+    def _scan(self, kind: str) -> pl.LazyFrame:
+        paths = sorted(glob.glob(self._file_path(kind)))
+        if not paths:
+            return pl.LazyFrame(schema=SCHEMAS[kind])
+        return pl.scan_parquet(paths)
+
+    def pending(self) -> list[str]:
+        """sf_backtester output not yet moved into the store by compact()."""
+        return sorted(glob.glob(f"{self._path}/*.parquet"))
+
+    def _scan_pending(self) -> pl.LazyFrame:
+        """Rows of the backtest files on dates the store does not hold."""
+        return (
+            pl.scan_parquet(self.pending())
+            .select(WEIGHTS_SCHEMA.keys())
+            .cast(WEIGHTS_SCHEMA)
+            .join(self._scan("calendar").select("date"), on="date", how="anti")
+        )
+
+    def exists(self) -> bool:
+        return bool(glob.glob(self._file_path("calendar")) or self.pending())
+
+    def last_date(self) -> date | None:
+        if not self.exists():
+            return None
+
+        return self._dates().select(pl.col("date").max()).collect().item()
+
+    def _dates(self, start: date | None = None, end: date | None = None) -> pl.LazyFrame:
+        """Every date the store, or a backtest file not yet compacted, holds weights for."""
+        dates = self._scan("calendar").select("date")
+        if self.pending():
+            dates = pl.concat([dates, self._scan_pending().select(pl.col("date").unique())])
+
+        return dates.filter(pl.col("date").is_between(start or date.min, end or date.max)).sort("date")
+
+    def read(self, start: date | None = None, end: date | None = None) -> pl.LazyFrame:
+        """(date, barrid, weight) rows for dates in [start, end], sorted by date and barrid."""
+        weights = self._reconstruct(start or date.min, end or date.max)
+        if not self.pending():
+            return weights
+
+        return (
+            pl.concat([
+                weights,
+                self._scan_pending().filter(pl.col("date").is_between(start or date.min, end or date.max)),
+            ])
+            .sort("date", "barrid")
+        )
+
+    def _reconstruct(self, start: date, end: date) -> pl.LazyFrame:
+        """Stored weights for dates in [start, end], from each month's snapshot plus its deltas."""
+        segment_start = start.replace(day=1)
+
+        calendar = (
+            self._scan("calendar")
+            .filter(pl.col("date").is_between(segment_start, end))
+            .with_columns(pl.col("date").dt.truncate("1mo").alias("segment"))
+        )
+
+        snapshots = (
+            self._scan("snapshots")
+            .filter(pl.col("date").is_between(segment_start, end))
+            .select(
+                pl.col("date").dt.truncate("1mo").alias("segment"),
+                "barrid",
+                pl.col("weight").alias("base"),
+            )
+        )
+
+        # Deltas on snapshot dates are already folded into the snapshot
+        deltas = (
+            self._scan("deltas")
+            .filter(pl.col("date").is_between(segment_start, end))
+            .join(calendar.filter(~pl.col("is_snapshot")), on="date", how="inner")
+            .select("date", "segment", "barrid", "change", "exit")
+        )
+
+        members = pl.concat(
+            [snapshots.select("segment", "barrid"), deltas.select("segment", "barrid")]
+        ).unique()
+
+        return (
+            members
+            .join(calendar, on="segment", how="inner")
+            .join(snapshots, on=["segment", "barrid"], how="left")
+            .join(deltas.drop("segment"), on=["date", "barrid"], how="left")
+            .sort("segment", "barrid", "date")
+            .with_columns(
+                pl.col("base").fill_null(0)
+                .add(pl.col("change").fill_null(0).cum_sum().over("segment", "barrid"))
+                .alias("weight"),
+                # Snapshot members start present; entries and exits flip membership
+                pl.when(pl.col("exit").is_not_null())
+                .then(~pl.col("exit"))
+                .when(pl.col("is_snapshot"))
+                .then(pl.col("base").is_not_null())
+                .forward_fill()
+                .over("segment", "barrid")
+                .fill_null(False)
+                .alias("present"),
+            )
+            .filter(pl.col("present"), pl.col("date").is_between(start, end))
+            .select("date", "barrid", "weight")
+            .sort("date", "barrid")
+        )
+
+    def deltas(self, start: date | None = None, end: date | None = None) -> pl.LazyFrame:
+        """Day-over-day weight changes, including entries and exits, read from the stored deltas."""
+        start = start or date.min
+        end = end or date.max
+
+        deltas = self._scan("deltas").filter(pl.col("date").is_between(start, end))
+        if not self.pending():
+            return deltas
+
+        # Backtest files hold full weights, so their changes are derived until they are compacted
+        backtest_changes = (
+            weight_changes(self.read(end=end))
+            .join(self._scan_pending().select(pl.col("date").unique()), on="date", how="semi")
+            .filter(pl.col("date").ge(start))
+        )
+        return pl.concat([deltas, backtest_changes]).sort("date", "barrid")
+
+    def turnover(self, start: date | None = None, end: date | None = None) -> pl.LazyFrame:
+        """Sum of absolute weight changes per date, read straight from the deltas."""
+        return (
+            self._dates(start, end)
+            .join(
+                self.deltas(start, end)
+                .group_by("date")
+                .agg(pl.col("change").abs().sum().alias("turnover")),
+                on="date",
+                how="left",
+            )
+            .with_columns(pl.col("turnover").fill_null(0))
+            .sort("date")
+        )
+
+    def trading_cost(
+        self,
+        database: Database,
+        aum: float,
+        impact_coefficient: float = 1.0,
+        volume_window: int = 30,
+        start: date | None = None,
+        end: date | None = None,
+    ) -> pl.LazyFrame:
+        """
+        Turnover and estimated trading cost per date, all as fractions of AUM.
+
+        Each trade is the absolute change in a name's weight. Spread cost is
+        half the bid_ask_spread (a fraction of price) on the traded value.
+        Market impact follows the square-root law: a trade moves the price by
+        impact_coefficient times the name's daily volatility times the square
+        root of the trade's share of average daily dollar volume. Daily
+        volatility is the annualized total_risk (in percent) over sqrt(252),
+        and dollar volume is average_daily_volume_{volume_window} (in shares)
+        times price.
+        """
+        if volume_window not in (30, 60, 90):
+            raise ValueError(f"volume_window must be 30, 60 or 90, got {volume_window}.")
+
+        start = start or date.min
+        end = end or date.max
+        volume = f"average_daily_volume_{volume_window}"
+
+        assets = (
+            database.assets_table.read()
+            .filter(pl.col("date").is_between(start, end))
+            .select(
+                "date",
+                "barrid",
+                "bid_ask_spread",
+                pl.col("total_risk").truediv(100).truediv(pl.lit(TRADING_DAYS).sqrt()).alias("daily_volatility"),
+                pl.col(volume).mul(pl.col("price")).alias("dollar_volume"),
+            )
+        )
+
+        trades = (
+            self.deltas(start, end)
+            .join(assets, on=["date", "barrid"], how="left")
+            .with_columns(pl.col("change").abs().alias("trade"))
+            .with_columns(
+                pl.col("trade").mul(pl.col("bid_ask_spread")).truediv(2).alias("spread_cost"),
+                pl.col("trade")
+                .mul(pl.col("daily_volatility"))
+                .mul(pl.col("trade").mul(aum).truediv(pl.col("dollar_volume")).sqrt())
+                .mul(impact_coefficient)
+                .alias("impact_cost"),
+            )
+            .group_by("date")
+            .agg(pl.col("trade").sum().alias("turnover"), pl.col("spread_cost").sum(), pl.col("impact_cost").sum())
+        )
+
+        return (
+            self._dates(start, end)
+            .join(trades, on="date", how="left")
+            .with_columns(pl.col("turnover", "spread_cost", "impact_cost").fill_null(0))
+            .with_columns(pl.col("spread_cost").add(pl.col("impact_cost")).alias("cost"))
+            .sort("date")
+        )
+
+    def check_overwrite(self, end: date, overwrite: bool = False) -> None:
+        """Raise if writing weights through end would drop stored dates after it, unless overwrite."""
+        last_date = self.last_date()
+        if not overwrite and last_date is not None and last_date > end:
+            raise ValueError(
+                f"The '{self._signal_name}' weights store holds dates through {last_date}. "
+                f"Writing weights through {end} would drop the later ones; pass overwrite=True to replace them."
+            )
+
+    def write(self, weights: pl.DataFrame, overwrite: bool = False) -> None:
+        """
+        Encode full (date, barrid, weight) rows, replacing anything stored from
+        their first date on. Stored dates after their last date are only
+        dropped with overwrite.
+        """
+        if weights.is_empty():
+            return
+
+        self.check_overwrite(weights["date"].max(), overwrite)
+
+        # Backtest files would otherwise fill dates after the ones written here
+        self.compact()
+        self._write(weights)
+
+    def _write(self, weights: pl.DataFrame) -> None:
+        weights = weights.select(WEIGHTS_SCHEMA.keys()).cast(WEIGHTS_SCHEMA).sort("date", "barrid")
+        first_date = weights["date"].min()
+
+        self._truncate(first_date)
+
+        # Seed deltas and snapshot placement with what is already stored
+        stored_calendar = self._scan("calendar").collect()
+        last_date = stored_calendar["date"].max()
+        previous = (
+            self._reconstruct(last_date, last_date).collect()
+            if last_date is not None
+            else pl.DataFrame(schema=WEIGHTS_SCHEMA)
+        )
+
+        stored_months = set(stored_calendar["date"].dt.truncate("1mo").to_list())
+        calendar = (
+            weights
+            .select(pl.col("date").unique().sort())
+            .with_columns(pl.col("date").dt.truncate("1mo").alias("month"))
+            .with_columns(
+                pl.col("date").eq(pl.col("date").min().over("month"))
+                .and_(~pl.col("month").is_in(list(stored_months)))
+                .alias("is_snapshot")
+            )
+            .drop("month")
+        )
+
+        deltas = (
+            weight_changes(pl.concat([previous, weights]).lazy(), self._tolerance)
+            .filter(pl.col("date").ge(first_date))
+            .collect()
+        )
+
+        snapshots = weights.join(
+            calendar.filter(pl.col("is_snapshot")).select("date"), on="date", how="semi"
+        )
+
+        for year in weights["date"].dt.year().unique().sort().to_list():
+            year_filter = pl.col("date").dt.year().eq(year)
+            for kind, frame in [("calendar", calendar), ("snapshots", snapshots), ("deltas", deltas)]:
+                path = self._file_path(kind, year)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                year_frame = frame.filter(year_filter)
+                with file_lock(path):
+                    if os.path.exists(path):
+                        year_frame = pl.concat([pl.read_parquet(path), year_frame])
+                    write_parquet_atomic(year_frame, path)
+
+    def _truncate(self, from_date: date) -> None:
+        """Drop stored rows on or after from_date."""
+        for kind in SCHEMAS:
+            for path in glob.glob(self._file_path(kind)):
+                year = int(path.rsplit("_", 1)[1].removesuffix(".parquet"))
+                if year < from_date.year:
+                    continue
+
+                with file_lock(path):
+                    kept = pl.read_parquet(path).filter(pl.col("date").lt(from_date))
+                    if kept.is_empty():
+                        remove_atomic(path)
+                    else:
+                        write_parquet_atomic(kept, path)
+
+    def compact(self) -> None:
+        """
+        Move sf_backtester's daily files into the store. Only their dates the
+        store does not hold are taken, as read() does. The files are removed
+        only once every year file holding their rows is in place.
+        """
+        paths = self.pending()
+        if not paths:
+            return
+
+        backtest_weights = self._scan_pending().collect()
+        if not backtest_weights.is_empty():
+            # Stored dates after the first new one are rewritten with it, so deltas stay chained
+            first_date = backtest_weights["date"].min()
+            stored = self._reconstruct(first_date, date.max).collect()
+            self._write(pl.concat([stored, backtest_weights]))
+
+        for path in paths:
+            remove_atomic(path)
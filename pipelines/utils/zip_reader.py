@@ -0,0 +1,81 @@
+import os
+import zipfile
+import polars as pl
+from collections import deque
+from contextlib import ExitStack
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable
+from pipelines.utils.raw_cache import read_cached_member
+
+MAX_WORKERS_DEFAULT = min(8, os.cpu_count() or 1)
+
+
+def read_zip_members(
+    zip_paths: list[str | Path],
+    member_prefix: str | list[str],
+    parse: Callable[[bytes], pl.DataFrame],
+    columns: list[str] | None = None,
+    transform: Callable[[pl.DataFrame], pl.DataFrame] | None = None,
+    cache_columns: list[str] | None = None,
+    max_workers: int | None = None,
+    max_in_flight: int | None = None,
+) -> list[pl.DataFrame]:
+    """
+    Decompress and parse every member starting with member_prefix across
+    several zips on a thread pool. Results come back in zip and member order.
+    Members already in the raw cache are read from it instead. A list of
+    prefixes gives one per zip. Each member is narrowed to columns, then
+    passed through transform, after the cache. cache_columns are the columns
+    a cache miss parses and stores (see read_cached_member).
+
+    Both zlib decompression and Polars CSV parsing release the GIL, so
+    members overlap across threads. At most max_in_flight members (default
+    twice the workers) are queued or being decoded at once, which caps the
+    raw bytes held in memory.
+    """
+    max_workers = max_workers or MAX_WORKERS_DEFAULT
+    max_in_flight = max_in_flight or 2 * max_workers
+
+    if isinstance(member_prefix, str):
+        member_prefix = [member_prefix] * len(zip_paths)
+
+    def decode(zip_folder: zipfile.ZipFile, zip_path: str | Path, member: str) -> pl.DataFrame:
+        df = read_cached_member(zip_folder, zip_path, member, parse, columns, cache_columns)
+        return transform(df) if transform else df
+
+    dfs = []
+    with ExitStack() as stack, ThreadPoolExecutor(max_workers=max_workers) as executor:
+        in_flight: deque[Future] = deque()
+
+        for zip_path, prefix in zip(zip_paths, member_prefix):
+            # ZipFile serializes reads of the underlying file, so threads can share it
+            zip_folder = stack.enter_context(zipfile.ZipFile(zip_path, "r"))
+
+            for member in zip_folder.namelist():
+                if not member.startswith(prefix):
+                    continue
+
+                if len(in_flight) >= max_in_flight:
+                    dfs.append(in_flight.popleft().result())
+
+                in_flight.append(executor.submit(decode, zip_folder, zip_path, member))
+
+        while in_flight:
+            dfs.append(in_flight.popleft().result())
+
+    return dfs
+
+
+def read_zip_member(
+    zip_path: str | Path,
+    member: str,
+    parse: Callable[[bytes], pl.DataFrame],
+    columns: list[str] | None = None,
+    transform: Callable[[pl.DataFrame], pl.DataFrame] | None = None,
+    cache_columns: list[str] | None = None,
+) -> pl.DataFrame:
+    """Parse a single zip member, through the raw cache, as in read_zip_members."""
+    with zipfile.ZipFile(zip_path, "r") as zip_folder:
+        df = read_cached_member(zip_folder, zip_path, member, parse, columns, cache_columns)
+    return transform(df) if transform else df
@@ -0,0 +1,63 @@
+import os
+import urllib.request
+import pytest
+from pathlib import Path
+from typing import Iterator
+from pipelines.utils.enums import DatabaseName
+from pipelines.utils.tables import Database, database_folder
+
+# Module-level Barra datasets resolve their archive from ROOT on import
+os.environ.setdefault("ROOT", "/tmp/sf-data-pipelines-tests")
+
+
+@pytest.fixture(autouse=True)
+def metrics_path(tmp_path, monkeypatch) -> Path:
+    """Stage metrics go under tmp_path rather than the working directory's logs/."""
+    path = tmp_path / "pipeline_metrics.jsonl"
+    monkeypatch.setenv("METRICS_PATH", str(path))
+    return path
+
+
+@pytest.fixture
+def database(tmp_path) -> Database:
+    """An empty development database under tmp_path."""
+    return Database(DatabaseName.DEVELOPMENT, root=str(tmp_path))
+
+
+@pytest.fixture
+def database_path(database, tmp_path) -> str:
+    return database_folder(DatabaseName.DEVELOPMENT, str(tmp_path))
+
+
+@pytest.fixture(scope="session")
+def s3_endpoint() -> Iterator[str]:
+    """
+    moto's S3 served over HTTP, so both boto3 and Polars' own S3 reader
+    (which an in-process mock cannot intercept) talk to it.
+    """
+    from moto.server import ThreadedMotoServer
+
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=0)
+    server.start()
+    host, port = server.get_host_and_port()
+    yield f"http://{host}:{port}"
+    server.stop()
+
+
+@pytest.fixture
+def s3_bucket(s3_endpoint, monkeypatch) -> str:
+    """An empty bucket on the moto server, reached through the shared pipelines client."""
+    from pipelines.utils import s3
+
+    monkeypatch.setattr(s3, "_settings", {
+        "aws_access_key_id": "testing",
+        "aws_secret_access_key": "testing",
+        "region_name": "us-east-1",
+        "endpoint_url": s3_endpoint,
+    })
+    monkeypatch.setattr(s3, "_clients", {})
+
+    # Buckets and objects from earlier tests are dropped
+    urllib.request.urlopen(urllib.request.Request(f"{s3_endpoint}/moto-api/reset", method="POST"))
+    s3.get_client().create_bucket(Bucket="sf-test")
+    return "sf-test"
@@ -0,0 +1,46 @@
+import polars as pl
+import pytest
+from datetime import date
+from benchmarks.synthetic import write_barra_tables
+from pipelines.assets_flow import assets_plan
+
+START, END = date(2020, 1, 1), date(2020, 3, 31)
+
+
+def test_assets_take_tickers_and_cusips_from_the_id_index(database):
+    write_barra_tables(database, START, END, n_assets=5)
+    index = database.id_index_table.read_id_file().collect()
+    barrid = index["barrid"][0]
+
+    # Only the index knows about this ticker change, so it must be what the plan reads
+    change = date(2020, 2, 3)
+    renamed = (
+        index
+        .filter(pl.col("barrid").eq(barrid), pl.col("id_type").eq("TICKER"))
+        .with_columns(pl.lit(change).alias("start_date"), pl.lit("RENAMED").alias("id"))
+    )
+    database.id_index_table.overwrite(
+        pl.concat([
+            index.with_columns(
+                pl.when(pl.col("barrid").eq(barrid) & pl.col("id_type").eq("TICKER"))
+                .then(pl.lit(change))
+                .otherwise(pl.col("end_date"))
+                .alias("end_date")
+            ),
+            renamed,
+        ]).sort("start_date")
+    )
+
+    assets = assets_plan(START, END, database, encode=False).filter(pl.col("barrid").eq(barrid)).collect()
+    tickers = assets.group_by(pl.col("date").ge(change).alias("after")).agg(pl.col("ticker").unique())
+
+    assert dict(zip(tickers["after"], tickers["ticker"].to_list())) == {
+        False: [index.filter(pl.col("barrid").eq(barrid), pl.col("id_type").eq("TICKER"))["id"].item()],
+        True: ["RENAMED"],
+    }
+    assert assets["cusip"].null_count() == 0
+
+
+def test_assets_plan_requires_the_id_index(database):
+    with pytest.raises(ValueError, match="id_index_flow"):
+        assets_plan(START, END, database)
@@ -0,0 +1,67 @@
+import os
+import threading
+import time
+import polars as pl
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from pipelines.utils.atomic import atomic_file, file_lock, link_atomic, remove_atomic, write_parquet_atomic
+
+
+def test_failed_write_leaves_the_file_and_no_temp(tmp_path):
+    path = str(tmp_path / "table.parquet")
+    write_parquet_atomic(pl.DataFrame({"x": [1]}), path)
+
+    with pytest.raises(RuntimeError):
+        with atomic_file(path) as file:
+            file.write(b"partial")
+            raise RuntimeError("interrupted")
+
+    assert pl.read_parquet(path)["x"].to_list() == [1]
+    assert os.listdir(tmp_path) == ["table.parquet"]
+
+
+def test_link_and_remove(tmp_path):
+    source, path = str(tmp_path / "source.parquet"), str(tmp_path / "link.parquet")
+    write_parquet_atomic(pl.DataFrame({"x": [1]}), source)
+    write_parquet_atomic(pl.DataFrame({"x": [2]}), path)
+
+    link_atomic(source, path)
+    assert os.path.samefile(source, path)
+
+    remove_atomic(path)
+    remove_atomic(path)
+    assert not os.path.exists(path)
+
+
+def test_file_lock_serializes_holders(tmp_path):
+    path = str(tmp_path / "table.parquet")
+    events = []
+
+    def hold(name: str) -> None:
+        with file_lock(path):
+            events.append(f"{name} start")
+            time.sleep(0.05)
+            events.append(f"{name} end")
+
+    threads = [threading.Thread(target=hold, args=(name,)) for name in ["a", "b"]]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Each holder finishes before the next one starts
+    assert [event.split()[1] for event in events] == ["start", "end", "start", "end"]
+
+
+def test_concurrent_upserts_keep_every_row(database):
+    table = database.barra_returns_table
+    table.create_if_not_exists(2020)
+
+    def upsert(day: int) -> None:
+        table.upsert(2020, pl.DataFrame({"date": [date(2020, 1, day)], "barrid": ["A"], "return": [float(day)]}))
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(upsert, range(1, 21)))
+
+    assert table.read(2020).collect().height == 20
@@ -0,0 +1,46 @@
+import numpy as np
+import polars as pl
+from pipelines.utils.backtester import FactorRiskModel, factor_covariance_matrix
+
+FACTORS = ["f1", "f2", "f3"]
+FULL = np.array([[4.0, 1.0, 0.5], [1.0, 9.0, -2.0], [0.5, -2.0, 16.0]])
+
+
+def long_covariances(matrix: np.ndarray, upper_only: bool = False) -> pl.DataFrame:
+    return pl.DataFrame({
+        "factor_1": FACTORS,
+        **{
+            factor: [
+                None if upper_only and row > column else matrix[row, column]
+                for row in range(len(FACTORS))
+            ]
+            for column, factor in enumerate(FACTORS)
+        },
+    })
+
+
+def test_factor_covariance_fills_a_missing_triangle_from_its_transpose():
+    matrix = factor_covariance_matrix(long_covariances(FULL, upper_only=True), FACTORS)
+    np.testing.assert_array_equal(matrix, FULL)
+
+
+def test_factor_covariance_averages_asymmetric_triangles():
+    skewed = FULL.copy()
+    skewed[0, 1] = 3.0
+
+    matrix = factor_covariance_matrix(long_covariances(skewed), FACTORS)
+    np.testing.assert_array_equal(matrix, matrix.T)
+    assert matrix[0, 1] == 2.0
+
+
+def test_woodbury_solve_matches_the_dense_covariance():
+    rng = np.random.default_rng(0)
+    exposures = rng.normal(size=(20, len(FACTORS)))
+    specific_risk = rng.uniform(20, 40, size=20)
+    rhs = rng.normal(size=(20, 2))
+
+    model = FactorRiskModel(exposures, factor_covariance_matrix(long_covariances(FULL, upper_only=True), FACTORS), specific_risk)
+    dense = exposures @ (FULL / 100**2) @ exposures.T + np.diag((specific_risk / 100) ** 2)
+
+    np.testing.assert_allclose(model.solve(rhs), np.linalg.solve(dense, rhs))
+    np.testing.assert_allclose(model.variance(rhs), np.einsum("im,ij,jm->m", rhs, dense, rhs))
@@ -0,0 +1,100 @@
+import zipfile
+import polars as pl
+import pytest
+from datetime import date
+from pipelines.utils.barra_datasets import BarraDataset, pivot_covariances, pivot_exposures
+from pipelines.utils.factors import factors
+
+DAY = date(2024, 1, 2)
+
+
+@pytest.fixture
+def archive(tmp_path, monkeypatch):
+    monkeypatch.setenv("BARRA_ARCHIVE", str(tmp_path / "archive"))
+    monkeypatch.setenv("BARRA_CACHE", str(tmp_path / "cache"))
+    return tmp_path
+
+
+def exposures_dataset(file_name: str = "USSLOWL_100_Asset_Exposure", **kwargs) -> BarraDataset:
+    return BarraDataset(
+        history_folder=None,
+        history_zip_file=None,
+        daily_folder="us/usslow",
+        daily_zip_file="SMD_USSLOWL_100",
+        file_name=file_name,
+        skip_rows=2,
+        **kwargs,
+    )
+
+
+def write_daily_zip(dataset: BarraDataset, rows: pl.DataFrame) -> None:
+    path = dataset.daily_zip_folder_path(DAY)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    contents = "Asset exposures\nGenerated 2024-01-02\n" + rows.write_csv(separator="|") + "[End of File]\n"
+    with zipfile.ZipFile(path, "w") as zip_folder:
+        zip_folder.writestr(dataset.file_name(DAY), contents)
+
+
+@pytest.fixture
+def long_exposures() -> pl.DataFrame:
+    return pl.DataFrame({
+        "!Barrid": ["USA0000001", "USA0000001", "USA0000002"],
+        "Factor": [factors[0], factors[1], factors[0]],
+        "Exposure": [0.5, -1.0, 1.5],
+        "DataDate": ["20240102"] * 3,
+        "Source": ["x"] * 3,
+    })
+
+
+def test_cache_holds_every_reader_s_columns_and_serves_each_projection(archive, long_exposures, monkeypatch):
+    wide = exposures_dataset(columns=["!Barrid", "Factor", "Exposure", "DataDate"], reshape=pivot_exposures)
+    write_daily_zip(wide, long_exposures)
+
+    exposures = wide.load_daily([DAY])
+
+    assert exposures.columns == ["DataDate", "!Barrid", *factors]
+    assert exposures.filter(pl.col("!Barrid").eq("USA0000001"))[factors[1]].item() == -1.0
+
+    # Only declared columns are parsed; Source is never read
+    [cached] = (archive / "cache").rglob("*.parquet")
+    assert pl.read_parquet(cached).columns == ["!Barrid", "Factor", "Exposure", "DataDate"]
+
+    # A different projection, without the reshape, is served from the same entry
+    long = exposures_dataset(columns=["!Barrid", "Exposure"])
+    monkeypatch.setattr(BarraDataset, "parse", lambda self, data: pytest.fail("re-parsed a cached member"))
+
+    projected = long.load_daily([DAY])
+    assert projected.columns == ["!Barrid", "Exposure"]
+    assert projected["Exposure"].to_list() == [0.5, -1.0, 1.5]
+
+
+def test_a_reader_with_new_columns_replaces_the_entry(archive, long_exposures):
+    file_name = "Test_Asset_Exposure"
+    narrow = exposures_dataset(file_name, columns=["!Barrid", "Exposure"])
+    write_daily_zip(narrow, long_exposures)
+    narrow.load_daily([DAY])
+
+    sourced = exposures_dataset(file_name, columns=["!Barrid", "Source"])
+    assert sourced.load_daily([DAY])["Source"].to_list() == ["x"] * 3
+
+    [cached] = (archive / "cache").rglob(f"{file_name}*.parquet")
+    assert pl.read_parquet(cached).columns == ["!Barrid", "Exposure", "Source"]
+
+
+def test_pivots_reject_factors_missing_from_factors_py(long_exposures):
+    new_factor = long_exposures.with_columns(pl.col("Factor").replace(factors[1], "USSLOWL_NEWFACTOR"))
+
+    with pytest.raises(ValueError, match="USSLOWL_NEWFACTOR"):
+        pivot_exposures(new_factor)
+
+
+def test_covariance_pivot_checks_both_factor_columns():
+    covariances = pl.DataFrame({
+        "!Factor1": [factors[0], "USSLOWL_NEWFACTOR"],
+        "Factor2": [factors[0], factors[0]],
+        "VarCovar": [1.0, 0.5],
+        "DataDate": [DAY, DAY],
+    })
+
+    with pytest.raises(ValueError, match="USSLOWL_NEWFACTOR"):
+        pivot_covariances(covariances)
@@ -0,0 +1,43 @@
+import math
+import polars as pl
+from datetime import date
+from pipelines.composite_alphas_flow import composite_alpha_matrix
+
+SIGNALS = ['a', 'b']
+DAY = date(2020, 1, 2)
+
+
+def alphas(rows: list[tuple[str, float | None, float | None]]) -> pl.DataFrame:
+    return pl.DataFrame(
+        {
+            'date': [DAY] * len(rows),
+            'barrid': [barrid for barrid, _, _ in rows],
+            'a': [a for _, a, _ in rows],
+            'b': [b for _, _, b in rows],
+        },
+        schema_overrides={'a': pl.Float64, 'b': pl.Float64},
+    )
+
+
+WEIGHTS = pl.DataFrame({'date': [DAY], 'a': [0.5], 'b': [2.0]})
+
+
+def composite(frame: pl.DataFrame, null_policy: str = 'zero') -> dict[str, float]:
+    result = composite_alpha_matrix(frame, WEIGHTS, SIGNALS, null_policy)
+    return dict(zip(result['barrid'], result['alpha']))
+
+
+def test_zero_policy_keeps_all_null_rows_as_zero():
+    result = composite(alphas([('X', 1.0, 1.0), ('Y', None, 1.0), ('Z', None, None)]))
+    assert result == {'X': 2.5, 'Y': 2.0, 'Z': 0.0}
+
+
+def test_nan_alpha_propagates_instead_of_counting_as_missing():
+    result = composite(alphas([('X', float('nan'), 1.0)]))
+    assert math.isnan(result['X'])
+
+
+def test_renormalize_and_drop_policies():
+    frame = alphas([('X', 1.0, 1.0), ('Y', None, 1.0), ('Z', None, None)])
+    assert composite(frame, 'renormalize') == {'X': 2.5, 'Y': 2.5}
+    assert composite(frame, 'drop') == {'X': 2.5}
@@ -0,0 +1,49 @@
+import polars as pl
+import pytest
+from datetime import date
+from pipelines.crsp_assets_flow import crsp_assets_flow
+from pipelines.id_index_flow import id_index_flow
+
+# USA0000001 changed CUSIP on 2010-06-01. CRSP's daily cusip column holds
+# the new (header) CUSIP on every date; only crsp_names dates the change.
+CUSIP_CHANGE = date(2010, 6, 1)
+DATES = [date(2010, 5, 27), date(2010, 5, 28), date(2010, 6, 1), date(2010, 6, 2)]
+
+
+def test_permnos_and_crsp_fields_attach_across_a_cusip_change(database):
+    database.barra_ids_table.overwrite(pl.DataFrame({
+        "barrid": ["USA0000001", "USA0000001"],
+        "asset_id_type": ["CUSIP", "CUSIP"],
+        "asset_id": ["111111117", "222222229"],
+        "start_date": [date(2000, 1, 1), CUSIP_CHANGE],
+        "end_date": [CUSIP_CHANGE, None],
+    }))
+    database.crsp_names_table.overwrite(pl.DataFrame({
+        "permno": [10001, 10001],
+        "namedt": [date(2000, 1, 3), CUSIP_CHANGE],
+        "nameendt": [date(2010, 5, 31), date(2024, 12, 31)],
+        "ncusip": ["11111111", "22222222"],
+        "ticker": ["OLD", "NEW"],
+    }))
+    database.crsp_daily_table.write(2010, pl.DataFrame({
+        "date": DATES,
+        "permno": [10001] * 4,
+        "cusip": ["22222222"] * 4,
+        "ret": [0.01, 0.02, 0.03, 0.04],
+        "retx": [0.01, 0.02, 0.03, 0.04],
+        "prc": [10.0, 10.2, 10.5, 10.9],
+        "vol": [100, 200, 300, 400],
+        "shrout": [1000] * 4,
+    }))
+    database.assets_table.write(2010, pl.DataFrame({
+        "date": DATES,
+        "barrid": ["USA0000001"] * 4,
+        "price": [10.0, 10.2, 10.5, 10.9],
+    }))
+
+    id_index_flow(database)
+    crsp_assets_flow(date(2010, 1, 1), date(2010, 12, 31), database)
+
+    panel = database.crsp_assets_table.read().sort("date").collect()
+    assert panel["permno"].to_list() == [10001] * 4
+    assert panel["crsp_ret"].to_list() == pytest.approx([0.01, 0.02, 0.03, 0.04])
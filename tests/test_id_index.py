@@ -0,0 +1,135 @@
+import polars as pl
+from datetime import date
+from pipelines.utils.id_index import (
+    build_id_index,
+    crsp_cusip_intervals,
+    interval_segments,
+    join_segments,
+    lookup_barrids,
+    lookup_ids,
+)
+
+
+def barra_ids(rows: list[tuple]) -> pl.LazyFrame:
+    return pl.LazyFrame(
+        rows,
+        schema={
+            "barrid": pl.String,
+            "asset_id_type": pl.String,
+            "asset_id": pl.String,
+            "start_date": pl.Date,
+            "end_date": pl.Date,
+        },
+        orient="row",
+    )
+
+
+def crsp_names(rows: list[tuple]) -> pl.LazyFrame:
+    return pl.LazyFrame(
+        rows,
+        schema={"permno": pl.Int64, "namedt": pl.Date, "nameendt": pl.Date, "ncusip": pl.String, "ticker": pl.String},
+        orient="row",
+    )
+
+
+# USA0000001 changed CUSIP from 11111111 to 22222222 on 2010-06-01. CRSP's
+# header CUSIP would be 22222222 on every date.
+CUSIP_CHANGE = date(2010, 6, 1)
+BARRA_IDS = barra_ids([
+    ("USA0000001", "CUSIP", "111111117", date(2000, 1, 1), CUSIP_CHANGE),
+    ("USA0000001", "CUSIP", "222222229", CUSIP_CHANGE, None),
+    ("USA0000001", "LOCALID", "USOLD", date(2000, 1, 1), CUSIP_CHANGE),
+    ("USA0000001", "LOCALID", "USNEW", CUSIP_CHANGE, None),
+])
+CRSP_NAMES = crsp_names([
+    (10001, date(2000, 1, 3), date(2005, 3, 1), "11111111", "OLD"),
+    (10001, date(2005, 3, 2), date(2010, 5, 31), "11111111", "OLDR"),
+    (10001, date(2010, 6, 1), date(2024, 12, 31), "22222222", "NEW"),
+])
+
+
+def test_crsp_cusip_intervals_merge_consecutive_names_with_one_cusip():
+    intervals = crsp_cusip_intervals(CRSP_NAMES).sort("start_date").collect()
+
+    assert intervals.rows() == [
+        (10001, "11111111", date(2000, 1, 3), CUSIP_CHANGE),
+        (10001, "22222222", CUSIP_CHANGE, date(2025, 1, 1)),
+    ]
+
+
+def test_permno_follows_a_cusip_change():
+    index = build_id_index(BARRA_IDS, CRSP_NAMES).lazy()
+    panel = pl.LazyFrame({
+        "date": [date(2000, 1, 3), date(2010, 5, 28), CUSIP_CHANGE, date(2024, 12, 31), date(2025, 1, 2)],
+        "barrid": ["USA0000001"] * 5,
+    })
+
+    permnos = lookup_ids(panel, index, "PERMNO").collect()
+
+    # The CRSP name history ends with its last backfill
+    assert permnos["permno"].to_list() == [10001, 10001, 10001, 10001, None]
+
+
+def test_lookups_round_trip_through_the_index():
+    index = build_id_index(BARRA_IDS, CRSP_NAMES).lazy()
+    crsp = pl.LazyFrame({"date": [date(2009, 1, 2), date(2011, 1, 3)], "permno": [10001, 10001]})
+
+    assert lookup_barrids(crsp, index, "PERMNO").collect()["barrid"].to_list() == ["USA0000001"] * 2
+
+    tickers = lookup_ids(pl.LazyFrame({"date": [date(2009, 1, 2), date(2011, 1, 3)], "barrid": ["USA0000001"] * 2}), index, "TICKER")
+    assert tickers.collect()["ticker"].to_list() == ["OLD", "NEW"]
+
+
+def test_index_has_no_permnos_without_crsp_names():
+    index = build_id_index(BARRA_IDS)
+
+    assert "PERMNO" not in index["id_type"].to_list()
+
+
+def intervals(value: str, rows: list[tuple]) -> pl.LazyFrame:
+    return pl.LazyFrame(
+        rows,
+        schema={"barrid": pl.String, "start_date": pl.Date, "end_date": pl.Date, value: pl.String},
+        orient="row",
+    )
+
+
+# Tickers change on 2020-03-01 and end on 2020-06-01; the CUSIP starts later and never ends.
+TICKERS = intervals("ticker", [
+    ("A", date(2020, 1, 1), date(2020, 3, 1), "AAA"),
+    ("A", date(2020, 3, 1), date(2020, 6, 1), "AAB"),
+    ("B", date(2020, 1, 1), None, "BBB"),
+])
+CUSIPS = intervals("cusip", [
+    ("A", date(2020, 2, 1), None, "111111111"),
+])
+
+
+def test_interval_segments_cut_at_every_source_boundary():
+    segments = interval_segments([TICKERS, CUSIPS]).sort("barrid", "start_date").collect()
+
+    assert segments.rows() == [
+        ("A", date(2020, 1, 1), "AAA", None),
+        ("A", date(2020, 2, 1), "AAA", "111111111"),
+        ("A", date(2020, 3, 1), "AAB", "111111111"),
+        ("A", date(2020, 6, 1), None, "111111111"),
+        ("B", date(2020, 1, 1), "BBB", None),
+    ]
+
+
+def test_join_segments_applies_end_dates():
+    panel = pl.LazyFrame({
+        "date": [date(2019, 12, 31), date(2020, 1, 15), date(2020, 2, 29), date(2020, 3, 1), date(2020, 7, 1), date(2020, 7, 1)],
+        "barrid": ["A", "A", "A", "A", "A", "B"],
+    })
+
+    joined = join_segments(panel, interval_segments([TICKERS, CUSIPS])).sort("barrid", "date").collect()
+
+    assert joined.select("ticker", "cusip").rows() == [
+        (None, None),
+        ("AAA", None),
+        ("AAA", "111111111"),
+        ("AAB", "111111111"),
+        (None, "111111111"),
+        ("BBB", None),
+    ]
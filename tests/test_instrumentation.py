@@ -0,0 +1,51 @@
+import json
+import polars as pl
+import pytest
+from datetime import date
+from pipelines.utils import instrumentation
+from pipelines.utils.storage import LocalStorage
+
+
+def read_records(path) -> list[dict]:
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+@pytest.fixture
+def returns_table(database):
+    table = database.barra_returns_table
+    table.write(2024, pl.DataFrame({"barrid": ["A", "B"], "return": [0.1, 0.2], "date": [date(2024, 1, 2)] * 2}))
+    return table
+
+
+def test_lazy_reads_do_no_extra_io_by_default(returns_table, metrics_path, monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("read touched the files before the query ran")
+
+    monkeypatch.setattr(LocalStorage, "parquet_rows", fail)
+    monkeypatch.setattr(LocalStorage, "file_bytes", fail)
+
+    returns_table.read().collect()
+
+    [record] = [record for record in read_records(metrics_path) if record["stage"] == "barra_returns.read"]
+    assert record["rows_in"] == 0
+
+
+def test_lazy_reads_are_counted_for_run_summaries(returns_table, metrics_path, monkeypatch):
+    monkeypatch.setattr(instrumentation, "_record_summary", True)
+
+    returns_table.read()
+
+    [record] = [record for record in read_records(metrics_path) if record["stage"] == "barra_returns.read"]
+    assert record["rows_in"] == 2
+    assert record["bytes_read"] > 0
+
+
+def test_nested_stages_roll_up_into_their_parent(metrics_path):
+    with instrumentation.stage("outer"):
+        with instrumentation.stage("inner") as inner:
+            inner.add(rows_in=3, bytes_written=10)
+
+    records = {record["stage"]: record for record in read_records(metrics_path)}
+    assert records["inner"]["parent"] == "outer"
+    assert records["outer"]["rows_in"] == 3
+    assert records["outer"]["bytes_written"] == 10
@@ -0,0 +1,52 @@
+import polars as pl
+import pytest
+from datetime import date
+from pipelines.performance_flow import benchmark_returns
+from pipelines.signal_returns_flow import signal_returns_flow
+from pipelines.utils.weights_store import WeightsStore
+
+DAYS = [date(2024, 1, 2), date(2024, 1, 3), date(2024, 1, 4), date(2024, 1, 5)]
+
+
+def write_assets(database, rows: list[tuple]) -> None:
+    database.assets_table.write(2024, pl.DataFrame(
+        rows, schema=["date", "barrid", "in_universe", "market_cap", "return"], orient="row"
+    ))
+
+
+def test_benchmark_uses_the_previous_trading_date_s_universe(database):
+    # B leaves the universe on the second day and returns on the third
+    write_assets(database, [
+        (DAYS[0], "A", True, 1.0, 0.0),
+        (DAYS[0], "B", True, 1.0, 0.0),
+        (DAYS[1], "A", True, 1.0, 1.0),
+        (DAYS[1], "B", False, 1.0, 2.0),
+        (DAYS[2], "A", True, 1.0, 1.0),
+        (DAYS[2], "B", True, 1.0, 50.0),
+        (DAYS[3], "A", True, 1.0, 1.0),
+        (DAYS[3], "B", True, 1.0, 3.0),
+    ])
+
+    benchmark = benchmark_returns(DAYS[0], DAYS[-1], database)
+
+    assert benchmark["date"].to_list() == DAYS[1:]
+    # Held at half weight out of the first day, not at all out of the second
+    assert benchmark["benchmark_return"].to_list() == pytest.approx([0.015, 0.01, 0.02])
+
+
+def test_signal_returns_skip_weights_across_a_gap_in_holdings(database, tmp_path):
+    write_assets(database, [(day, barrid, True, 1.0, 1.0) for day in DAYS for barrid in ["A", "B"]])
+    store = WeightsStore("composite_active", 0.05, root=str(tmp_path / "weights"))
+    store.write(pl.DataFrame({
+        "date": [DAYS[0], DAYS[0], DAYS[1], DAYS[2], DAYS[2], DAYS[3]],
+        "barrid": ["A", "B", "A", "A", "B", "A"],
+        "weight": [0.5, 0.5, 1.0, 0.5, 0.5, 1.0],
+    }))
+
+    signal_returns_flow(["composite_active"], database, weights_dir=str(tmp_path / "weights"))
+
+    returns = database.signal_returns_table.read().sort("date").collect()
+    assert returns["signal_name"].unique().to_list() == ["composite_active"]
+    # B was not held on the second day, so the third day's return only counts A
+    assert returns["date"].to_list() == DAYS[1:]
+    assert returns["forward_return"].to_list() == pytest.approx([0.01, 0.01, 0.01])
@@ -0,0 +1,106 @@
+import io
+import re
+import logging
+import polars as pl
+from datetime import date
+from pipelines.utils import s3
+from pipelines.utils.enums import DatabaseName
+from pipelines.utils.storage import S3Storage
+from pipelines.utils.tables import Database
+
+
+def read_object(bucket: str, key: str) -> pl.DataFrame:
+    return pl.read_parquet(io.BytesIO(s3.get_client().get_object(Bucket=bucket, Key=key)["Body"].read()))
+
+
+def test_s3_storage_writes_globs_and_removes_objects(s3_bucket):
+    storage = S3Storage()
+    df = pl.DataFrame({"date": [date(2020, 1, 2)], "barrid": ["A"], "return": [1.5]})
+
+    for year in [2020, 2021]:
+        storage.write(df, f"s3://{s3_bucket}/development/barra_returns/barra_returns_{year}.parquet")
+    storage.write(df, f"s3://{s3_bucket}/development/barra_risk/barra_risk_2020.parquet")
+
+    pattern = f"s3://{s3_bucket}/development/barra_returns/barra_returns_*.parquet"
+    path = f"s3://{s3_bucket}/development/barra_returns/barra_returns_2020.parquet"
+    assert sorted(storage.glob(pattern)) == [path, path.replace("2020", "2021")]
+    assert storage.exists(path)
+    assert storage.size(path) > 0
+    assert read_object(s3_bucket, "development/barra_returns/barra_returns_2020.parquet").equals(df)
+
+    storage.remove(path)
+    assert not storage.exists(path)
+    assert storage.glob(pattern) == [path.replace("2020", "2021")]
+
+
+def test_mirror_uploads_live_files_to_the_bucket_layout(database, s3_bucket):
+    table = database.barra_returns_table
+    table.write(2020, pl.DataFrame({"date": [date(2020, 1, 2)], "barrid": ["A"], "return": [1.5]}))
+    table.commit_version()
+
+    # Versions stay local; live files and the column record are mirrored
+    assert table.mirror(s3_bucket) == [
+        "development/barra_returns/barra_returns_2020.parquet",
+        "development/barra_returns/_schema.parquet",
+    ]
+    assert read_object(s3_bucket, "development/barra_returns/barra_returns_2020.parquet")["return"].to_list() == [1.5]
+
+
+def test_bucket_database_writes_tables_under_the_database_prefix(s3_bucket):
+    database = Database(DatabaseName.DEVELOPMENT, bucket=s3_bucket)
+    database.barra_returns_table.write(2020, pl.DataFrame({"date": [date(2020, 1, 2)], "barrid": ["A"], "return": [1.5]}))
+
+    assert database.barra_returns_table.exists(2020)
+    assert read_object(s3_bucket, "development/barra_returns/barra_returns_2020.parquet")["return"].to_list() == [1.5]
+
+
+def requests(caplog) -> list[str]:
+    """Access log lines of the moto server, e.g. '... "GET /bucket/key HTTP/1.1" 206 -'."""
+    return [
+        re.sub(r"\x1b\[[0-9;]*m", "", record.getMessage())
+        for record in caplog.records
+        if record.name == "werkzeug"
+    ]
+
+
+def test_bucket_tables_scan_with_pushdown(s3_bucket, caplog):
+    database = Database(DatabaseName.DEVELOPMENT, bucket=s3_bucket)
+    table = database.barra_returns_table
+    for year in [2020, 2021]:
+        table.write(year, pl.DataFrame({
+            "date": [date(year, 1, 2), date(year, 1, 3)],
+            "barrid": ["A", "B"],
+            "return": [1.5, 2.5],
+        }))
+
+    caplog.clear()
+    with caplog.at_level(logging.INFO, logger="werkzeug"):
+        query = table.read().filter(pl.col("barrid").eq("B")).select("barrid", "return")
+
+        # Planning the scan reads only the column record, never a year file
+        assert not [request for request in requests(caplog) if "barra_returns_20" in request]
+
+        # The filter and projection reach the parquet scan
+        plan = query.explain()
+        assert "SELECTION" in plan and "PROJECT 2/3" in plan
+
+        assert query.collect().rows() == [("B", 2.5), ("B", 2.5)]
+
+    # Year files are fetched with ranged GETs (footer, then row groups), never whole
+    year_gets = [line for line in requests(caplog) if '"GET ' in line and "barra_returns_20" in line]
+    assert year_gets and all('" 206 ' in line for line in year_gets)
+
+    assert table.last_date() == date(2021, 1, 3)
+
+
+def test_bucket_reads_pad_years_from_the_column_record(s3_bucket):
+    table = Database(DatabaseName.DEVELOPMENT, bucket=s3_bucket).barra_returns_table
+    table.write(2020, pl.DataFrame({"date": [date(2020, 1, 2)], "barrid": ["A"], "return": [1.5]}))
+    table.create_if_not_exists(2021)
+    table.upsert(
+        2021,
+        pl.DataFrame({"date": [date(2021, 1, 4)], "barrid": ["A"], "return": [2.5], "volume": [100.0]}),
+        add_columns=True,
+    )
+
+    assert table.read().sort("date").collect()["volume"].to_list() == [None, 100.0]
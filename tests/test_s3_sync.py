@@ -0,0 +1,74 @@
+import os
+import time
+import polars as pl
+from datetime import date
+from pipelines.utils import s3
+
+RETURNS = pl.DataFrame({"date": [date(2020, 1, 2)], "barrid": ["A"], "return": [1.5]})
+RECORD = "development/barra_returns/_schema.parquet"
+
+
+def keys(bucket: str) -> list[str]:
+    return sorted(object["Key"] for object in s3.list_objects(bucket))
+
+
+def test_push_uploads_only_new_or_changed_files(database, database_path, s3_bucket):
+    table = database.barra_returns_table
+    table.write(2020, RETURNS)
+    table.write(2021, RETURNS)
+    table.commit_version()
+
+    assert database.push(s3_bucket) == [
+        RECORD,
+        "development/barra_returns/barra_returns_2020.parquet",
+        "development/barra_returns/barra_returns_2021.parquet",
+    ]
+    # Versions and locks stay local
+    assert keys(s3_bucket) == [
+        RECORD,
+        "development/barra_returns/barra_returns_2020.parquet",
+        "development/barra_returns/barra_returns_2021.parquet",
+    ]
+    assert database.push(s3_bucket) == []
+
+    # Same size but newer than the object
+    path = os.path.join(database_path, "barra_returns", "barra_returns_2021.parquet")
+    future = time.time() + 60
+    os.utime(path, (future, future))
+    assert database.push(s3_bucket) == ["development/barra_returns/barra_returns_2021.parquet"]
+
+
+def test_push_with_delete_removes_objects_without_a_local_file(database, database_path, s3_bucket):
+    table = database.barra_returns_table
+    table.write(2020, RETURNS)
+    table.write(2021, RETURNS)
+    database.push(s3_bucket)
+
+    os.remove(os.path.join(database_path, "barra_returns", "barra_returns_2021.parquet"))
+    database.push(s3_bucket)
+    assert len(keys(s3_bucket)) == 3
+
+    database.push(s3_bucket, delete=True)
+    assert keys(s3_bucket) == [RECORD, "development/barra_returns/barra_returns_2020.parquet"]
+
+
+def test_pull_downloads_only_missing_or_stale_files(database, tmp_path, s3_bucket):
+    database.barra_returns_table.write(2020, RETURNS)
+    database.push(s3_bucket)
+
+    folder = str(tmp_path / "copy")
+    assert s3.sync_down(s3_bucket, "development", folder) == [RECORD, "development/barra_returns/barra_returns_2020.parquet"]
+    assert s3.sync_down(s3_bucket, "development", folder) == []
+    assert pl.read_parquet(os.path.join(folder, "barra_returns", "barra_returns_2020.parquet")).equals(RETURNS)
+
+    # A local file of a different size is replaced
+    pl.DataFrame({"x": list(range(100))}).write_parquet(os.path.join(folder, "barra_returns", "barra_returns_2020.parquet"))
+    assert s3.sync_down(s3_bucket, "development", folder) == ["development/barra_returns/barra_returns_2020.parquet"]
+
+
+def test_listings_follow_every_page(s3_bucket):
+    client = s3.get_client()
+    for index in range(1001):
+        client.put_object(Bucket=s3_bucket, Key=f"development/many/{index:04d}.parquet", Body=b"")
+
+    assert len(s3.list_objects(s3_bucket, "development/many/")) == 1001
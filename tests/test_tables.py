@@ -0,0 +1,92 @@
+import os
+import polars as pl
+import pytest
+from datetime import date
+from pipelines.utils.enums import DatabaseName, Precision
+from pipelines.utils.storage import LocalStorage, union_schema
+from pipelines.utils.tables import Database
+
+
+def test_table_builds_only_the_named_table(database, database_path):
+    table = database.table("barra_returns")
+
+    assert table is not None
+    assert os.listdir(database_path) == ["barra_returns"]
+
+
+def test_table_resolves_properties_not_named_after_the_table(database):
+    assert database.table("alphas").schema == database.alpha_table.schema
+
+
+def test_table_rejects_unknown_names(database):
+    with pytest.raises(ValueError, match="no table"):
+        database.table("nope")
+
+
+def assets_year(year: int) -> pl.DataFrame:
+    return pl.DataFrame({
+        "date": [date(year, 1, 2)],
+        "barrid": ["USA0000001"],
+        "price": [10.25],
+        "russell_1000": [True],
+        "in_universe": [True],
+    })
+
+
+def test_precisions_are_opt_in_and_rewrite_migrates_mixed_years(tmp_path):
+    full = Database(DatabaseName.DEVELOPMENT, root=str(tmp_path))
+    compact = Database(DatabaseName.DEVELOPMENT, Precision.COMPACT, root=str(tmp_path))
+    assert full.assets_table.storage_policy is None
+
+    full.assets_table.write(2020, assets_year(2020))
+    compact.assets_table.write(2021, assets_year(2021))
+
+    # Float columns of both precisions scan together before the rewrite
+    assert full.assets_table.read().select("price").collect()["price"].to_list() == [10.25, 10.25]
+
+    full.rewrite_precision()
+    assets = full.assets_table.read().sort("date").collect()
+    assert assets.schema["price"] == pl.Float64
+    assert assets["russell_1000"].to_list() == [True, True]
+
+    compact.rewrite_precision()
+    assets = compact.assets_table.read().sort("date").collect()
+    assert assets.schema["price"] == pl.Float32
+    assert assets["in_universe"].to_list() == [True, True]
+
+
+def test_union_schema_widens_floats_stored_at_different_widths():
+    narrow, wide = {"return": pl.Float32}, {"return": pl.Float64, "price": pl.Float64}
+
+    assert union_schema([narrow, wide]) == {"return": pl.Float64, "price": pl.Float64}
+    assert union_schema([wide, narrow]) == {"return": pl.Float64, "price": pl.Float64}
+
+
+def test_reads_pad_years_from_the_column_record_without_opening_footers(database, monkeypatch):
+    table = database.barra_returns_table
+    table.write(2020, pl.DataFrame({"date": [date(2020, 1, 2)], "barrid": ["A"], "return": [1.5]}))
+    table.create_if_not_exists(2021)
+    table.upsert(
+        2021,
+        pl.DataFrame({"date": [date(2021, 1, 4)], "barrid": ["A"], "return": [2.5], "volume": [100.0]}),
+        add_columns=True,
+    )
+
+    scanned = []
+    scan = LocalStorage.scan
+    monkeypatch.setattr(LocalStorage, "scan", lambda self, source, **kwargs: scanned.append(source) or scan(self, source, **kwargs))
+
+    returns = table.read().sort("date").collect()
+    assert returns["volume"].to_list() == [None, 100.0]
+    # Only the record's footer is opened to plan the scan of both years
+    assert [os.path.basename(source) for source in scanned] == ["_schema.parquet", "barra_returns_*.parquet"]
+
+
+def test_column_record_is_built_once_for_tables_written_before_it(database, database_path):
+    table = database.barra_returns_table
+    table.write(2020, pl.DataFrame({"date": [date(2020, 1, 2)], "barrid": ["A"], "return": [1.5]}))
+    table.write(2021, pl.DataFrame({"date": [date(2021, 1, 4)], "barrid": ["A"], "return": [2.5], "volume": [100.0]}))
+    os.remove(os.path.join(database_path, "barra_returns", "_schema.parquet"))
+
+    assert table.read().sort("date").collect()["volume"].to_list() == [None, 100.0]
+    assert os.path.exists(os.path.join(database_path, "barra_returns", "_schema.parquet"))
@@ -0,0 +1,56 @@
+import polars as pl
+import pytest
+from datetime import date
+
+
+def returns(year: int, value: float) -> pl.DataFrame:
+    return pl.DataFrame({"date": [date(year, 1, 2)], "barrid": ["A"], "return": [value]})
+
+
+def values(frame: pl.LazyFrame) -> list[float]:
+    return frame.sort("date").collect()["return"].to_list()
+
+
+@pytest.fixture
+def table(database):
+    return database.barra_returns_table
+
+
+def test_as_of_reads_see_the_committed_files(table):
+    table.write(2020, returns(2020, 1.0))
+    first = table.commit_version()
+
+    table.write(2020, returns(2020, 2.0))
+    table.write(2021, returns(2021, 3.0))
+    second = table.commit_version()
+
+    assert (first, second) == (1, 2)
+    assert values(table.read(as_of_version=first)) == [1.0]
+    assert values(table.read(2020, as_of_version=first)) == [1.0]
+    assert values(table.read(as_of_version=second)) == [2.0, 3.0]
+
+    with pytest.raises(ValueError, match="no barra_returns_2021"):
+        table.read(2021, as_of_version=first)
+    with pytest.raises(ValueError, match="no version 3"):
+        table.read(as_of_version=3)
+
+
+def test_rollback_restores_files_and_commits_a_new_version(table):
+    table.write(2020, returns(2020, 1.0))
+    first = table.commit_version()
+    table.write(2020, returns(2020, 2.0))
+    table.write(2021, returns(2021, 3.0))
+    table.commit_version()
+
+    assert table.rollback(first) == 3
+    assert values(table.read()) == [1.0]
+    assert values(table.read(as_of_version=2)) == [2.0, 3.0]
+
+
+def test_keep_prunes_old_versions(table):
+    for value in [1.0, 2.0, 3.0]:
+        table.write(2020, returns(2020, value))
+        table.commit_version(keep=2)
+
+    assert table.versions() == [2, 3]
+    assert values(table.read(as_of_version=2)) == [2.0]
@@ -0,0 +1,186 @@
+import math
+import os
+import numpy as np
+import polars as pl
+import pytest
+from datetime import date
+from polars.testing import assert_frame_equal
+from pipelines.utils.weights_store import WeightsStore, weight_changes
+
+
+def business_days(start: date, end: date) -> list[date]:
+    days = pl.date_range(start, end, eager=True)
+    return days.filter(days.dt.weekday() <= 5).to_list()
+
+
+def random_weights(days: list[date], n_names: int = 20, seed: int = 0) -> pl.DataFrame:
+    """Weights that drift a little each day, with names entering and leaving."""
+    rng = np.random.default_rng(seed)
+    weights = rng.uniform(0, 0.1, n_names)
+    frames = []
+    for day in days:
+        weights = weights + rng.normal(0, 0.001, n_names) * (rng.uniform(size=n_names) < 0.3)
+        held = rng.uniform(size=n_names) < 0.9
+        frames.append(pl.DataFrame({
+            "date": [day] * int(held.sum()),
+            "barrid": [f"B{i:03d}" for i in np.flatnonzero(held)],
+            "weight": weights[held],
+        }))
+    return pl.concat(frames)
+
+
+@pytest.fixture
+def store(tmp_path) -> WeightsStore:
+    return WeightsStore("momentum", 0.05, root=str(tmp_path))
+
+
+@pytest.fixture
+def weights() -> pl.DataFrame:
+    return random_weights(business_days(date(2023, 11, 15), date(2024, 2, 20)))
+
+
+def write_backtest_file(store: WeightsStore, weights: pl.DataFrame, name: str) -> None:
+    """A daily file in the layout sf_backtester jobs write."""
+    path = f"{store._path}/{name}.parquet"
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    weights.write_parquet(path)
+
+
+def test_read_reconstructs_written_weights(store, weights):
+    store.write(weights)
+
+    assert_frame_equal(store.read().collect(), weights.sort("date", "barrid"))
+    assert store.last_date() == weights["date"].max()
+
+
+def test_read_reconstructs_a_date_range_mid_month(store, weights):
+    store.write(weights)
+
+    start, end = date(2024, 1, 10), date(2024, 2, 5)
+    expected = weights.filter(pl.col("date").is_between(start, end)).sort("date", "barrid")
+    assert_frame_equal(store.read(start, end).collect(), expected)
+
+
+def test_writes_in_pieces_match_one_write(store, weights, tmp_path):
+    cut_dates = [date(2023, 12, 20), date(2024, 1, 31)]
+    pieces = [
+        weights.filter(pl.col("date").lt(cut_dates[0])),
+        weights.filter(pl.col("date").is_between(cut_dates[0], cut_dates[1], closed="left")),
+        weights.filter(pl.col("date").ge(cut_dates[1])),
+    ]
+    for piece in pieces:
+        store.write(piece)
+
+    one_write = WeightsStore("momentum", 0.05, root=str(tmp_path / "one"))
+    one_write.write(weights)
+
+    assert_frame_equal(store.read().collect(), one_write.read().collect())
+    assert_frame_equal(store.deltas().collect(), one_write.deltas().collect())
+
+
+def test_write_replaces_everything_from_its_first_date(store, weights):
+    store.write(weights)
+    rewrite_from = date(2024, 1, 17)
+    rewritten = random_weights(business_days(rewrite_from, date(2024, 1, 31)), seed=1)
+
+    store.write(rewritten, overwrite=True)
+
+    expected = pl.concat([weights.filter(pl.col("date").lt(rewrite_from)), rewritten]).sort("date", "barrid")
+    assert_frame_equal(store.read().collect(), expected)
+    assert store.last_date() == date(2024, 1, 31)
+
+
+def test_write_ending_before_the_stored_dates_needs_overwrite(store, weights):
+    store.write(weights)
+    earlier = weights.filter(pl.col("date").lt(date(2024, 1, 1)))
+
+    with pytest.raises(ValueError, match="overwrite=True"):
+        store.write(earlier)
+
+    assert_frame_equal(store.read().collect(), weights.sort("date", "barrid"))
+
+
+def test_turnover_is_the_sum_of_absolute_changes(store, weights):
+    store.write(weights)
+
+    turnover = store.turnover(date(2024, 1, 1)).collect()
+
+    expected = (
+        weight_changes(weights.lazy())
+        .filter(pl.col("date").ge(date(2024, 1, 1)))
+        .group_by("date")
+        .agg(pl.col("change").abs().sum().alias("turnover"))
+        .collect()
+    )
+    assert turnover["date"].to_list() == business_days(date(2024, 1, 1), date(2024, 2, 20))
+    assert_frame_equal(
+        turnover,
+        turnover.select("date").join(expected, on="date", how="left").with_columns(pl.col("turnover").fill_null(0)),
+    )
+
+
+def test_tolerance_drops_small_changes_but_keeps_entries_and_exits():
+    weights = pl.DataFrame({
+        "date": [date(2024, 1, 2)] * 2 + [date(2024, 1, 3)] * 2,
+        "barrid": ["A", "B", "A", "C"],
+        "weight": [0.5, 0.5, 0.50001, 0.0],
+    })
+
+    changes = weight_changes(weights.lazy(), tolerance=1e-3).filter(pl.col("date").eq(date(2024, 1, 3))).collect()
+
+    assert changes.select("barrid", "exit").rows() == [("B", True), ("C", False)]
+
+
+def test_backtest_files_only_fill_dates_the_store_lacks(store, weights):
+    stored = weights.filter(pl.col("date").le(date(2024, 1, 31)))
+    store.write(stored)
+    # An old job covering stored dates and the ones after them
+    old_job = random_weights(business_days(date(2024, 1, 2), date(2024, 2, 20)), seed=2)
+    write_backtest_file(store, old_job, "job")
+
+    expected = pl.concat([stored, old_job.filter(pl.col("date").gt(date(2024, 1, 31)))]).sort("date", "barrid")
+    assert_frame_equal(store.read().collect(), expected)
+    assert store.last_date() == date(2024, 2, 20)
+
+    turnover = store.turnover(date(2024, 2, 1)).collect()
+    assert turnover["date"].to_list() == business_days(date(2024, 2, 1), date(2024, 2, 20))
+
+    store.compact()
+
+    assert store.pending() == []
+    assert_frame_equal(store.read().collect(), expected)
+    assert_frame_equal(store.turnover(date(2024, 2, 1)).collect(), turnover)
+
+
+def test_write_compacts_backtest_files_first(store, weights):
+    write_backtest_file(store, weights.filter(pl.col("date").lt(date(2024, 1, 1))), "job")
+    later = weights.filter(pl.col("date").ge(date(2024, 1, 1)))
+
+    store.write(later)
+
+    assert store.pending() == []
+    assert_frame_equal(store.read().collect(), weights.sort("date", "barrid"))
+
+
+def test_trading_cost_units(store, database):
+    day_1, day_2 = date(2024, 1, 2), date(2024, 1, 3)
+    store.write(pl.DataFrame({"date": [day_1, day_2], "barrid": ["A", "A"], "weight": [0.01, 0.03]}))
+    database.assets_table.write(2024, pl.DataFrame({
+        "date": [day_1, day_2],
+        "barrid": ["A", "A"],
+        "price": [50.0, 50.0],
+        "bid_ask_spread": [0.002, 0.002],
+        "total_risk": [31.75, 31.75],
+        "average_daily_volume_30": [1e6, 1e6],
+    }))
+
+    cost = store.trading_cost(database, aum=1e8, start=day_2).collect()
+
+    # $2m traded against $50m of daily volume at 2% daily volatility
+    trade = 0.02
+    daily_volatility = 31.75 / 100 / math.sqrt(252)
+    [row] = cost.to_dicts()
+    assert row["turnover"] == pytest.approx(trade)
+    assert row["spread_cost"] == pytest.approx(trade * 0.001, rel=1e-5)
+    assert row["impact_cost"] == pytest.approx(trade * daily_volatility * math.sqrt(2e6 / 5e7), rel=1e-5)
+    assert row["cost"] == pytest.approx(row["spread_cost"] + row["impact_cost"])